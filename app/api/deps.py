@@ -1,12 +1,12 @@
 import json
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from fastapi import Depends, HTTPException
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
 
 
 def get_db() -> Generator:
@@ -15,3 +15,8 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
-from .endpoints import facebook, item
+from .endpoints import facebook, item, metrics, zaloOA
 
 api_router = APIRouter()
 api_router.include_router(item.router, prefix="/items", tags=["items"])
 api_router.include_router(facebook.router, tags=["facebook"])
+api_router.include_router(zaloOA.router, prefix="/zalo", tags=["zalo"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
@@ -0,0 +1,12 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.common.metrics import metrics_registry
+
+router = APIRouter()
+
+
+@router.get("/")
+def read_metrics() -> Any:
+    return metrics_registry.snapshot()
@@ -0,0 +1,164 @@
+import time
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from app.common.logger import setup_logger
+
+logger = setup_logger()
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while a dependency is unhealthy.
+
+    The outcome of the last `window` calls is kept; once at least
+    `min_calls` were seen and the share of failures reaches `failure_rate`
+    the breaker opens and every call raises `CircuitOpenError` for
+    `reset_timeout` seconds. It then lets `half_open_calls` trial calls
+    through: a success closes it again, a failure opens it for another
+    period. Exceptions listed in `excluded` (e.g. our own load shedding) are
+    not counted as failures.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        reset_timeout: float = 30,
+        half_open_calls: int = 1,
+        excluded: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.excluded = excluded
+
+        self._state = self.CLOSED
+        self._results: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+
+        self._calls = 0
+        self._failures = 0
+        self._rejected = 0
+        self._opened = 0
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            return self.HALF_OPEN
+        return self._state
+
+    async def call(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        probe = self._acquire()
+        ok: Optional[bool] = None
+        try:
+            result = await func(*args, **kwargs)
+            ok = True
+            return result
+        except self.excluded:
+            raise
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self._record(ok, probe)
+
+    def _acquire(self) -> bool:
+        """Let a call through or raise; True if it is a half-open trial."""
+        if self._state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self._rejected += 1
+                raise CircuitOpenError(f"Circuit {self.name} is open")
+            self._state = self.HALF_OPEN
+            self._probes = 0
+
+        if self._state == self.HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self._rejected += 1
+                raise CircuitOpenError(f"Circuit {self.name} is half open")
+            self._probes += 1
+            return True
+        return False
+
+    def _record(self, ok: Optional[bool], probe: bool) -> None:
+        if probe:
+            self._probes -= 1
+        if ok is None:
+            # Cancelled or excluded, says nothing about the dependency
+            return
+
+        self._calls += 1
+        if not ok:
+            self._failures += 1
+
+        if self._state == self.HALF_OPEN:
+            # Only trial calls decide, not the ones started before the trip
+            if probe:
+                if ok:
+                    logger.info(f"Circuit {self.name} closed")
+                    self._state = self.CLOSED
+                    self._results.clear()
+                else:
+                    self._trip()
+            return
+        if self._state == self.OPEN:
+            return
+
+        self._results.append(ok)
+        if len(self._results) < self.min_calls:
+            return
+        failures = self._results.count(False)
+        if failures / len(self._results) >= self.failure_rate:
+            self._trip()
+
+    def _trip(self) -> None:
+        logger.warning(
+            f"Circuit {self.name} opened for {self.reset_timeout}s"
+        )
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._opened += 1
+        self._results.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        window = len(self._results)
+        return {
+            "state": self.state,
+            "failure_rate": (
+                self._results.count(False) / window if window else 0.0
+            ),
+            "calls": self._calls,
+            "failures": self._failures,
+            "rejected": self._rejected,
+            "opened": self._opened,
+        }
@@ -1 +1,4 @@
-from .base import BaseEnum
\ No newline at end of file
+from .base import BaseEnum
+from .typing_policy import TypingPolicy
+from .outbox_status import OutboxStatus
+from .count_strategy import CountStrategy
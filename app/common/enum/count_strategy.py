@@ -0,0 +1,7 @@
+from app.common.enum.base import BaseEnum
+
+
+class CountStrategy(BaseEnum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    CACHED = "cached"
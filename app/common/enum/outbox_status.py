@@ -0,0 +1,7 @@
+from app.common.enum.base import BaseEnum
+
+
+class OutboxStatus(BaseEnum):
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
@@ -0,0 +1,7 @@
+from app.common.enum.base import BaseEnum
+
+
+class TypingPolicy(BaseEnum):
+    OFF = "off"
+    SINGLE = "single"
+    WHILE_PROCESSING = "while_processing"
@@ -0,0 +1,125 @@
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.common.logger import setup_logger
+from app.common.metrics import metrics_registry
+from app.core.config import settings
+
+logger = setup_logger()
+
+GRAPH_API = "graph"
+AI_BACKEND = "ai"
+ZALO_OA = "zalo"
+
+
+class HttpClientPool:
+    """
+    One long-lived `httpx.AsyncClient` per upstream so that connections
+    (TCP + TLS) are kept alive and reused between calls instead of being
+    opened for every request.
+
+    Clients are opened in the application lifespan and closed on shutdown;
+    `get` opens a client lazily when it is used outside of the app (scripts).
+    """
+
+    def __init__(self):
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._requests: Dict[str, int] = {}
+
+    def configure(
+        self,
+        name: str,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self._configs[name] = {
+            "base_url": base_url or "",
+            "timeout": timeout or settings.HTTP_TIMEOUT,
+            "max_connections": max_connections or settings.HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": (
+                max_keepalive_connections
+                or settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            "headers": headers or {},
+        }
+
+    def open(self) -> None:
+        for name in self._configs:
+            self.get(name)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = self._build(name)
+        return client
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        config = self._configs.get(name)
+        if config is None:
+            raise KeyError(f"HTTP client {name} is not configured")
+
+        async def count_request(request: httpx.Request):
+            self._requests[name] = self._requests.get(name, 0) + 1
+
+        return httpx.AsyncClient(
+            base_url=config["base_url"],
+            headers=config["headers"],
+            http2=settings.HTTP2_ENABLED,
+            timeout=httpx.Timeout(
+                config["timeout"], connect=settings.HTTP_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=config["max_connections"],
+                max_keepalive_connections=config["max_keepalive_connections"],
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [count_request]},
+        )
+
+    async def aclose(self) -> None:
+        for name, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close HTTP client {name}: {e}")
+        self._clients = {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "requests": self._requests.get(name, 0),
+                "max_connections": self._configs[name]["max_connections"],
+                **_pool_usage(client),
+            }
+            for name, client in self._clients.items()
+        }
+
+
+def _pool_usage(client: httpx.AsyncClient) -> Dict[str, int]:
+    # httpx does not expose pool usage, read it from the httpcore pool
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    if pool is None:
+        return {}
+
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        "connections": len(connections),
+        "idle_connections": idle,
+        "active_connections": len(connections) - idle,
+        "pending_requests": len(getattr(pool, "_requests", [])),
+    }
+
+
+http_clients = HttpClientPool()
+http_clients.configure(GRAPH_API, base_url=settings.FACEBOOK_URL)
+http_clients.configure(
+    AI_BACKEND, base_url=settings.AI_URL, timeout=settings.AI_TIMEOUT
+)
+http_clients.configure(ZALO_OA, base_url=settings.ZALO_URL)
+metrics_registry.register("http_clients", http_clients.stats)
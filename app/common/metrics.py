@@ -0,0 +1,99 @@
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class MetricsRegistry:
+    """
+    Collects named metric snapshots from the running components so they can
+    be exposed on a single endpoint.
+    """
+
+    def __init__(self):
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+
+    def register(self, name: str, collector: Callable[[], Any]) -> None:
+        self._collectors[name] = collector
+
+    def unregister(self, name: str) -> None:
+        self._collectors.pop(name, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: collector() for name, collector in self._collectors.items()}
+
+
+class LatencyWindow:
+    """Rolling window of durations (seconds) summarised as percentiles."""
+
+    def __init__(self, size: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._count = 0
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        return {
+            "count": self._count,
+            "p50": _percentile(samples, 0.50),
+            "p95": _percentile(samples, 0.95),
+            "max": samples[-1] if samples else 0.0,
+        }
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class StageTimer:
+    """
+    Splits the time spent on one unit of work into named stages; each `mark`
+    closes the stage that started at the previous mark. Uses wall-clock time
+    so the start can be taken in another process.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at or time.time()
+        self._last = self.started_at
+        self.stages: Dict[str, float] = {}
+
+    def mark(self, stage: str) -> float:
+        now = time.time()
+        elapsed = now - self._last
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+        self._last = now
+        return elapsed
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started_at
+
+
+class LatencyTracker:
+    """Aggregates `StageTimer` breakdowns per stage and in total."""
+
+    def __init__(self, size: int = 1000):
+        self.size = size
+        self._stages: Dict[str, LatencyWindow] = {}
+        self._total = LatencyWindow(size)
+
+    def record(self, timer: StageTimer) -> None:
+        for stage, seconds in timer.stages.items():
+            window = self._stages.get(stage)
+            if window is None:
+                window = self._stages[stage] = LatencyWindow(self.size)
+            window.observe(seconds)
+        self._total.observe(timer.total)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self._total.summary(),
+            **{stage: window.summary() for stage, window in self._stages.items()},
+        }
+
+
+metrics_registry = MetricsRegistry()
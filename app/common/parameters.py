@@ -1,6 +1,7 @@
 from typing import Optional
 
 from app.common import convert_filter_to_camel_case
+from app.common.enum import CountStrategy
 from app.common.string_case import to_snake_case
 
 
@@ -11,7 +12,12 @@ async def common_filter_parameters(
     include: str = None,
     join: str = "{}",
     orderBy: str = None,
+    cursor: str = None,
+    count: Optional[CountStrategy] = None,
 ):
+    # `cursor` (empty for the first page) switches to keyset pagination,
+    # the next page is requested with the `nextCursor` of the response.
+    # `count` picks how `total` is computed (COUNT_STRATEGY by default)
     if join:
         join_ = convert_filter_to_camel_case(join)
     else:
@@ -40,6 +46,8 @@ async def common_filter_parameters(
         "include": include,
         "order_by": orderBy,
         "join": join_,
+        "cursor": cursor,
+        "count": count,
     }
 
 
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.common.metrics import LatencyWindow
+
+T = TypeVar("T")
+
+
+class StageFullError(Exception):
+    pass
+
+
+class Stage:
+    """
+    One step of a processing pipeline: runs at most `concurrency` calls at a
+    time and keeps per-stage counters and a latency window, so each step can
+    be sized and observed on its own.
+
+    With `max_waiting` set the stage is a bulkhead: once that many calls are
+    already waiting for a slot, new ones raise `StageFullError` instead of
+    queueing up behind a slow dependency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        window: int = 1000,
+        max_waiting: Optional[int] = None,
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._latency = LatencyWindow(window)
+        self._waiting = 0
+        self._active = 0
+        self._errors = 0
+        self._rejected = 0
+
+    async def run(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        if (
+            self.max_waiting is not None
+            and self._semaphore.locked()
+            and self._waiting >= self.max_waiting
+        ):
+            self._rejected += 1
+            raise StageFullError(f"Stage {self.name} is full")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._latency.observe(time.perf_counter() - started)
+            self._active -= 1
+            self._semaphore.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_waiting": self.max_waiting,
+            "rejected": self._rejected,
+            "errors": self._errors,
+            "latency": self._latency.summary(),
+        }
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts up to `capacity`.
+    Waiters are served in FIFO order. The rate can be changed at runtime and
+    the bucket can be paused, e.g. while an upstream asks us to back off.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def set_rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @property
+    def paused(self) -> bool:
+        return time.monotonic() < self._paused_until
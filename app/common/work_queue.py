@@ -0,0 +1,132 @@
+import asyncio
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.common.logger import setup_logger
+
+logger = setup_logger()
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class WorkQueue:
+    """
+    Bounded in-process queue drained by a fixed pool of asyncio workers.
+
+    `put` waits at most `put_timeout` seconds for a free slot and then raises
+    `QueueFullError`, so the producer can push back instead of piling up work.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[None]],
+        maxsize: int = 1000,
+        workers: int = 4,
+        put_timeout: float = 0.0,
+    ):
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+        self.put_timeout = put_timeout
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._dequeued = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._total_lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} workers for queue {self.name}")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if not self._tasks:
+            return
+
+        # Give the workers a chance to drain what has already been accepted
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Queue {self.name} stopped with {self._queue.qsize()} pending items"
+            )
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def put(self, item: Any) -> None:
+        entry = (time.monotonic(), item)
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            if self.put_timeout <= 0:
+                self._rejected += 1
+                raise QueueFullError(f"Queue {self.name} is full") from None
+            try:
+                await asyncio.wait_for(self._queue.put(entry), self.put_timeout)
+            except asyncio.TimeoutError:
+                self._rejected += 1
+                raise QueueFullError(f"Queue {self.name} is full") from None
+        self._enqueued += 1
+
+    async def _worker(self) -> None:
+        while True:
+            enqueued_at, item = await self._queue.get()
+
+            lag = time.monotonic() - enqueued_at
+            self._dequeued += 1
+            self._last_lag = lag
+            self._max_lag = max(self._max_lag, lag)
+            self._total_lag += lag
+
+            try:
+                await self.handler(item)
+                self._processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"Queue {self.name} failed to process item: {e}")
+                logger.error(traceback.format_exc())
+            finally:
+                self._queue.task_done()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "depth": self._queue.qsize(),
+            "maxsize": self.maxsize,
+            "workers": len(self._tasks),
+            "enqueued": self._enqueued,
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "lag_seconds": {
+                "last": self._last_lag,
+                "max": self._max_lag,
+                "avg": (
+                    self._total_lag / self._dequeued if self._dequeued else 0.0
+                ),
+            },
+        }
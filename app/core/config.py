@@ -22,11 +22,151 @@ class Settings(BaseSettings):
 
     MY_VERIFY_TOKEN: str = os.environ.get("MY_VERIFY_TOKEN")
     PAGE_ACCESS_TOKEN: str = os.environ.get("PAGE_ACCESS_TOKEN")
+    FACEBOOK_APP_SECRET: Optional[str] = os.environ.get("FACEBOOK_APP_SECRET")
 
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+    DB_ASYNC_POOL_SIZE: int = os.environ.get("DB_ASYNC_POOL_SIZE") or 20
+    DB_ASYNC_MAX_OVERFLOW: int = os.environ.get("DB_ASYNC_MAX_OVERFLOW") or 10
+    # exact | estimated | cached, overridable per request with `count`
+    COUNT_STRATEGY: str = os.environ.get("COUNT_STRATEGY") or "exact"
+    COUNT_CACHE_SIZE: int = os.environ.get("COUNT_CACHE_SIZE") or 10000
+    COUNT_CACHE_TTL: float = os.environ.get("COUNT_CACHE_TTL") or 30
+    # Compiled query_builder shapes kept in memory
+    QUERY_CACHE_SIZE: int = os.environ.get("QUERY_CACHE_SIZE") or 512
 
     FACEBOOK_URL: str = os.environ.get("FACEBOOK_URL")
+    ZALO_URL: str = os.environ.get("ZALO_URL") or "https://openapi.zalo.me"
+    ZALO_OA_ACCESS_TOKEN: Optional[str] = os.environ.get("ZALO_OA_ACCESS_TOKEN")
+    ZALO_OA_SECRET_KEY: Optional[str] = os.environ.get("ZALO_OA_SECRET_KEY")
     AI_URL: str = os.environ.get("AI_URL")
+    # Store của các page chưa có trong bảng page (triển khai một page)
+    DEFAULT_STORE_ID: str = (
+        os.environ.get("DEFAULT_STORE_ID")
+        or "a23a71d3-9647-4b8e-bd48-fe9c8f776130"
+    )
+    AI_TIMEOUT: float = os.environ.get("AI_TIMEOUT") or 10
+    AI_STREAMING: bool = os.environ.get("AI_STREAMING") or False
+    AI_STREAM_MIN_CHARS: int = os.environ.get("AI_STREAM_MIN_CHARS") or 40
+    AI_CACHE_ENABLED: bool = os.environ.get("AI_CACHE_ENABLED") or False
+    AI_CACHE_SIZE: int = os.environ.get("AI_CACHE_SIZE") or 1000
+    AI_CACHE_TTL: float = os.environ.get("AI_CACHE_TTL") or 3600
+    AI_CACHE_MAX_MESSAGE_LENGTH: int = (
+        os.environ.get("AI_CACHE_MAX_MESSAGE_LENGTH") or 200
+    )
+
+    DEBOUNCE_STORE: str = os.environ.get("DEBOUNCE_STORE") or "memory"
+    # Shorter waits reply sooner but split more bursts: each split is an
+    # extra AI call and a reply to half a question. With these defaults the
+    # synthetic replay (benchmarks/bench_debounce_replay.py) splits 19 of
+    # 2834 bursts like the old fixed 10 s wait, first reply p50 5.1 s vs
+    # 11.7 s, p95 27.3 s vs 24.5 s. MAX_WAIT=10, IDLE_GAP=3, multiplier 1.5
+    # gives p50 3.0 s / p95 10 s but splits 924. Replay recorded bursts
+    # (--bursts) before lowering them.
+    DEBOUNCE_MIN_WAIT: float = os.environ.get("DEBOUNCE_MIN_WAIT") or 1
+    DEBOUNCE_MAX_WAIT: float = os.environ.get("DEBOUNCE_MAX_WAIT") or 30
+    DEBOUNCE_IDLE_GAP: float = os.environ.get("DEBOUNCE_IDLE_GAP") or 8
+    # Idle gap = learned time between a sender's messages x this
+    DEBOUNCE_GAP_MULTIPLIER: float = (
+        os.environ.get("DEBOUNCE_GAP_MULTIPLIER") or 4
+    )
+    DEBOUNCE_MAX_BUFFER: int = os.environ.get("DEBOUNCE_MAX_BUFFER") or 10
+    DEBOUNCE_BATCH_SIZE: int = os.environ.get("DEBOUNCE_BATCH_SIZE") or 100
+    DEBOUNCE_MAX_CONCURRENT_FLUSHES: int = (
+        os.environ.get("DEBOUNCE_MAX_CONCURRENT_FLUSHES") or 100
+    )
+    DEBOUNCE_POLL_INTERVAL: float = os.environ.get("DEBOUNCE_POLL_INTERVAL") or 1
+    REDIS_URL: str = os.environ.get("REDIS_URL") or "redis://localhost:6379/0"
+
+    PAGE_REGISTRY_SIZE: int = os.environ.get("PAGE_REGISTRY_SIZE") or 10000
+    PAGE_REGISTRY_TTL: float = os.environ.get("PAGE_REGISTRY_TTL") or 300
+    PAGE_REGISTRY_NEGATIVE_TTL: float = (
+        os.environ.get("PAGE_REGISTRY_NEGATIVE_TTL") or 60
+    )
+
+    DEDUP_STORE: str = os.environ.get("DEDUP_STORE") or "memory"
+    DEDUP_TTL: float = os.environ.get("DEDUP_TTL") or 3600
+    DEDUP_BUCKET_SECONDS: float = os.environ.get("DEDUP_BUCKET_SECONDS") or 60
+    DEDUP_MAX_KEYS: int = os.environ.get("DEDUP_MAX_KEYS") or 1000000
+
+    PROFILE_CACHE_SIZE: int = os.environ.get("PROFILE_CACHE_SIZE") or 10000
+    PROFILE_CACHE_TTL: float = os.environ.get("PROFILE_CACHE_TTL") or 3600
+    PROFILE_CACHE_NEGATIVE_TTL: float = (
+        os.environ.get("PROFILE_CACHE_NEGATIVE_TTL") or 60
+    )
+    PROFILE_CACHE_PERSIST: bool = os.environ.get("PROFILE_CACHE_PERSIST") or False
+    PROFILE_BATCH_WINDOW: float = os.environ.get("PROFILE_BATCH_WINDOW") or 0.005
+    PROFILE_BATCH_SIZE: int = os.environ.get("PROFILE_BATCH_SIZE") or 50
+
+    TYPING_POLICY: str = os.environ.get("TYPING_POLICY") or "single"
+    TYPING_REFRESH_INTERVAL: float = (
+        os.environ.get("TYPING_REFRESH_INTERVAL") or 15
+    )
+
+    HTTP2_ENABLED: bool = os.environ.get("HTTP2_ENABLED") or False
+    HTTP_TIMEOUT: float = os.environ.get("HTTP_TIMEOUT") or 10
+    HTTP_CONNECT_TIMEOUT: float = os.environ.get("HTTP_CONNECT_TIMEOUT") or 5
+    HTTP_MAX_CONNECTIONS: int = os.environ.get("HTTP_MAX_CONNECTIONS") or 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = (
+        os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS") or 20
+    )
+    HTTP_KEEPALIVE_EXPIRY: float = os.environ.get("HTTP_KEEPALIVE_EXPIRY") or 30
+
+    SEND_RATE_PER_PAGE: float = os.environ.get("SEND_RATE_PER_PAGE") or 250
+    SEND_RATE_PER_RECIPIENT: float = (
+        os.environ.get("SEND_RATE_PER_RECIPIENT") or 1
+    )
+    SEND_BURST_PER_RECIPIENT: float = (
+        os.environ.get("SEND_BURST_PER_RECIPIENT") or 5
+    )
+    SEND_MAX_RETRIES: int = os.environ.get("SEND_MAX_RETRIES") or 5
+    SEND_BACKOFF_BASE: float = os.environ.get("SEND_BACKOFF_BASE") or 0.5
+    SEND_BACKOFF_MAX: float = os.environ.get("SEND_BACKOFF_MAX") or 30
+
+    OUTBOX_ENABLED: bool = os.environ.get("OUTBOX_ENABLED") or False
+    OUTBOX_WORKERS: int = os.environ.get("OUTBOX_WORKERS") or 4
+    OUTBOX_BATCH_SIZE: int = os.environ.get("OUTBOX_BATCH_SIZE") or 20
+    OUTBOX_POLL_INTERVAL: float = os.environ.get("OUTBOX_POLL_INTERVAL") or 1
+    OUTBOX_LEASE: float = os.environ.get("OUTBOX_LEASE") or 60
+    OUTBOX_MAX_ATTEMPTS: int = os.environ.get("OUTBOX_MAX_ATTEMPTS") or 8
+    OUTBOX_BACKOFF_BASE: float = os.environ.get("OUTBOX_BACKOFF_BASE") or 2
+    OUTBOX_BACKOFF_MAX: float = os.environ.get("OUTBOX_BACKOFF_MAX") or 600
+
+    STAGE_NORMALIZE_CONCURRENCY: int = (
+        os.environ.get("STAGE_NORMALIZE_CONCURRENCY") or 64
+    )
+    STAGE_DEDUPE_CONCURRENCY: int = (
+        os.environ.get("STAGE_DEDUPE_CONCURRENCY") or 256
+    )
+    STAGE_BUFFER_CONCURRENCY: int = (
+        os.environ.get("STAGE_BUFFER_CONCURRENCY") or 256
+    )
+    STAGE_AI_CONCURRENCY: int = os.environ.get("STAGE_AI_CONCURRENCY") or 32
+    STAGE_RENDER_CONCURRENCY: int = (
+        os.environ.get("STAGE_RENDER_CONCURRENCY") or 256
+    )
+    STAGE_SEND_CONCURRENCY: int = os.environ.get("STAGE_SEND_CONCURRENCY") or 64
+    STAGE_AI_MAX_WAITING: int = os.environ.get("STAGE_AI_MAX_WAITING") or 200
+
+    AI_BREAKER_FAILURE_RATE: float = (
+        os.environ.get("AI_BREAKER_FAILURE_RATE") or 0.5
+    )
+    AI_BREAKER_WINDOW: int = os.environ.get("AI_BREAKER_WINDOW") or 20
+    AI_BREAKER_MIN_CALLS: int = os.environ.get("AI_BREAKER_MIN_CALLS") or 10
+    AI_BREAKER_RESET_TIMEOUT: float = (
+        os.environ.get("AI_BREAKER_RESET_TIMEOUT") or 30
+    )
+    AI_BREAKER_HALF_OPEN_CALLS: int = (
+        os.environ.get("AI_BREAKER_HALF_OPEN_CALLS") or 1
+    )
+
+    WEBHOOK_QUEUE_MAXSIZE: int = os.environ.get("WEBHOOK_QUEUE_MAXSIZE") or 1000
+    WEBHOOK_QUEUE_WORKERS: int = os.environ.get("WEBHOOK_QUEUE_WORKERS") or 8
+    WEBHOOK_QUEUE_PUT_TIMEOUT: float = (
+        os.environ.get("WEBHOOK_QUEUE_PUT_TIMEOUT") or 0.05
+    )
+    WEBHOOK_SENDER_CONCURRENCY: int = (
+        os.environ.get("WEBHOOK_SENDER_CONCURRENCY") or 64
+    )
 
     @field_validator("SQLALCHEMY_DATABASE_URI", mode="before")
     @classmethod
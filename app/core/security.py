@@ -4,8 +4,10 @@ Returns:
     [type]: [description]
 """
 
+import hashlib
+import hmac
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Union
 
 from fastapi import Depends, HTTPException
 from fastapi.security import APIKeyHeader
@@ -56,3 +58,15 @@ def check_authentication_header(x_api_key: str = Depends(X_API_KEY)):
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid API Key",
     )
+
+
+def verify_hub_signature(
+    body: bytes, signature: Optional[str], app_secret: str
+) -> bool:
+    """Check the `X-Hub-Signature-256` header against the raw request body."""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(
+        app_secret.encode(), body, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(signature[len("sha256="):], expected)
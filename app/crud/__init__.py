@@ -1,2 +1,5 @@
-from .crud_item import crud_item
+from .crud_facebook_profile import crud_facebook_profile
+from .crud_item import async_crud_item, crud_item
+from .crud_outbox_message import crud_outbox_message
+from .crud_page import crud_page
 from .crud_user import crud_user
@@ -0,0 +1,214 @@
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import and_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.string_case import decamelize
+from app.db.base_class import Base
+from app.db.count_strategy import get_total_async
+from app.db.query_builder import (
+    apply_keyset,
+    compile_select,
+    get_filter,
+    get_keyset,
+    get_keyset_page,
+)
+
+ModelType = TypeVar("ModelType", bound=Base)
+CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
+UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(self, model: Type[ModelType]):
+        """
+        `CRUDBase` for an `AsyncSession`: same methods and filters, but the
+        queries run on the event loop instead of the threadpool.
+        **Parameters**
+        * `model`: A SQLAlchemy model class
+        """
+        self.model = model
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.scalar(
+            select(self.model).where(
+                self.model.id == id, self.model.deleted_at == None
+            )
+        )
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        filter_param: dict = None,
+    ) -> List[ModelType]:
+        if filter_param is None:
+            filter_param = {}
+        if filter_param.get("cursor") is not None:
+            return (await self._get_keyset_page(db, filter_param))[0]
+
+        statement, params = self._select(filter_param)
+        statement = statement.where(self.model.deleted_at == None)
+        result = await db.scalars(
+            statement.offset(filter_param.get("skip")).limit(
+                filter_param.get("limit")
+            ),
+            params,
+        )
+        return result.all()
+
+    async def get_multi_by(
+        self,
+        db: AsyncSession,
+        filter_param: dict = None,
+    ) -> Dict[str, Any]:
+        if filter_param is None:
+            filter_param = {}
+        if filter_param.get("cursor") is not None:
+            results, next_cursor = await self._get_keyset_page(
+                db, filter_param
+            )
+            statement, params = self._keyset_select(filter_param)
+            total, exact = await get_total_async(
+                db, statement, self.model, filter_param, params
+            )
+            return {
+                "total": total,
+                "total_exact": exact,
+                "results": results,
+                "next_cursor": next_cursor,
+            }
+
+        statement, params = self._select(filter_param)
+        statement = statement.where(self.model.deleted_at == None)
+        total, exact = await get_total_async(
+            db, statement, self.model, filter_param, params
+        )
+        result = await db.scalars(
+            statement.offset(filter_param.get("skip")).limit(
+                filter_param.get("limit")
+            ),
+            params,
+        )
+        return {"total": total, "total_exact": exact, "results": result.all()}
+
+    async def create(
+        self, db: AsyncSession, *, obj_in: CreateSchemaType
+    ) -> ModelType:
+        obj_in_data = decamelize(jsonable_encoder(obj_in))
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        try:
+            db.add(db_obj)
+            await db.commit()
+            await db.refresh(db_obj)
+            return db_obj
+        except IntegrityError as e:
+            await db.rollback()
+            # asyncpg keeps the Postgres DETAIL on the wrapped exception
+            detail = getattr(e.orig.__cause__, "detail", None)
+            raise HTTPException(422, detail or "Key already exists") from None
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_defaults=True)
+        return await self._apply(db, db_obj, decamelize(update_data))
+
+    async def patch(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        return await self._apply(db, db_obj, decamelize(update_data))
+
+    async def remove(self, db: AsyncSession, *, id: Any) -> ModelType:
+        obj = await db.get(self.model, id)
+        obj.is_active = False
+        obj.deleted_at = datetime.now()
+        db.add(obj)
+        await db.commit()
+        return obj
+
+    async def get_one_by(
+        self, db: AsyncSession, filter: dict = {}
+    ) -> Optional[ModelType]:
+        return await db.scalar(
+            select(self.model)
+            .where(
+                and_(
+                    self.model.deleted_at == None,
+                    get_filter(self.model, filter),
+                )
+            )
+            .limit(1)
+        )
+
+    async def get_one_or_fail(
+        self, db: AsyncSession, id: Any
+    ) -> Optional[ModelType]:
+        model = await self.get(db, id)
+        if not model:
+            self._throw_not_found_exception()
+        return model
+
+    async def _get_keyset_page(self, db: AsyncSession, filter_param: dict):
+        """Cursor pagination, see `CRUDBase._get_keyset_page`."""
+        keyset = get_keyset(self.model, filter_param.get("order_by"))
+        limit = filter_param.get("limit")
+        statement, params = self._keyset_select(filter_param)
+        try:
+            statement = apply_keyset(
+                statement, keyset, filter_param.get("cursor")
+            )
+        except ValueError as e:
+            raise HTTPException(422, str(e)) from None
+        result = await db.scalars(statement.limit(limit + 1), params)
+        return get_keyset_page(result.all(), keyset, limit)
+
+    def _keyset_select(self, filter_param: dict):
+        statement, params = self._select({**filter_param, "order_by": None})
+        return statement.where(self.model.deleted_at == None), params
+
+    def _select(self, filter_param: dict):
+        # (statement, params): the filter values are bound at execution
+        return compile_select(
+            model=self.model,
+            filter=filter_param.get("filter"),
+            order_by=filter_param.get("order_by"),
+            include=filter_param.get("include"),
+            join=filter_param.get("join"),
+        )
+
+    async def _apply(
+        self, db: AsyncSession, db_obj: ModelType, update_data: Dict[str, Any]
+    ) -> ModelType:
+        # Chỉ gán các cột của model, giống `CRUDBase.update`
+        for field in self.model.__table__.columns.keys():
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    def _throw_not_found_exception(self):
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, detail=f"{self.model.__name__} not found"
+        )
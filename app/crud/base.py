@@ -11,7 +11,14 @@ from sqlalchemy.orm import Session
 from app.common.string_case import decamelize
 from app.common.util import clone_model
 from app.db.base_class import Base
-from app.db.query_builder import get_count, get_filter, query_builder
+from app.db.count_strategy import get_total
+from app.db.query_builder import (
+    apply_keyset,
+    get_filter,
+    get_keyset,
+    get_keyset_page,
+    query_builder,
+)
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -42,6 +49,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> List[ModelType]:
         if filter_param is None:
             filter_param = {}
+        if filter_param.get("cursor") is not None:
+            return self._get_keyset_page(db, filter_param)[0]
+
         query = query_builder(
             db=db,
             model=self.model,
@@ -64,6 +74,17 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         filter_param: dict = None,
     ) -> List[ModelType]:
         print(self.model)
+        if filter_param.get("cursor") is not None:
+            results, next_cursor = self._get_keyset_page(db, filter_param)
+            query = self._keyset_query(db, filter_param)
+            total, exact = get_total(db, query, self.model, filter_param)
+            return {
+                "total": total,
+                "total_exact": exact,
+                "results": results,
+                "next_cursor": next_cursor,
+            }
+
         query = query_builder(
             db=db,
             model=self.model,
@@ -73,13 +94,42 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             join=filter_param.get("join"),
         )
         query = query.filter(self.model.deleted_at == None)
+        total, exact = get_total(db, query, self.model, filter_param)
         return {
-            "total": get_count(query),
+            "total": total,
+            "total_exact": exact,
             "results": query.offset(filter_param.get("skip"))
             .limit(filter_param.get("limit"))
             .all(),
         }
 
+    def _keyset_query(self, db: Session, filter_param: dict):
+        query = query_builder(
+            db=db,
+            model=self.model,
+            filter=filter_param.get("filter"),
+            include=filter_param.get("include"),
+            join=filter_param.get("join"),
+        )
+        return query.filter(self.model.deleted_at == None)
+
+    def _get_keyset_page(self, db: Session, filter_param: dict):
+        """
+        Cursor pagination: seek past the last row of the previous page
+        instead of OFFSET, so deep pages cost the same as the first one.
+        """
+        keyset = get_keyset(self.model, filter_param.get("order_by"))
+        limit = filter_param.get("limit")
+        try:
+            query = apply_keyset(
+                self._keyset_query(db, filter_param),
+                keyset,
+                filter_param.get("cursor"),
+            )
+        except ValueError as e:
+            raise HTTPException(422, str(e)) from None
+        return get_keyset_page(query.limit(limit + 1).all(), keyset, limit)
+
     def get_multi_ignore_deleted_and_inactive(
         self,
         db: Session,
@@ -105,11 +155,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def get_multi_not_paging(
         self,
         db: Session,
+        filter_param: dict = None,
     ) -> List[ModelType]:
         query = query_builder(db=db, model=self.model)
         query = query.filter(self.model.deleted_at == None)
+        total, exact = get_total(db, query, self.model, filter_param or {})
         return {
-            "total": get_count(query),
+            "total": total,
+            "total_exact": exact,
             "results": query.all(),
         }
 
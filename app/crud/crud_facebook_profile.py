@@ -0,0 +1,19 @@
+from app.crud.base import CRUDBase
+from app.models.facebook_profile import FacebookProfile
+from app.schema.facebook_profile_schema import (
+    FacebookProfileCreateSchema,
+    FacebookProfileUpdateSchema,
+)
+
+
+class CRUDFacebookProfile(
+    CRUDBase[
+        FacebookProfile,
+        FacebookProfileCreateSchema,
+        FacebookProfileUpdateSchema,
+    ]
+):
+    pass
+
+
+crud_facebook_profile = CRUDFacebookProfile(FacebookProfile)
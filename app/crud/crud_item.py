@@ -5,6 +5,7 @@ from typing import Any, List
 from sqlalchemy.orm import Session
 
 from app.common.client_filter import new_filter
+from app.crud.async_base import AsyncCRUDBase
 from app.crud.base import CRUDBase
 from app.models import Item
 from app.schema import ItemCreate, ItemUpdate
@@ -15,4 +16,10 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
     pass
 
 
+class AsyncCRUDItem(AsyncCRUDBase[Item, ItemCreate, ItemUpdate]):
+
+    pass
+
+
 crud_item = CRUDItem(Item)
+async_crud_item = AsyncCRUDItem(Item)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.common.enum.outbox_status import OutboxStatus
+from app.crud.base import CRUDBase
+from app.models.outbox_message import OutboxMessage
+from app.schema.outbox_message_schema import (
+    OutboxMessageCreateSchema,
+    OutboxMessageUpdateSchema,
+)
+
+
+class CRUDOutboxMessage(
+    CRUDBase[
+        OutboxMessage,
+        OutboxMessageCreateSchema,
+        OutboxMessageUpdateSchema,
+    ]
+):
+    def claim_batch(
+        self, db: Session, *, limit: int, lease: float
+    ) -> List[OutboxMessage]:
+        """
+        Lock up to `limit` due messages with `FOR UPDATE SKIP LOCKED`, so
+        concurrent workers never pick the same rows, and push their
+        `next_attempt_at` by `lease` seconds before committing. A worker that
+        dies mid-delivery therefore only delays the message by the lease.
+        """
+        now = datetime.now().astimezone()
+        rows = (
+            db.query(self.model)
+            .filter(
+                self.model.deleted_at == None,
+                self.model.status == OutboxStatus.PENDING.value,
+                self.model.next_attempt_at <= now,
+            )
+            .order_by(self.model.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = now + timedelta(seconds=lease)
+        db.commit()
+        return rows
+
+    def mark_sent(self, db: Session, *, id: any) -> None:
+        db.query(self.model).filter(self.model.id == id).update(
+            {
+                self.model.status: OutboxStatus.SENT.value,
+                self.model.last_error: None,
+                self.model.updated_at: datetime.now(),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def mark_failed(
+        self, db: Session, *, id: any, error: str, retry_in: float, dead: bool
+    ) -> None:
+        values = {
+            self.model.last_error: error,
+            self.model.updated_at: datetime.now(),
+        }
+        if dead:
+            values[self.model.status] = OutboxStatus.DEAD.value
+        else:
+            values[self.model.next_attempt_at] = datetime.now().astimezone() + (
+                timedelta(seconds=retry_in)
+            )
+        db.query(self.model).filter(self.model.id == id).update(
+            values, synchronize_session=False
+        )
+        db.commit()
+
+
+crud_outbox_message = CRUDOutboxMessage(OutboxMessage)
@@ -0,0 +1,26 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.page import Page
+from app.schema.page_schema import PageCreateSchema, PageUpdateSchema
+
+
+class CRUDPage(CRUDBase[Page, PageCreateSchema, PageUpdateSchema]):
+    def get_active(
+        self, db: Session, *, channel: str, page_id: str
+    ) -> Optional[Page]:
+        return (
+            db.query(self.model)
+            .filter(
+                self.model.deleted_at == None,
+                self.model.is_active == True,
+                self.model.channel == channel,
+                self.model.page_id == page_id,
+            )
+            .first()
+        )
+
+
+crud_page = CRUDPage(Page)
@@ -1,2 +1,2 @@
 from app.db.base_class import Base  # noqa
-from app.models import Item
+from app.models import FacebookProfile, Item, OutboxMessage, Page
@@ -0,0 +1,157 @@
+import json
+import threading
+from typing import Any, Optional, Tuple, Type
+
+from cachetools import TTLCache
+from sqlalchemy import Select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.common.enum import CountStrategy
+from app.core.config import settings
+from app.db.query_builder import get_count, get_count_statement
+
+# Totals per (table, normalized filter, join), see COUNT_STRATEGY=cached
+_count_cache: TTLCache = TTLCache(
+    maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL
+)
+# TTLCache is not thread-safe and sync endpoints run in the threadpool;
+# held for the get / set only, never around the COUNT itself
+_count_cache_lock = threading.Lock()
+
+_RELTUPLES = text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:t)")
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def get_total(
+    db: Session, query: Query, model: Type[Any], filter_param: dict
+) -> Tuple[int, bool]:
+    """
+    Total of a list request and whether it is exact, by the `count`
+    parameter (COUNT_STRATEGY by default):
+
+    * `exact`: COUNT(*) over the filtered rows.
+    * `estimated`: planner estimate, `pg_class.reltuples` without filters
+      and the EXPLAIN row estimate otherwise; exact on other databases.
+    * `cached`: COUNT(*) cached per normalized filter for COUNT_CACHE_TTL.
+
+    Estimates also include soft-deleted rows when there is no filter.
+    """
+    strategy = _strategy(filter_param)
+    if strategy == CountStrategy.ESTIMATED and _is_postgres(db):
+        if _is_unfiltered(filter_param):
+            estimate = _reltuples(db.execute(_RELTUPLES, {"t": _table(model)}))
+            if estimate is not None:
+                return estimate, False
+        plan = db.execute(_Explain(query.statement)).scalar()
+        return _plan_rows(plan), False
+
+    if strategy == CountStrategy.CACHED:
+        key = count_cache_key(model, filter_param)
+        with _count_cache_lock:
+            total = _count_cache.get(key)
+        if total is not None:
+            return total, False
+        total = get_count(query)
+        with _count_cache_lock:
+            _count_cache[key] = total
+        return total, True
+
+    return get_count(query), True
+
+
+async def get_total_async(
+    db: AsyncSession,
+    statement: Select,
+    model: Type[Any],
+    filter_param: dict,
+    params: Optional[dict] = None,
+) -> Tuple[int, bool]:
+    """`get_total` for an `AsyncSession`, `params` are bound at execution."""
+    strategy = _strategy(filter_param)
+    if strategy == CountStrategy.ESTIMATED and _is_postgres(db):
+        if _is_unfiltered(filter_param):
+            result = await db.execute(_RELTUPLES, {"t": _table(model)})
+            estimate = _reltuples(result)
+            if estimate is not None:
+                return estimate, False
+        result = await db.execute(_Explain(statement), params)
+        return _plan_rows(result.scalar()), False
+
+    if strategy == CountStrategy.CACHED:
+        key = count_cache_key(model, filter_param)
+        with _count_cache_lock:
+            total = _count_cache.get(key)
+        if total is not None:
+            return total, False
+        total = await db.scalar(get_count_statement(statement), params)
+        with _count_cache_lock:
+            _count_cache[key] = total
+        return total, True
+
+    return await db.scalar(get_count_statement(statement), params), True
+
+
+def count_cache_key(model: Type[Any], filter_param: dict) -> Tuple[str, ...]:
+    return (
+        _table(model),
+        _normalize(filter_param.get("filter")),
+        _normalize(filter_param.get("join")),
+    )
+
+
+def _strategy(filter_param: dict) -> CountStrategy:
+    return CountStrategy(filter_param.get("count") or settings.COUNT_STRATEGY)
+
+
+def _is_postgres(db: Any) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _is_unfiltered(filter_param: dict) -> bool:
+    return _normalize(filter_param.get("filter")) == "{}" and _normalize(
+        filter_param.get("join")
+    ) in ("{}", "null")
+
+
+def _normalize(value: Optional[str]) -> str:
+    # Cùng một filter nhưng khác thứ tự key / khoảng trắng là một key
+    if value is None:
+        return "{}"
+    try:
+        return json.dumps(
+            json.loads(value), sort_keys=True, separators=(",", ":")
+        )
+    except ValueError:
+        return value
+
+
+def _table(model: Type[Any]) -> str:
+    return model.__tablename__
+
+
+def _reltuples(result) -> Optional[int]:
+    reltuples = result.scalar()
+    # -1 until the table has been vacuumed / analyzed
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
+
+
+def _plan_rows(plan: Any) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
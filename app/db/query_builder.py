@@ -1,11 +1,40 @@
+import base64
+import binascii
 import json
-from typing import Type, TypeVar
+import operator
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import sqlalchemy
-from sqlalchemy import and_, func, or_
-from sqlalchemy.orm import Session, selectinload
+from fastapi import HTTPException
+from sqlalchemy import (
+    Select,
+    and_,
+    bindparam,
+    func,
+    inspect,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.orm import Session, configure_mappers, selectinload
 from sqlalchemy.sql.expression import cast
 
+from app.common.metrics import metrics_registry
+from app.core.config import settings
 from app.db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -64,35 +93,219 @@ def query_builder(
     include: str = None,
     join: str = None,
 ):
-    query = db.query(model)
+    key, params = _compile_key(model, filter, order_by, include, join)
+    query = _apply(db.query(model), *_compile_clauses(*key))
+    # Query keeps the values aside and binds them at execution
+    return query.params(params) if params else query
 
-    if join is not None:
-        for table in get_join_table(json.loads(join)):
-            query = query.join(getattr(model, table))
 
-    if filter is not None:
-        filter = get_filter(model, json.loads(filter))
-        query = query.filter(filter)
+def compile_select(
+    model: Type[ModelType],
+    filter: str = None,
+    order_by: str = None,
+    include: str = None,
+    join: str = None,
+) -> Tuple[Select, Dict[str, Any]]:
+    """
+    Cached statement of the query shape and the filter values, to pass at
+    execution: `session.scalars(statement, params)`. The values are not
+    bound with `Select.params()`, which copies the whole statement.
+    """
+    key, params = _compile_key(model, filter, order_by, include, join)
+    return _compile_select(*key), params
+
+
+# Compiled filters
+# Every list request used to rebuild its WHERE / JOIN / ORDER BY from the
+# JSON. The clauses are now built once per query shape (model, filter
+# structure, order_by, join, include) with a bindparam in place of each
+# filter value, and a request only parses its JSON and fills the values:
+# filter={"title__like":"a", "id__gte":1}
+# --->>>   shape ("and", (), (("title__like", ("param", 0)),
+#                             ("id__gte", ("param", 1))))
+#          params {"qb_0": "%a%", "qb_1": 1}
+
+_NO_FILTER = ("none",)
+
+def _compile_key(model, filter, order_by, include, join):
+    values = []
+    shape = (
+        _NO_FILTER
+        if filter is None
+        else _filter_shape(json.loads(filter), values)
+    )
+    joins = (
+        tuple(get_join_table(json.loads(join))) if join is not None else None
+    )
+    params = {f"qb_{i}": value for i, value in enumerate(values)}
+    return (model, shape, order_by, include, joins), params
+
+
+def _filter_shape(filters, values: List[Any]):
+    if isinstance(filters, list):
+        return ("or", tuple(_filter_shape(f, values) for f in filters))
 
-    if include is not None:
-        include = get_include(include)
+    if isinstance(filters, dict):
+        sub_filters = tuple(
+            _filter_shape(value, values)
+            for key, value in filters.items()
+            if key.isnumeric()
+        )
+        conditions = tuple(
+            (key, _value_shape(key, value, values))
+            for key, value in filters.items()
+            if not key.isnumeric()
+        )
+        return ("and", sub_filters, conditions)
+    return None
+
+
+def _value_shape(key: str, value: Any, values: List[Any]):
+    # Values which change the SQL itself (IS NULL / IS NOT NULL) stay in
+    # the shape instead of becoming a bindparam
+    op = key.partition("__")[2]
+    if op == "isnull":
+        return ("literal", value == True)
+    if op in ("like", "ilike"):
+        values.append(f"%{value}%")
+        return ("param", len(values) - 1)
+    if value is None or (op in ("is", "isn") and isinstance(value, bool)):
+        return ("literal", value)
+
+    index = len(values)
+    if op in ("in", "nin"):
+        values.append(value)
+        return ("expanding", index)
+    if op == "between":
+        values.extend(value)
+        return ("between", index, len(value))
+    values.append(value)
+    return ("param", index)
+
+
+def _bind_value(value_shape):
+    kind = value_shape[0]
+    if kind == "literal":
+        return value_shape[1]
+    if kind == "expanding":
+        return bindparam(f"qb_{value_shape[1]}", expanding=True)
+    if kind == "between":
+        _, index, count = value_shape
+        return [bindparam(f"qb_{i}") for i in range(index, index + count)]
+    return bindparam(f"qb_{value_shape[1]}")
+
+
+def _compile_filter(model, shape):
+    if shape is None:
+        return None
+    if shape[0] == "or":
+        return or_(*[_compile_filter(model, s) for s in shape[1]])
+    _, sub_filters, conditions = shape
+    return and_(
+        *[_compile_filter(model, s) for s in sub_filters],
+        *[_get_op(model, key, _bind_value(v)) for key, v in conditions],
+    )
+
+
+@lru_cache(maxsize=settings.QUERY_CACHE_SIZE)
+def _compile_clauses(model, shape, order_by, include, joins):
+    return (
+        [get_relationship(model, table)[0] for table in joins or ()],
+        _NO_FILTER if shape == _NO_FILTER else _compile_filter(model, shape),
+        get_include(model, include) if include is not None else [],
+        get_order_by(model, order_by) if order_by is not None else [],
+    )
+
+
+@lru_cache(maxsize=settings.QUERY_CACHE_SIZE)
+def _compile_select(model, shape, order_by, include, joins) -> Select:
+    # A Select is not bound to a session, so the whole statement is kept
+    clauses = _compile_clauses(model, shape, order_by, include, joins)
+    return _apply(select(model), *clauses)
+
+
+def _apply(query, joins, filter, include, order_by):
+    # Query and Select share join/filter/options/order_by
+    for relationship in joins:
+        query = query.join(relationship)
+    if filter is not _NO_FILTER:
+        query = query.filter(filter)
+    if include:
         query = query.options(*include)
-
-    if order_by is not None:
-        order_by = get_order_by(model, order_by)
+    if order_by:
         query = query.order_by(*order_by)
     return query
 
 
-def get_class_by_tablename(tablename):
-    """Return class reference mapped to table.
+def query_cache_info() -> dict:
+    # Query (sync) reads _compile_clauses, Select (async) _compile_select
+    return {
+        name: {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+        }
+        for name, info in (
+            ("clauses", _compile_clauses.cache_info()),
+            ("select", _compile_select.cache_info()),
+        )
+    }
 
-    :param tablename: String with name of table.
-    :return: Class reference or None.
-    """
-    for c in Base._decl_class_registry.values():
-        if hasattr(c, "__tablename__") and c.__tablename__ == tablename:
-            return c
+
+metrics_registry.register("query_builder_cache", query_cache_info)
+
+
+# Column / relationship index
+# Filters, joins, includes and order_by resolve names through a per-model
+# index built once at startup; an unknown name is a 422.
+# filter={"b.id__gte": 1}  --->>>  relationships["b"] -> B, B.columns["id"]
+
+
+class ModelIndex:
+    __slots__ = ("columns", "relationships")
+
+    def __init__(self, mapper):
+        model = mapper.class_
+        self.columns = {
+            key: getattr(model, key) for key in mapper.column_attrs.keys()
+        }
+        # name -> (attribute, target model)
+        self.relationships = {
+            rel.key: (getattr(model, rel.key), rel.mapper.class_)
+            for rel in mapper.relationships
+        }
+
+
+_model_index: Dict[type, ModelIndex] = {}
+
+
+def build_model_index() -> None:
+    configure_mappers()
+    for mapper in Base.registry.mappers:
+        _model_index[mapper.class_] = ModelIndex(mapper)
+
+
+def get_model_index(model: Type[ModelType]) -> ModelIndex:
+    index = _model_index.get(model)
+    if index is None:
+        # Model ngoài registry của Base (BaseMTM, ...) thì index khi gặp
+        index = _model_index[model] = ModelIndex(inspect(model))
+    return index
+
+
+def get_column(model: Type[ModelType], name: str):
+    column = get_model_index(model).columns.get(name)
+    if column is None:
+        raise HTTPException(422, f"Unknown column: {name}")
+    return column
+
+
+def get_relationship(model: Type[ModelType], name: str):
+    relationship = get_model_index(model).relationships.get(name)
+    if relationship is None:
+        raise HTTPException(422, f"Unknown relationship: {name}")
+    return relationship
 
 
 def get_join_table(join):
@@ -123,8 +336,17 @@ def get_count(query):
     return query.with_entities(func.count()).scalar()
 
 
-def get_include(include):
-    return [selectinload(rlt) for rlt in include.split(",")]
+def get_count_statement(statement: Select) -> Select:
+    return select(func.count()).select_from(
+        statement.order_by(None).subquery()
+    )
+
+
+def get_include(model, include):
+    return [
+        selectinload(get_relationship(model, rlt)[0])
+        for rlt in include.split(",")
+    ]
 
 
 def get_order_by(model, order_by):
@@ -133,48 +355,150 @@ def get_order_by(model, order_by):
 
 def get_attr_order(model, attr):
     if attr.startswith("-"):
-        return getattr(model, attr[1:]).desc()
-    return getattr(model, attr).asc()
+        return get_column(model, attr[1:]).desc()
+    return get_column(model, attr).asc()
+
+
+# Keyset (cursor) pagination
+# orderBy="-created_at" , cursor=<nextCursor of the previous page>
+# --->>>   SELECT * FROM items WHERE (created_at, id) < (:c, :i)
+#          ORDER BY created_at DESC, id DESC LIMIT :limit
+
+Keyset = List[Tuple[Any, bool]]
+
+
+def get_keyset(model: Type[ModelType], order_by: Optional[str]) -> Keyset:
+    """(column, descending) pairs, `id` last so the order is total."""
+    attrs = order_by.split(",") if order_by else ["created_at"]
+    keyset = [
+        (get_column(model, attr.lstrip("-")), attr.startswith("-"))
+        for attr in attrs
+    ]
+    if not any(column.key == "id" for column, _ in keyset):
+        keyset.append((model.id, keyset[-1][1]))
+    return keyset
+
+
+def apply_keyset(query, keyset: Keyset, cursor: Optional[str]):
+    """Order by the keyset and start after `cursor`; ValueError if the
+    cursor is invalid."""
+    query = query.order_by(
+        *[column.desc() if desc else column.asc() for column, desc in keyset]
+    )
+    if cursor:
+        query = query.filter(
+            get_keyset_filter(keyset, decode_cursor(cursor, keyset))
+        )
+    return query
+
+
+def get_keyset_filter(keyset: Keyset, values: Sequence[Any]):
+    if len({desc for _, desc in keyset}) == 1:
+        # Same direction everywhere: one row-value comparison, which
+        # Postgres serves from a (created_at, id) index
+        columns = tuple_(*[column for column, _ in keyset])
+        bounds = tuple_(
+            *[
+                literal(value, column.type)
+                for (column, _), value in zip(keyset, values)
+            ]
+        )
+        return columns < bounds if keyset[0][1] else columns > bounds
+
+    # Mixed directions: (a > x) OR (a = x AND b < y) OR ...
+    clauses = []
+    for i, (column, desc) in enumerate(keyset):
+        equal = [c == v for (c, _), v in zip(keyset[:i], values[:i])]
+        after = column < values[i] if desc else column > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+def get_keyset_page(
+    rows: List[Any], keyset: Keyset, limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """Rows fetched with `limit + 1`, trimmed, and the cursor of the next
+    page (None on the last page)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1], keyset)
+
+
+def encode_cursor(row: Any, keyset: Keyset) -> str:
+    values = [_cursor_value(getattr(row, column.key)) for column, _ in keyset]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keyset: Keyset) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keyset):
+            raise ValueError
+        return [
+            _python_value(column, value)
+            for (column, _), value in zip(keyset, values)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor") from None
+
+
+def _cursor_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    return value
+
+
+def _python_value(column, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type in (uuid.UUID, Decimal, int, float, str):
+        return python_type(value)
+    return value
+
+
+# filter suffix -> operator, `column__<op>`; no suffix is equality
+_OPS = {
+    "": operator.eq,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gte": operator.ge,
+    "gt": operator.gt,
+    "neq": operator.ne,
+    "like": lambda c, v: cast(c, sqlalchemy.String).like(v),
+    "ilike": lambda c, v: cast(c, sqlalchemy.String).ilike(v),
+    "in": lambda c, v: c.in_(v),
+    "nin": lambda c, v: ~c.in_(v),
+    "is": lambda c, v: c.is_(v),
+    "isn": lambda c, v: c.isnot(v),
+    "between": lambda c, v: c.between(*v),
+    "isnull": lambda c, v: c.is_(None) if v == True else c.isnot(None),
+}
 
 
 def get_op(model: Type[ModelType], key: str, value: str):
-    column = key.split("__")[0]
-
-    if "." in key:
-        column = column.split(".")[1]
-        sub_key = key.split(".")[0]
-        ref_instance = getattr(model, sub_key)
-        instance_table_name = ref_instance.property.entity.mapped_table.name
-        model = get_class_by_tablename(instance_table_name)
-
-    op = getattr(model, column) == value
-    if key.endswith("__lt"):
-        op = getattr(model, column) < value
-    if key.endswith("__lte"):
-        op = getattr(model, column) <= value
-    if key.endswith("__gte"):
-        op = getattr(model, column) >= value
-    if key.endswith("__gt"):
-        op = getattr(model, column) > value
-    if key.endswith("__neq"):
-        op = getattr(model, column) != value
-    if key.endswith("__like"):
-        op = cast(getattr(model, column), sqlalchemy.String).like(f"%{value}%")
-    if key.endswith("__ilike"):
-        op = cast(getattr(model, column), sqlalchemy.String).ilike(f"%{value}%")
-    if key.endswith("__in"):
-        op = getattr(model, column).in_(value)
-    if key.endswith("__nin"):
-        op = ~getattr(model, column).in_(value)
-    if key.endswith("__is"):
-        op = getattr(model, column).is_(value)
-    if key.endswith("__isn"):
-        op = getattr(model, column).isnot(value)
-    if key.endswith("__between"):
-        op = getattr(model, column).between(*value)
-    if key.endswith("__isnull"):
-        if value == True:
-            op = getattr(model, column).is_(None)
-        else:
-            op = getattr(model, column).isnot(None)
-    return op
+    if key.partition("__")[2] in ("like", "ilike"):
+        value = f"%{value}%"
+    return _get_op(model, key, value)
+
+
+def _get_op(model: Type[ModelType], key: str, value: Any):
+    # `value` may be a bindparam, like/ilike patterns come already wrapped
+    column, _, op = key.partition("__")
+    op_func = _OPS.get(op)
+    if op_func is None:
+        raise HTTPException(422, f"Unknown filter operator: {op}")
+
+    if "." in column:
+        relationship, column = column.split(".", 1)
+        model = get_relationship(model, relationship)[1]
+    return op_func(get_column(model, column), value)
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
@@ -7,3 +8,16 @@ engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URI.unicode_string(), pool_pre_ping=True
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Same database through asyncpg, for code running on the event loop
+async_engine = create_async_engine(
+    settings.SQLALCHEMY_DATABASE_URI.unicode_string().replace(
+        "postgresql://", "postgresql+asyncpg://", 1
+    ),
+    pool_pre_ping=True,
+    pool_size=settings.DB_ASYNC_POOL_SIZE,
+    max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
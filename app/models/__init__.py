@@ -1,2 +1,5 @@
+from .facebook_profile import FacebookProfile
 from .item import Item
+from .outbox_message import OutboxMessage
+from .page import Page
 from .users import Users
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String
+
+from app.db.base_class import Base
+
+
+class FacebookProfile(Base):
+    psid = Column(String, unique=True, index=True, nullable=False)
+    first_name = Column(String, nullable=True)
+    last_name = Column(String, nullable=True)
+    profile_pic = Column(String, nullable=True)
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.common.enum.outbox_status import OutboxStatus
+from app.db.base_class import Base
+
+
+class OutboxMessage(Base):
+    kind = Column(String, nullable=False)
+    recipient_id = Column(String, index=True, nullable=True)
+    payload = Column(JSONB, nullable=False)
+    status = Column(
+        String, index=True, nullable=False, default=OutboxStatus.PENDING.value
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=8)
+    next_attempt_at = Column(
+        DateTime(timezone=True), index=True, default=datetime.now
+    )
+    last_error = Column(Text, nullable=True)
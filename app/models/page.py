@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, UniqueConstraint
+
+from app.db.base_class import Base
+
+
+class Page(Base):
+    __table_args__ = (UniqueConstraint("channel", "page_id"),)
+
+    # Facebook page id / Zalo OA id, the `recipient.id` of incoming events
+    page_id = Column(String, index=True, nullable=False)
+    channel = Column(String, nullable=False, default="facebook")
+    store_id = Column(String, nullable=False)
+    access_token = Column(String, nullable=True)
+    ai_url = Column(String, nullable=True)
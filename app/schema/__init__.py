@@ -1,2 +1,5 @@
+from .facebook_profile_schema import FacebookProfileCreateSchema, FacebookProfileUpdateSchema
 from .item import Item, ItemCreate, Items, ItemUpdate
+from .outbox_message_schema import OutboxMessageCreateSchema, OutboxMessageUpdateSchema
+from .page_schema import PageCreateSchema, PageUpdateSchema
 from .user_schema import UserSignUpSchema, UserSignInSchema , UserCreateSchema, UserInDBSchema, UserUpdateSchema
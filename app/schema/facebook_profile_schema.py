@@ -0,0 +1,30 @@
+import uuid
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.schema._soft_delete_schema import SoftDeleteSchema
+
+
+class FacebookProfileBaseSchema(BaseModel):
+    psid: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    profile_pic: Optional[str] = None
+
+
+class FacebookProfileCreateSchema(FacebookProfileBaseSchema):
+    pass
+
+
+class FacebookProfileUpdateSchema(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    profile_pic: Optional[str] = None
+
+
+class FacebookProfileInDBSchema(FacebookProfileBaseSchema, SoftDeleteSchema):
+    id: uuid.UUID
+
+    class Config:
+        from_attributes = True
@@ -38,4 +38,12 @@ class Item(ItemInDBBase):
 
 class Items(BaseModel):
     total: int
+    # False when `total` is a planner estimate or a cached count
+    total_exact: bool = True
     results: List[Item]
+    # Set in cursor mode while more rows follow
+    next_cursor: Optional[str] = None
+
+    class Config:
+        alias_generator = to_camel_case
+        populate_by_name = True
@@ -0,0 +1,36 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from app.schema._soft_delete_schema import SoftDeleteSchema
+
+
+class OutboxMessageBaseSchema(BaseModel):
+    kind: str
+    recipient_id: Optional[str] = None
+    payload: Dict[str, Any]
+
+
+class OutboxMessageCreateSchema(OutboxMessageBaseSchema):
+    max_attempts: int
+
+
+class OutboxMessageUpdateSchema(BaseModel):
+    status: Optional[str] = None
+    attempts: Optional[int] = None
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+
+class OutboxMessageInDBSchema(OutboxMessageBaseSchema, SoftDeleteSchema):
+    id: uuid.UUID
+    status: str
+    attempts: int
+    max_attempts: int
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
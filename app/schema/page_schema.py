@@ -0,0 +1,31 @@
+import uuid
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.schema._soft_delete_schema import SoftDeleteSchema
+
+
+class PageBaseSchema(BaseModel):
+    page_id: str
+    channel: str = "facebook"
+    store_id: str
+    access_token: Optional[str] = None
+    ai_url: Optional[str] = None
+
+
+class PageCreateSchema(PageBaseSchema):
+    pass
+
+
+class PageUpdateSchema(BaseModel):
+    store_id: Optional[str] = None
+    access_token: Optional[str] = None
+    ai_url: Optional[str] = None
+
+
+class PageInDBSchema(PageBaseSchema, SoftDeleteSchema):
+    id: uuid.UUID
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,53 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Mapping, Optional
+
+from app.services.impl.webhook_events import MessagingEvent
+
+
+class ChannelAdapter(ABC):
+    """
+    What the shared conversation pipeline needs from a messaging channel:
+    turning a webhook request into events, and talking back to a user.
+    Everything in between (queue, dedup, debounce, AI) is channel-agnostic.
+    """
+
+    name: str
+
+    @abstractmethod
+    def verify_request(
+        self, raw_body: bytes, headers: Mapping[str, str]
+    ) -> bool:
+        """Check the webhook signature, True when no secret is configured."""
+        pass
+
+    @abstractmethod
+    def parse_events(self, raw_body: bytes) -> List[MessagingEvent]:
+        """Parse a raw webhook body, raise ValueError when it is not valid."""
+        pass
+
+    @abstractmethod
+    async def send_message(
+        self,
+        user_id: str,
+        message: Dict[str, Any],
+        page_id: Optional[str] = None,
+    ) -> None:
+        """Send a Messenger-shaped message (e.g. `{"text": ...}`) from
+        `page_id` (the configured default page when None), raise on
+        failure."""
+        pass
+
+    async def send_typing(
+        self, user_id: str, action: str, page_id: Optional[str] = None
+    ) -> None:
+        """Typing indicator, a no-op for channels without one."""
+        pass
+
+    @abstractmethod
+    async def get_user_profile(
+        self, user_id: str, page_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        pass
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+from app.services.abc.channel_adapter import ChannelAdapter
+from app.services.abc.debounce_store import PendingBuffer
+from app.services.impl.webhook_events import MessagingEvent
+
+
+class ConversationEngine(ABC):
+    """
+    Channel-agnostic conversation pipeline:
+    normalize -> dedupe -> buffer -> AI -> render -> send.
+    """
+
+    @abstractmethod
+    async def receive(
+        self, channel: ChannelAdapter, request: Request
+    ) -> Response:
+        """Normalize a webhook request and queue its events."""
+        pass
+
+    @abstractmethod
+    async def handle_event(self, sender_id: str, event: MessagingEvent) -> None:
+        """Dedupe an event and buffer it (or answer a postback)."""
+        pass
+
+    @abstractmethod
+    async def flush(self, conversation: str, pending: PendingBuffer) -> None:
+        """Ask the AI about a debounced buffer and send the reply."""
+        pass
+
+    @abstractmethod
+    async def send_reply(
+        self, conversation: str, message: Dict[str, Any]
+    ) -> None:
+        pass
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
@@ -0,0 +1,54 @@
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Optional
+
+
+class PendingBuffer(NamedTuple):
+    messages: List[str]
+    started_at: float
+    # Increases on every take, identifies this snapshot of the buffer
+    generation: int = 0
+
+
+class DebounceStore(ABC):
+    """
+    Holds the messages a sender is still typing, until their flush deadline.
+
+    Deadlines are wall-clock timestamps so that a shared backend can be used
+    by several worker processes. `take` snapshots and swaps the buffer in one
+    atomic step: only one caller gets a given buffer, and messages arriving
+    afterwards start a new generation that never mixes with the one being
+    flushed.
+    """
+
+    @abstractmethod
+    async def append(
+        self, key: str, message: str, received_at: float, deadline: float
+    ) -> int:
+        """Buffer `message` and (re)arm the flush deadline, return the size."""
+        pass
+
+    @abstractmethod
+    async def take(self, key: str, now: float) -> Optional[PendingBuffer]:
+        """Remove and return the buffer if its deadline is due, else None."""
+        pass
+
+    @abstractmethod
+    async def restore(
+        self, key: str, pending: PendingBuffer, deadline: float
+    ) -> None:
+        """Put back a taken buffer that could not be flushed, ahead of any
+        message received since."""
+        pass
+
+    @abstractmethod
+    async def due(self, now: float, limit: int = 100) -> List[str]:
+        """Return keys whose deadline has passed."""
+        pass
+
+    @abstractmethod
+    async def next_deadline(self) -> Optional[float]:
+        """Return the earliest pending deadline, None when nothing is buffered."""
+        pass
+
+    async def close(self) -> None:
+        pass
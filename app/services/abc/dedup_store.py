@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+
+class DedupStore(ABC):
+    """
+    Remembers idempotency keys of webhook events for a bounded time, so a
+    redelivered event can be recognised and dropped.
+    """
+
+    @abstractmethod
+    async def add(self, key: str, now: float) -> bool:
+        """Record `key`, return False when it was already seen."""
+        pass
+
+    def metrics(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+
+from fastapi import Request
+
+
+class ZaloOAService(ABC):
+    @abstractmethod
+    async def post_webhook(
+        self,
+        request: Request,
+    ) -> str:
+        pass
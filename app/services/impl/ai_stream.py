@@ -0,0 +1,130 @@
+import re
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+import orjson
+
+class StreamInterruptedError(Exception):
+    """The AI stream failed after part of the reply was already sent."""
+
+
+# End of a sentence: terminal punctuation (optionally closed by a quote or
+# bracket) followed by whitespace, or a line break
+_SENTENCE_END = re.compile(r"(?<=[.!?…])[\"')\]]*\s+|\n+")
+
+
+class SentenceSplitter:
+    """
+    Turns a stream of text deltas into sentence-sized chunks. Sentences
+    shorter than `min_chars` are glued to the next one so a reply is not
+    sent as a burst of tiny messages; text without any boundary is cut at a
+    space once it reaches `max_chars`.
+    """
+
+    def __init__(self, min_chars: int = 40, max_chars: int = 2000):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        chunks = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            end = match.end()
+            if len(self._buffer[start:end].strip()) < self.min_chars:
+                continue
+            chunks.append(self._buffer[start:end].strip())
+            start = end
+        self._buffer = self._buffer[start:]
+
+        while len(self._buffer) >= self.max_chars:
+            cut = self._buffer.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                cut = self.max_chars
+            chunks.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:].lstrip()
+        return chunks
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+async def iter_sse_data(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """`data` payloads of a Server-Sent Events stream, one per event."""
+    data: List[str] = []
+    async for line in lines:
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
+
+
+def _is_json_frame(data: str) -> bool:
+    try:
+        return isinstance(orjson.loads(data), (dict, str))
+    except orjson.JSONDecodeError:
+        return False
+
+
+def _delta_text(data: str) -> str:
+    """
+    Text of one event of a JSON stream: the text field of an object or a
+    JSON string. Anything else (a token such as "2024" or "true" that
+    happens to be valid JSON) is kept as it was sent.
+    """
+    try:
+        payload = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return data
+    if isinstance(payload, dict):
+        for key in ("delta", "token", "content", "response", "text"):
+            if isinstance(payload.get(key), str):
+                return payload[key]
+        return ""
+    return payload if isinstance(payload, str) else data
+
+
+async def stream_ai_reply(
+    client: httpx.AsyncClient, path: str, messages: Dict[str, Any]
+) -> AsyncIterator[str]:
+    """
+    Ask the AI backend for a streamed reply and yield text deltas as they
+    arrive. Handles SSE (`text/event-stream`), plain chunked text, and falls
+    back to a regular JSON answer from a backend that does not stream.
+    """
+    async with client.stream(
+        "POST",
+        path,
+        json={**messages, "stream": True},
+        headers={"Accept": "text/event-stream"},
+    ) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "")
+
+        if content_type.startswith("text/event-stream"):
+            # JSON events or plain text, decided once from the first event
+            json_events = None
+            async for data in iter_sse_data(response.aiter_lines()):
+                if data.strip() == "[DONE]":
+                    break
+                if json_events is None:
+                    json_events = _is_json_frame(data)
+                delta = _delta_text(data) if json_events else data
+                if delta:
+                    yield delta
+        elif content_type.startswith("application/json"):
+            body = orjson.loads(await response.aread())
+            yield body.get("response", "Không có phản hồi từ API.")
+        else:
+            async for delta in response.aiter_text():
+                yield delta
@@ -0,0 +1,44 @@
+from typing import Dict, Optional, Tuple
+
+from app.services.abc.channel_adapter import ChannelAdapter
+
+
+def conversation_key(
+    channel: str, user_id: str, page_id: Optional[str] = None
+) -> str:
+    # User ids are page-scoped (PSID), the page is part of the conversation
+    return f"{channel}:{page_id or ''}:{user_id}"
+
+
+def split_conversation_key(key: str) -> Tuple[str, Optional[str], str]:
+    """(channel, page id or None, user id)"""
+    channel, rest = key.split(":", 1)
+    if ":" not in rest:
+        # "channel:user_id", written before keys carried the page
+        return channel, None, rest
+    page_id, user_id = rest.split(":", 1)
+    return channel, page_id or None, user_id
+
+
+class ChannelRegistry:
+    def __init__(self):
+        self._channels: Dict[str, ChannelAdapter] = {}
+
+    def register(self, channel: ChannelAdapter) -> None:
+        self._channels[channel.name] = channel
+
+    def get(self, name: str) -> ChannelAdapter:
+        channel = self._channels.get(name)
+        if channel is None:
+            raise KeyError(f"Channel {name} is not registered")
+        return channel
+
+    def names(self):
+        return list(self._channels)
+
+    async def close(self) -> None:
+        for channel in self._channels.values():
+            await channel.close()
+
+
+channel_registry = ChannelRegistry()
@@ -0,0 +1,602 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from app.common.circuit_breaker import CircuitBreaker
+from app.common.http_client import AI_BACKEND, http_clients
+from app.common.logger import setup_logger
+from app.common.metrics import LatencyTracker, StageTimer, metrics_registry
+from app.common.stage import Stage, StageFullError
+from app.common.work_queue import QueueFullError, WorkQueue
+from app.core.config import settings
+from app.services.abc.channel_adapter import ChannelAdapter
+from app.services.abc.conversation_engine import ConversationEngine
+from app.services.abc.debounce_store import DebounceStore, PendingBuffer
+from app.services.impl.ai_stream import (
+    SentenceSplitter,
+    StreamInterruptedError,
+    stream_ai_reply,
+)
+from app.services.impl.channel_registry import (
+    ChannelRegistry,
+    channel_registry,
+    conversation_key,
+    split_conversation_key,
+)
+from app.services.impl.debounce_policy import DebouncePolicy
+from app.services.impl.debounce_scheduler import DebounceScheduler
+from app.services.impl.debounce_store_impl import build_debounce_store
+from app.services.impl.dedup_store_impl import build_dedup_store
+from app.services.impl.outbox_worker import OutboxWorker
+from app.services.impl.page_registry import (
+    PageConfig,
+    PageRegistry,
+    page_registry,
+)
+from app.services.impl.response_cache import ResponseCache
+from app.services.impl.send_dispatcher import is_permanent_send_error
+from app.services.impl.typing_indicator import TypingIndicator
+from app.services.impl.webhook_dedup import WebhookDeduplicator
+from app.services.impl.webhook_dispatcher import WebhookDispatcher
+from app.services.impl.webhook_events import MessagingEvent
+
+logger = setup_logger()
+
+NORMALIZE = "normalize"
+DEDUPE = "dedupe"
+BUFFER = "buffer"
+AI = "ai"
+RENDER = "render"
+SEND = "send"
+
+OUTBOX_CHANNEL_SEND = "channel_send"
+OUTBOX_AI_CHAT = "ai_chat"
+
+
+class ConversationEngineImpl(ConversationEngine):
+    """
+    Every stage runs through its own `Stage`, so its concurrency can be
+    tuned (STAGE_*_CONCURRENCY) and its latency is reported separately.
+    Channels only parse webhooks and deliver messages; everything else is
+    shared.
+    """
+
+    def __init__(
+        self,
+        channels: ChannelRegistry,
+        deduplicator: WebhookDeduplicator,
+        debounce_store: DebounceStore,
+        debounce_policy: DebouncePolicy,
+        pages: PageRegistry,
+        stage_concurrency: Dict[str, int],
+        stage_max_waiting: Optional[Dict[str, int]] = None,
+        response_cache: Optional[ResponseCache] = None,
+        max_message_length: int = 2000,
+    ):
+        self.channels = channels
+        self.deduplicator = deduplicator
+        self.debounce_store = debounce_store
+        self.debounce_policy = debounce_policy
+        self.pages = pages
+        self.response_cache = response_cache
+        self.max_message_length = max_message_length
+        self.stages = {
+            name: Stage(
+                name,
+                stage_concurrency[name],
+                max_waiting=(stage_max_waiting or {}).get(name),
+            )
+            for name in (NORMALIZE, DEDUPE, BUFFER, AI, RENDER, SEND)
+        }
+        # Khi AI lỗi liên tục thì trả lỗi ngay, không để request chồng chất
+        self.ai_breaker = CircuitBreaker(
+            name=AI_BACKEND,
+            failure_rate=settings.AI_BREAKER_FAILURE_RATE,
+            window=settings.AI_BREAKER_WINDOW,
+            min_calls=settings.AI_BREAKER_MIN_CALLS,
+            reset_timeout=settings.AI_BREAKER_RESET_TIMEOUT,
+            half_open_calls=settings.AI_BREAKER_HALF_OPEN_CALLS,
+            # Stage AI đầy là do mình, không phải do backend
+            excluded=(StageFullError,),
+        )
+
+        self.dispatcher = WebhookDispatcher(
+            handler=self.handle_event,
+            concurrency=settings.WEBHOOK_SENDER_CONCURRENCY,
+        )
+        self.queue = WorkQueue(
+            name="webhook",
+            handler=self.dispatcher.dispatch,
+            maxsize=settings.WEBHOOK_QUEUE_MAXSIZE,
+            workers=settings.WEBHOOK_QUEUE_WORKERS,
+            put_timeout=settings.WEBHOOK_QUEUE_PUT_TIMEOUT,
+        )
+        # Một task nền duy nhất gửi buffer của mọi hội thoại khi đến hạn
+        self.scheduler = DebounceScheduler(
+            store=debounce_store,
+            flush=self.flush,
+            batch_size=settings.DEBOUNCE_BATCH_SIZE,
+            max_concurrent_flushes=settings.DEBOUNCE_MAX_CONCURRENT_FLUSHES,
+            poll_interval=settings.DEBOUNCE_POLL_INTERVAL,
+        )
+        self.outbox = OutboxWorker(
+            handlers={
+                OUTBOX_CHANNEL_SEND: self._retry_channel_send,
+                OUTBOX_AI_CHAT: self._retry_ai_chat,
+            },
+            workers=settings.OUTBOX_WORKERS,
+            batch_size=settings.OUTBOX_BATCH_SIZE,
+            poll_interval=settings.OUTBOX_POLL_INTERVAL,
+            lease=settings.OUTBOX_LEASE,
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+            backoff_base=settings.OUTBOX_BACKOFF_BASE,
+            backoff_max=settings.OUTBOX_BACKOFF_MAX,
+        )
+        self.typing_indicator = TypingIndicator(
+            policy=settings.TYPING_POLICY,
+            send_action=self.send_action,
+            refresh_interval=settings.TYPING_REFRESH_INTERVAL,
+        )
+        self.reply_latency = LatencyTracker()
+
+    async def start(self) -> None:
+        await self.queue.start()
+        await self.scheduler.start()
+        if settings.OUTBOX_ENABLED:
+            await self.outbox.start()
+
+    async def stop(self) -> None:
+        await self.queue.stop()
+        await self.scheduler.stop()
+        await self.debounce_store.close()
+        await self.deduplicator.store.close()
+        await self.outbox.stop()
+
+    # normalize
+
+    async def receive(
+        self, channel: ChannelAdapter, request: Request
+    ) -> Response:
+        try:
+            # Đọc body một lần: cùng buffer dùng để kiểm tra chữ ký và parse
+            raw_body = await request.body()
+            try:
+                webhook_events = await self.stages[NORMALIZE].run(
+                    self._normalize, channel, raw_body, request.headers
+                )
+            except PermissionError:
+                logger.warning(
+                    f"Rejected {channel.name} webhook with an invalid signature"
+                )
+                return JSONResponse(
+                    content={"status": "Invalid signature"}, status_code=403
+                )
+            except ValueError:
+                return JSONResponse(
+                    content={"status": "Invalid request"}, status_code=400
+                )
+
+            # Acknowledge right away, the events are handled by the workers
+            if webhook_events:
+                await self.queue.put(webhook_events)
+
+            return JSONResponse(
+                content={"status": "EVENT_RECEIVED"}, status_code=200
+            )
+        except QueueFullError:
+            # The channel redelivers the batch when it does not get a 200
+            logger.warning(
+                f"Webhook queue is full, rejecting the {channel.name} batch"
+            )
+            return JSONResponse(
+                content={"status": "Service busy"}, status_code=503
+            )
+        except Exception as e:
+            print(f"Error handling the webhook: {e}")
+            raise HTTPException(
+                status_code=500, detail="Internal Server Error"
+            )
+
+    async def _normalize(
+        self,
+        channel: ChannelAdapter,
+        raw_body: bytes,
+        headers: Mapping[str, str],
+    ) -> List[MessagingEvent]:
+        if not channel.verify_request(raw_body, headers):
+            raise PermissionError(f"Invalid {channel.name} signature")
+        return channel.parse_events(raw_body)
+
+    # dedupe -> buffer
+
+    async def handle_event(self, sender_id: str, event: MessagingEvent) -> None:
+        # Kênh gửi lại webhook khi ack chậm, bỏ qua sự kiện đã xử lý
+        if await self.stages[DEDUPE].run(self.deduplicator.is_duplicate, event):
+            return
+
+        if event.kind == MessagingEvent.MESSAGE:
+            await self.stages[BUFFER].run(self._buffer, sender_id, event)
+        elif event.kind == MessagingEvent.POSTBACK:
+            await self._handle_postback(sender_id, event)
+
+    async def _buffer(self, sender_id: str, event: MessagingEvent) -> None:
+        # Buffer theo hội thoại: cùng một người dùng trên hai kênh là hai buffer
+        conversation = conversation_key(
+            event.channel, sender_id, event.recipient_id
+        )
+
+        # Text message and attachment URL were extracted when parsing the webhook
+        message_text = event.text
+        attachment_url = event.attachment_url
+
+        # Combine text message and attachment URL (if both are present)
+        if message_text and attachment_url:
+            combined_message = f"{message_text}\nAttachment: {attachment_url}"
+        elif message_text:
+            combined_message = message_text
+        elif attachment_url:
+            combined_message = f"Attachment: {attachment_url}"
+        else:
+            combined_message = "Received an empty message."
+
+        # Add the new message to the buffer and push back its flush deadline
+        now = time.time()
+        deadline = self.debounce_policy.deadline(
+            conversation,
+            now,
+            text=message_text,
+            has_attachment=bool(attachment_url),
+        )
+        await self.debounce_store.append(
+            conversation, combined_message, received_at=now, deadline=deadline
+        )
+
+        # Wake the scheduler up if this deadline is earlier than its next one
+        self.scheduler.notify(deadline)
+
+    async def _handle_postback(
+        self, sender_id: str, event: MessagingEvent
+    ) -> None:
+        payload = event.postback_payload
+
+        # Set the response based on the postback payload
+        if payload == "yes":
+            response_text = "Cảm ơn bạn!"  # "Thanks!" in Vietnamese
+        elif payload == "no":
+            response_text = "Rất tiếc, hãy thử gửi một hình ảnh khác."
+        else:
+            response_text = "Xin lỗi, tôi không hiểu yêu cầu của bạn."
+
+        # Send the response back to the user, on the channel it came from
+        await self.reply(
+            conversation_key(event.channel, sender_id, event.recipient_id),
+            response_text,
+        )
+
+    # AI -> render -> send
+
+    async def flush(self, conversation: str, pending: PendingBuffer) -> None:
+        # Buffer đã được scheduler lấy ra khỏi store khi đến hạn
+        channel_name, page_id, user_id = split_conversation_key(conversation)
+        timer = StageTimer(started_at=pending.started_at)
+        timer.mark("debounce")
+
+        # Gộp tất cả các tin nhắn thành 1 chuỗi
+        combined_message = " ".join(pending.messages)
+
+        # Store và AI backend theo page nhận tin nhắn
+        page = await self.pages.get(channel_name, page_id)
+        store_id = (
+            page.store_id if page is not None else settings.DEFAULT_STORE_ID
+        )
+        ai_path = self.ai_path(page)
+
+        # Gửi tin nhắn gộp lên backend
+        messages = {
+            "store_id": store_id,
+            "customer_id": user_id,
+            "message": combined_message,
+        }
+
+        logger.info(f"Tin nhắn đã gộp để gửi lên API: {messages}")
+
+        # Câu hỏi lặp lại (FAQ) đã có câu trả lời thì không gọi API nữa
+        if self.response_cache is not None:
+            response_text = self.response_cache.get(store_id, combined_message)
+            if response_text is not None:
+                timer.mark("cache")
+                await self.reply(conversation, response_text)
+                timer.mark("send")
+                self._record_latency(conversation, timer)
+                return
+
+        response_text = None
+        if settings.AI_STREAMING:
+            # Gửi từng câu ngay khi API sinh ra, không chờ hết phản hồi
+            try:
+                streamed = await self.call_ai(
+                    self.stream_reply, conversation, messages, timer, ai_path
+                )
+                timer.mark("stream")
+                self._record_latency(conversation, timer)
+                if streamed is not None:
+                    self._cache_reply(store_id, combined_message, streamed)
+                return
+            except StreamInterruptedError:
+                # Người dùng đã nhận một phần và thông báo lỗi, không gửi lại
+                timer.mark("stream")
+                return
+            except Exception as e:
+                logger.error(f"Lỗi xảy ra khi gọi API: {str(e)}")
+        else:
+            # Gọi API gửi tin nhắn, hiển thị typing theo TYPING_POLICY
+            async with self.typing_indicator.while_processing(conversation):
+                try:
+                    response_text = await self.call_ai(
+                        self.request_ai_reply, messages, ai_path
+                    )
+                except Exception as e:
+                    logger.error(f"Lỗi xảy ra khi gọi API: {str(e)}")
+            if response_text is not None:
+                self._cache_reply(store_id, combined_message, response_text)
+        timer.mark("ai")
+
+        if response_text is None:
+            if settings.OUTBOX_ENABLED:
+                # Thử lại qua outbox, phản hồi được gửi khi API hoạt động lại
+                await self._enqueue_outbox(
+                    OUTBOX_AI_CHAT, conversation, messages
+                )
+                return
+            response_text = "Đã xảy ra lỗi khi gọi API. Vui lòng thử lại sau."
+
+        # Gửi phản hồi về người dùng qua đúng kênh
+        await self.reply(conversation, response_text)
+        timer.mark("send")
+        self._record_latency(conversation, timer)
+
+    def _cache_reply(self, store_id: str, message: str, answer: str) -> None:
+        if self.response_cache is not None:
+            self.response_cache.put(store_id, message, answer)
+
+    def _record_latency(self, conversation: str, timer: StageTimer) -> None:
+        self.reply_latency.record(timer)
+        logger.info(
+            f"Reply latency for {conversation}: total={timer.total:.3f}s "
+            + ", ".join(f"{k}={v:.3f}s" for k, v in timer.stages.items())
+        )
+
+    async def call_ai(
+        self, func: Callable[..., Awaitable[Any]], *args: Any
+    ) -> Any:
+        """
+        Every AI backend call goes through the circuit breaker, then the AI
+        stage (bounded in-flight calls and wait queue).
+        """
+        return await self.ai_breaker.call(self.stages[AI].run, func, *args)
+
+    def ai_path(self, page: Optional[PageConfig]) -> str:
+        """Chat endpoint of the page's AI backend, AI_URL by default."""
+        if page is not None and page.ai_url:
+            # An absolute URL overrides the base URL of the shared client
+            return f"{page.ai_url.rstrip('/')}/agent/chat/"
+        return "/agent/chat/"
+
+    async def request_ai_reply(
+        self, messages: Dict[str, Any], path: str = "/agent/chat/"
+    ) -> str:
+        client = http_clients.get(AI_BACKEND)
+        response = await client.post(path, json=messages)
+        logger.info(
+            f"Phản hồi từ API: {response.status_code}, {response.text}"
+        )
+        response.raise_for_status()
+        answer = response.json().get("response")
+        # Không có câu trả lời là lỗi của backend: không gửi, không cache
+        if not isinstance(answer, str) or not answer:
+            raise ValueError("No response in the AI backend reply")
+        return answer
+
+    async def stream_reply(
+        self,
+        conversation: str,
+        messages: Dict[str, Any],
+        timer: StageTimer,
+        path: str = "/agent/chat/",
+    ) -> Optional[str]:
+        """
+        Send the AI reply sentence by sentence while it is being generated,
+        with the typing indicator on between the messages, and return the
+        whole reply (None if the backend sent nothing). If the backend
+        fails before anything was sent the error is raised as is, so the
+        caller can fall back like for a regular request; after that the
+        user gets an error message and `StreamInterruptedError` is raised,
+        so the circuit breaker still counts the failure.
+        """
+        client = http_clients.get(AI_BACKEND)
+        splitter = SentenceSplitter(
+            min_chars=settings.AI_STREAM_MIN_CHARS,
+            max_chars=self.max_message_length,
+        )
+        typing = asyncio.create_task(self.typing_indicator.show(conversation))
+        sent: List[str] = []
+        try:
+            async for delta in stream_ai_reply(
+                client, path, messages
+            ):
+                for chunk in splitter.feed(delta):
+                    # typing_on phải tới trước câu tiếp theo, không phải sau
+                    await typing
+                    await self.reply(conversation, chunk)
+                    if not sent:
+                        timer.mark("first_message")
+                    sent.append(chunk)
+                    typing = asyncio.create_task(
+                        self.typing_indicator.show(conversation)
+                    )
+        except Exception as e:
+            await typing
+            if not sent:
+                raise
+            logger.error(f"Phản hồi từ API bị ngắt giữa chừng: {str(e)}")
+            await self.reply(
+                conversation, "Đã xảy ra lỗi khi gọi API. Vui lòng thử lại sau."
+            )
+            raise StreamInterruptedError(
+                f"AI stream cut off after {len(sent)} messages"
+            ) from e
+
+        await typing
+        rest = splitter.flush()
+        if not sent and not rest:
+            await self.reply(conversation, "Không có phản hồi từ API.")
+            return None
+        for chunk in rest:
+            await self.reply(conversation, chunk)
+            if not sent:
+                timer.mark("first_message")
+            sent.append(chunk)
+        if not rest:
+            # Câu cuối đã gửi trước khi luồng kết thúc, tắt typing còn lại
+            await self.typing_indicator.hide(conversation)
+        logger.info(f"Streamed {len(sent)} messages to {conversation}")
+        return " ".join(sent)
+
+    async def reply(self, conversation: str, text: str) -> None:
+        for message in await self.stages[RENDER].run(self.render, text):
+            await self.send_reply(conversation, message)
+
+    async def render(self, text: str) -> List[Dict[str, Any]]:
+        """Split a reply into messages the channels accept (2000 chars)."""
+        chunks = []
+        while len(text) > self.max_message_length:
+            cut = text.rfind(" ", 0, self.max_message_length)
+            if cut <= 0:
+                cut = self.max_message_length
+            chunks.append(text[:cut].rstrip())
+            text = text[cut:].lstrip()
+        chunks.append(text)
+        return [{"text": chunk} for chunk in chunks]
+
+    async def send_reply(
+        self, conversation: str, message: Dict[str, Any]
+    ) -> None:
+        channel_name, page_id, user_id = split_conversation_key(conversation)
+        channel = self.channels.get(channel_name)
+        try:
+            await self.stages[SEND].run(
+                channel.send_message, user_id, message, page_id
+            )
+            logger.info(f"Sent message: {message} to {conversation}")
+        except Exception as e:
+            logger.error(f"Failed to send message to {conversation}: {e}")
+            # Lỗi 4xx (ví dụ người dùng đã chặn page) thử lại cũng không được
+            if settings.OUTBOX_ENABLED and not is_permanent_send_error(e):
+                await self._enqueue_outbox(
+                    OUTBOX_CHANNEL_SEND, conversation, message
+                )
+
+    async def send_action(self, conversation: str, action: str) -> None:
+        channel_name, page_id, user_id = split_conversation_key(conversation)
+        await self.channels.get(channel_name).send_typing(
+            user_id, action, page_id
+        )
+
+    # outbox
+
+    async def _enqueue_outbox(
+        self, kind: str, conversation: str, payload: Dict[str, Any]
+    ) -> None:
+        try:
+            await self.outbox.enqueue(kind, conversation, payload)
+        except Exception as e:
+            logger.error(
+                f"Failed to store {kind} of {conversation} in the outbox, "
+                f"dropped {payload}: {e}"
+            )
+
+    async def _retry_channel_send(
+        self, conversation: str, message: Dict[str, Any]
+    ) -> None:
+        channel_name, page_id, user_id = split_conversation_key(conversation)
+        await self.channels.get(channel_name).send_message(
+            user_id, message, page_id
+        )
+
+    async def _retry_ai_chat(
+        self, conversation: str, messages: Dict[str, Any]
+    ) -> None:
+        channel_name, page_id, _ = split_conversation_key(conversation)
+        page = await self.pages.get(channel_name, page_id)
+        response_text = await self.call_ai(
+            self.request_ai_reply, messages, self.ai_path(page)
+        )
+        await self.reply(conversation, response_text)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: stage.metrics() for name, stage in self.stages.items()}
+
+
+conversation_engine = ConversationEngineImpl(
+    channels=channel_registry,
+    # Facebook/Zalo gửi lại webhook khi ack chậm (memory hoặc Redis)
+    deduplicator=WebhookDeduplicator(build_dedup_store()),
+    # Buffer tin nhắn tạm theo hội thoại (memory hoặc Redis, xem DEBOUNCE_STORE)
+    debounce_store=build_debounce_store(),
+    # Tính thời điểm gửi buffer lên AI dựa trên nhịp nhắn tin của từng người
+    debounce_policy=DebouncePolicy(
+        min_wait=settings.DEBOUNCE_MIN_WAIT,
+        max_wait=settings.DEBOUNCE_MAX_WAIT,
+        idle_gap=settings.DEBOUNCE_IDLE_GAP,
+        gap_multiplier=settings.DEBOUNCE_GAP_MULTIPLIER,
+        max_buffer=settings.DEBOUNCE_MAX_BUFFER,
+    ),
+    # Store, access token và AI backend theo page (bảng page)
+    pages=page_registry,
+    stage_concurrency={
+        NORMALIZE: settings.STAGE_NORMALIZE_CONCURRENCY,
+        DEDUPE: settings.STAGE_DEDUPE_CONCURRENCY,
+        BUFFER: settings.STAGE_BUFFER_CONCURRENCY,
+        AI: settings.STAGE_AI_CONCURRENCY,
+        RENDER: settings.STAGE_RENDER_CONCURRENCY,
+        SEND: settings.STAGE_SEND_CONCURRENCY,
+    },
+    stage_max_waiting={AI: settings.STAGE_AI_MAX_WAITING},
+    # Cache câu trả lời cho câu hỏi lặp lại theo store (tắt mặc định)
+    response_cache=(
+        ResponseCache(
+            maxsize=settings.AI_CACHE_SIZE,
+            ttl=settings.AI_CACHE_TTL,
+            max_message_length=settings.AI_CACHE_MAX_MESSAGE_LENGTH,
+        )
+        if settings.AI_CACHE_ENABLED
+        else None
+    ),
+)
+metrics_registry.register("conversation_stages", conversation_engine.metrics)
+metrics_registry.register(
+    "webhook_dedup", conversation_engine.deduplicator.metrics
+)
+metrics_registry.register(
+    "webhook_queue", conversation_engine.queue.metrics
+)
+metrics_registry.register(
+    "webhook_dispatcher", conversation_engine.dispatcher.metrics
+)
+metrics_registry.register(
+    "debounce_scheduler", conversation_engine.scheduler.metrics
+)
+metrics_registry.register("outbox_worker", conversation_engine.outbox.metrics)
+metrics_registry.register(
+    "ai_circuit_breaker", conversation_engine.ai_breaker.metrics
+)
+if conversation_engine.response_cache is not None:
+    metrics_registry.register(
+        "ai_response_cache", conversation_engine.response_cache.metrics
+    )
+metrics_registry.register(
+    "reply_latency", conversation_engine.reply_latency.summary
+)
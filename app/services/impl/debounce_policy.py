@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Optional
+
+
+class _SenderStats:
+    __slots__ = (
+        "last_seen",
+        "burst_started_at",
+        "burst_size",
+        "gap",
+        "flush_at",
+    )
+
+    def __init__(self, now: float):
+        self.last_seen = now
+        self.burst_started_at = now
+        self.burst_size = 0
+        self.gap: Optional[float] = None
+        self.flush_at = now
+
+
+class DebouncePolicy:
+    """
+    Decides when the buffered messages of a sender are flushed to the AI.
+
+    Each message pushes the deadline back by an idle gap, learned per sender
+    from the time between their messages (moving average) and clamped to
+    `[min_wait, max_wait]`. A burst is never held longer than `max_wait`
+    after its first message. A message that looks complete (ends with a
+    question mark, carries an attachment, or fills the buffer) only waits
+    `min_wait`.
+    """
+
+    def __init__(
+        self,
+        min_wait: float = 1,
+        max_wait: float = 30,
+        idle_gap: float = 8,
+        max_buffer: int = 10,
+        gap_multiplier: float = 4,
+        learning_rate: float = 0.3,
+        max_senders: int = 100000,
+    ):
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.idle_gap = idle_gap
+        self.max_buffer = max_buffer
+        self.gap_multiplier = gap_multiplier
+        self.learning_rate = learning_rate
+        self.max_senders = max_senders
+        self._senders: "OrderedDict[str, _SenderStats]" = OrderedDict()
+
+    def deadline(
+        self,
+        sender_psid: str,
+        now: float,
+        text: str = "",
+        has_attachment: bool = False,
+    ) -> float:
+        stats = self._observe(sender_psid, now)
+
+        if self._is_complete(stats, text, has_attachment):
+            wait = self.min_wait
+        else:
+            wait = self._idle_gap(stats)
+
+        stats.flush_at = min(now + wait, stats.burst_started_at + self.max_wait)
+        return stats.flush_at
+
+    def _observe(self, sender_psid: str, now: float) -> _SenderStats:
+        stats = self._senders.get(sender_psid)
+        if stats is None:
+            stats = self._senders[sender_psid] = _SenderStats(now)
+            if len(self._senders) > self.max_senders:
+                self._senders.popitem(last=False)
+        else:
+            self._senders.move_to_end(sender_psid)
+            gap = now - stats.last_seen
+            # Longer pauses are a new conversation turn, not typing speed;
+            # a follow-up just after a flush means we flushed too early
+            if gap <= self.max_wait:
+                if stats.gap is None:
+                    stats.gap = gap
+                else:
+                    stats.gap += self.learning_rate * (gap - stats.gap)
+            if now >= stats.flush_at:
+                # The previous burst has been flushed already
+                stats.burst_started_at = now
+                stats.burst_size = 0
+            stats.last_seen = now
+
+        stats.burst_size += 1
+        return stats
+
+    def _idle_gap(self, stats: _SenderStats) -> float:
+        if stats.gap is None:
+            return self.idle_gap
+        return max(
+            self.min_wait, min(self.max_wait, stats.gap * self.gap_multiplier)
+        )
+
+    def _is_complete(
+        self, stats: _SenderStats, text: str, has_attachment: bool
+    ) -> bool:
+        return (
+            has_attachment
+            or text.rstrip().endswith("?")
+            or stats.burst_size >= self.max_buffer
+        )
@@ -0,0 +1,208 @@
+import asyncio
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.common.logger import setup_logger
+from app.services.abc.debounce_store import DebounceStore, PendingBuffer
+
+logger = setup_logger()
+
+
+class DebounceScheduler:
+    """
+    Single background task that flushes every sender whose debounce deadline
+    has passed, instead of one sleeping task per sender.
+
+    The deadlines themselves live in the `DebounceStore` (a heap in memory,
+    a sorted set in Redis). The loop sleeps until the earliest deadline, or
+    until `notify` reports an earlier one, takes the due buffers in batches
+    and hands them to `flush`, at most `max_concurrent_flushes` at a time.
+    With a shared store, `poll_interval` bounds how late a buffer appended by
+    another worker can be picked up.
+
+    Flushes of one sender never overlap: a buffer that becomes due while the
+    previous generation is still being flushed waits (merged with any later
+    one) and is flushed by the same task right after. A flush that is
+    cancelled before it completes puts its messages back in the store.
+    """
+
+    def __init__(
+        self,
+        store: DebounceStore,
+        flush: Callable[[str, PendingBuffer], Awaitable[None]],
+        batch_size: int = 100,
+        max_concurrent_flushes: int = 100,
+        poll_interval: float = 1.0,
+        stop_timeout: float = 30.0,
+    ):
+        self.store = store
+        self.flush = flush
+        self.batch_size = batch_size
+        self.max_concurrent_flushes = max_concurrent_flushes
+        self.poll_interval = poll_interval
+        self.stop_timeout = stop_timeout
+
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._store_lock = asyncio.Lock()
+        self._next_wakeup = float("inf")
+        self._semaphore = asyncio.Semaphore(max_concurrent_flushes)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiting: Dict[str, PendingBuffer] = {}
+
+        self._fired = 0
+        self._batches = 0
+        self._merged = 0
+        self._restored = 0
+        self._failed = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(
+                self._run(), name="debounce-scheduler"
+            )
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        # The loop is not cancelled: a cancel landing between take and submit
+        # would lose the buffer, and wait_for can swallow it on Python < 3.12
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        # Let the replies that are already being produced go out, the ones
+        # that do not finish in time are put back in the store
+        tasks = list(self._in_flight.values())
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.stop_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def notify(self, deadline: float) -> None:
+        if deadline < self._next_wakeup:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            # Cleared before looking at the store so that a notify racing
+            # with this iteration still wakes up the next sleep
+            self._wakeup.clear()
+            try:
+                await self._fire_due()
+                timeout = await self._sleep_timeout()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Debounce scheduler failed: {e}")
+                logger.error(traceback.format_exc())
+                timeout = self.poll_interval
+
+            self._next_wakeup = time.time() + timeout
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._next_wakeup = float("inf")
+
+    async def _fire_due(self) -> None:
+        while not self._stopping:
+            now = time.time()
+            sender_psids = await self.store.due(now, self.batch_size)
+            if not sender_psids:
+                return
+
+            self._batches += 1
+            for sender_psid in sender_psids:
+                # Serialized with the restore of a cancelled flush, so that a
+                # buffer is never taken while older messages are going back
+                async with self._store_lock:
+                    pending = await self.store.take(sender_psid, now)
+                    if pending is None or self._queue(sender_psid, pending):
+                        continue
+                await self._semaphore.acquire()
+                self._in_flight[sender_psid] = asyncio.create_task(
+                    self._flush(sender_psid, pending)
+                )
+
+            if len(sender_psids) < self.batch_size:
+                return
+
+    def _queue(self, sender_psid: str, pending: PendingBuffer) -> bool:
+        if sender_psid not in self._in_flight:
+            return False
+        waiting = self._waiting.get(sender_psid)
+        if waiting is not None:
+            self._merged += 1
+            pending = PendingBuffer(
+                waiting.messages + pending.messages,
+                waiting.started_at,
+                pending.generation,
+            )
+        self._waiting[sender_psid] = pending
+        return True
+
+    async def _sleep_timeout(self) -> float:
+        next_deadline = await self.store.next_deadline()
+        if next_deadline is None:
+            return self.poll_interval
+        return max(0.0, min(next_deadline - time.time(), self.poll_interval))
+
+    async def _flush(self, sender_psid: str, pending: PendingBuffer) -> None:
+        try:
+            while pending is not None:
+                await self._flush_generation(sender_psid, pending)
+                # Next generation that became due during this flush, if any
+                pending = self._waiting.pop(sender_psid, None)
+        finally:
+            del self._in_flight[sender_psid]
+            self._semaphore.release()
+
+    async def _flush_generation(
+        self, sender_psid: str, pending: PendingBuffer
+    ) -> None:
+        self._fired += 1
+        try:
+            await self.flush(sender_psid, pending)
+        except asyncio.CancelledError:
+            async with self._store_lock:
+                # Restore prepends, so the later generation goes back first
+                waiting = self._waiting.pop(sender_psid, None)
+                if waiting is not None:
+                    await self._restore(sender_psid, waiting)
+                await self._restore(sender_psid, pending)
+            raise
+        except Exception as e:
+            self._failed += 1
+            logger.error(
+                f"Failed to flush generation {pending.generation} of "
+                f"{sender_psid}, dropped messages {pending.messages}: {e}"
+            )
+            logger.error(traceback.format_exc())
+
+    async def _restore(self, sender_psid: str, pending: PendingBuffer) -> None:
+        self._restored += 1
+        try:
+            await self.store.restore(sender_psid, pending, time.time())
+        except Exception as e:
+            logger.error(
+                f"Failed to restore buffer of {sender_psid}, "
+                f"lost messages {pending.messages}: {e}"
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "fired": self._fired,
+            "batches": self._batches,
+            "merged": self._merged,
+            "restored": self._restored,
+            "failed": self._failed,
+            "in_flight": len(self._in_flight),
+            "waiting": len(self._waiting),
+            "max_concurrent_flushes": self.max_concurrent_flushes,
+        }
@@ -0,0 +1,230 @@
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.abc.debounce_store import DebounceStore, PendingBuffer
+
+
+class _Buffer:
+    __slots__ = ("messages", "started_at", "deadline")
+
+    def __init__(self, started_at: float, deadline: float):
+        self.messages: List[str] = []
+        self.started_at = started_at
+        self.deadline = deadline
+
+
+class InMemoryDebounceStore(DebounceStore):
+    """
+    Process-local store, only suitable when running a single worker.
+
+    Deadlines are kept in a heap; rescheduling pushes a new entry and the
+    outdated ones are skipped (and compacted) when they reach the top.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[str, _Buffer] = {}
+        self._deadlines: List[Tuple[float, str]] = []
+        self._generations = itertools.count(1)
+
+    async def append(
+        self, key: str, message: str, received_at: float, deadline: float
+    ) -> int:
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = _Buffer(
+                started_at=received_at, deadline=deadline
+            )
+        buffer.messages.append(message)
+        buffer.deadline = deadline
+        heapq.heappush(self._deadlines, (deadline, key))
+
+        if len(self._deadlines) > 2 * len(self._buffers) + 1024:
+            self._compact()
+        return len(buffer.messages)
+
+    async def take(self, key: str, now: float) -> Optional[PendingBuffer]:
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.deadline > now:
+            return None
+        del self._buffers[key]
+        return PendingBuffer(
+            buffer.messages, buffer.started_at, next(self._generations)
+        )
+
+    async def restore(
+        self, key: str, pending: PendingBuffer, deadline: float
+    ) -> None:
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = _Buffer(
+                started_at=pending.started_at, deadline=deadline
+            )
+        buffer.messages[:0] = pending.messages
+        buffer.started_at = min(buffer.started_at, pending.started_at)
+        buffer.deadline = min(buffer.deadline, deadline)
+        heapq.heappush(self._deadlines, (buffer.deadline, key))
+
+    async def due(self, now: float, limit: int = 100) -> List[str]:
+        # Outdated entries are dropped, current ones are pushed back: a key
+        # stays due until it is taken, as in the Redis store
+        keys: List[str] = []
+        current = {}
+        while self._deadlines and len(keys) < limit:
+            deadline, key = self._deadlines[0]
+            if deadline > now:
+                break
+            heapq.heappop(self._deadlines)
+            if self._is_current(deadline, key) and key not in current:
+                keys.append(key)
+                current[key] = deadline
+        for key, deadline in current.items():
+            heapq.heappush(self._deadlines, (deadline, key))
+        return keys
+
+    async def next_deadline(self) -> Optional[float]:
+        while self._deadlines:
+            deadline, key = self._deadlines[0]
+            if self._is_current(deadline, key):
+                return deadline
+            heapq.heappop(self._deadlines)
+        return None
+
+    def _is_current(self, deadline: float, key: str) -> bool:
+        buffer = self._buffers.get(key)
+        return buffer is not None and buffer.deadline == deadline
+
+    def _compact(self) -> None:
+        self._deadlines = [
+            (buffer.deadline, key) for key, buffer in self._buffers.items()
+        ]
+        heapq.heapify(self._deadlines)
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+
+# Checks the deadline, reads and deletes the buffer in one step so that only
+# one worker can flush it
+_TAKE_SCRIPT = """
+local deadline = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if (not deadline) or tonumber(deadline) > tonumber(ARGV[2]) then
+    return nil
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+local messages = redis.call('LRANGE', KEYS[2], 0, -1)
+local started_at = redis.call('HGET', KEYS[3], 'started_at')
+redis.call('DEL', KEYS[2], KEYS[3])
+local generation = redis.call('INCR', KEYS[4])
+return {started_at, generation, messages}
+"""
+
+# Prepends the messages of a taken buffer back in front of whatever arrived
+# since and makes the buffer due no later than ARGV[2]
+_RESTORE_SCRIPT = """
+for i = #ARGV, 5, -1 do
+    redis.call('LPUSH', KEYS[2], ARGV[i])
+end
+local started_at = redis.call('HGET', KEYS[3], 'started_at')
+if (not started_at) or tonumber(started_at) > tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[3], 'started_at', ARGV[3])
+end
+local deadline = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if (not deadline) or tonumber(deadline) > tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return 1
+"""
+
+
+class RedisDebounceStore(DebounceStore):
+    """
+    Shared store on Redis: buffers are lists, deadlines live in one sorted
+    set, so every worker sees the same pending buffers and a restart does not
+    lose them.
+    """
+
+    def __init__(self, url: str, prefix: str = "debounce", ttl: int = 3600):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            raise RuntimeError(
+                "The redis package is required for DEBOUNCE_STORE=redis"
+            ) from None
+
+        self._redis = aioredis.from_url(url, decode_responses=True)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._restore = self._redis.register_script(_RESTORE_SCRIPT)
+        self.prefix = prefix
+        self.ttl = ttl
+        self._deadlines_key = f"{prefix}:deadlines"
+        self._generation_key = f"{prefix}:generation"
+
+    def _keys(self, key: str):
+        return f"{self.prefix}:buffer:{key}", f"{self.prefix}:meta:{key}"
+
+    async def append(
+        self, key: str, message: str, received_at: float, deadline: float
+    ) -> int:
+        buffer_key, meta_key = self._keys(key)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(buffer_key, message)
+            pipe.hsetnx(meta_key, "started_at", received_at)
+            pipe.zadd(self._deadlines_key, {key: deadline})
+            # Safety net so abandoned buffers do not stay in Redis forever
+            pipe.expire(buffer_key, self.ttl)
+            pipe.expire(meta_key, self.ttl)
+            size, *_ = await pipe.execute()
+        return size
+
+    async def take(self, key: str, now: float) -> Optional[PendingBuffer]:
+        buffer_key, meta_key = self._keys(key)
+        result: Any = await self._take(
+            keys=[
+                self._deadlines_key,
+                buffer_key,
+                meta_key,
+                self._generation_key,
+            ],
+            args=[key, now],
+        )
+        if result is None:
+            return None
+        started_at, generation, messages = result
+        if not messages:
+            return None
+        return PendingBuffer(
+            list(messages), float(started_at or now), int(generation)
+        )
+
+    async def restore(
+        self, key: str, pending: PendingBuffer, deadline: float
+    ) -> None:
+        buffer_key, meta_key = self._keys(key)
+        await self._restore(
+            keys=[self._deadlines_key, buffer_key, meta_key],
+            args=[key, deadline, pending.started_at, self.ttl, *pending.messages],
+        )
+
+    async def due(self, now: float, limit: int = 100) -> List[str]:
+        return await self._redis.zrangebyscore(
+            self._deadlines_key, "-inf", now, start=0, num=limit
+        )
+
+    async def next_deadline(self) -> Optional[float]:
+        earliest = await self._redis.zrange(
+            self._deadlines_key, 0, 0, withscores=True
+        )
+        return earliest[0][1] if earliest else None
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def build_debounce_store() -> DebounceStore:
+    if settings.DEBOUNCE_STORE == "redis":
+        return RedisDebounceStore(settings.REDIS_URL)
+    return InMemoryDebounceStore()
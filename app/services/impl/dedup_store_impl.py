@@ -0,0 +1,103 @@
+import sys
+from collections import deque
+from typing import Any, Deque, Dict, Set, Tuple
+
+from app.core.config import settings
+from app.services.abc.dedup_store import DedupStore
+
+
+class InMemoryDedupStore(DedupStore):
+    """
+    Process-local seen-set, only suitable when running a single worker.
+
+    Keys are grouped in buckets of `bucket_seconds`; whole buckets are
+    dropped once they are older than `ttl`, or oldest first when more than
+    `max_keys` keys are held, so memory stays bounded without per-key
+    timestamps.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        bucket_seconds: float = 60,
+        max_keys: int = 1000000,
+    ):
+        self.ttl = ttl
+        self.bucket_seconds = bucket_seconds
+        self.max_keys = max_keys
+        self._buckets: Deque[Tuple[int, Set[str]]] = deque()
+        self._size = 0
+        self._key_bytes = 0
+
+    async def add(self, key: str, now: float) -> bool:
+        self._expire(now)
+        for _, keys in self._buckets:
+            if key in keys:
+                return False
+
+        index = int(now // self.bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != index:
+            self._buckets.append((index, set()))
+        self._buckets[-1][1].add(key)
+        self._size += 1
+        self._key_bytes += sys.getsizeof(key)
+        return True
+
+    def _expire(self, now: float) -> None:
+        oldest = int((now - self.ttl) // self.bucket_seconds)
+        while self._buckets and (
+            self._buckets[0][0] < oldest or self._size > self.max_keys
+        ):
+            _, keys = self._buckets.popleft()
+            self._size -= len(keys)
+            self._key_bytes -= sum(sys.getsizeof(key) for key in keys)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "keys": self._size,
+            "buckets": len(self._buckets),
+            "memory_bytes": self._key_bytes
+            + sum(sys.getsizeof(keys) for _, keys in self._buckets),
+        }
+
+
+class RedisDedupStore(DedupStore):
+    """
+    Shared seen-set on Redis (`SET NX EX`), so every worker process drops
+    the duplicates of an event handled by another one.
+    """
+
+    def __init__(self, url: str, prefix: str = "dedup", ttl: int = 3600):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            raise RuntimeError(
+                "The redis package is required for DEDUP_STORE=redis"
+            ) from None
+
+        self._redis = aioredis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    async def add(self, key: str, now: float) -> bool:
+        added = await self._redis.set(
+            f"{self.prefix}:{key}", 1, nx=True, ex=int(self.ttl)
+        )
+        return bool(added)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": "redis", "ttl": self.ttl}
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def build_dedup_store() -> DedupStore:
+    if settings.DEDUP_STORE == "redis":
+        return RedisDedupStore(settings.REDIS_URL, ttl=settings.DEDUP_TTL)
+    return InMemoryDedupStore(
+        ttl=settings.DEDUP_TTL,
+        bucket_seconds=settings.DEDUP_BUCKET_SECONDS,
+        max_keys=settings.DEDUP_MAX_KEYS,
+    )
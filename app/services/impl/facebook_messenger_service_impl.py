@@ -1,22 +1,32 @@
 import asyncio
-import time
-import traceback
-from typing import Any, Dict, List, Optional, Union
-
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
-from pydantic import ValidationError
-from sqlalchemy.orm import Session
-
-from app.api import deps
-from app.common import parameters, util
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.common.http_client import GRAPH_API, http_clients
 from app.common.logger import setup_logger
+from app.common.metrics import metrics_registry
 from app.core.config import settings
+from app.core.security import verify_hub_signature
 from app.crud.crud_user import crud_user
-from app.schema.message_schema import MessageInDBSchema
-from app.schema.user_schema import UserResponseSchema
+from app.services.abc.channel_adapter import ChannelAdapter
 from app.services.abc.facebook_messenger_service import FacebookMessengerService
+from app.services.impl.channel_registry import (
+    channel_registry,
+    conversation_key,
+)
+from app.services.impl.conversation_engine_impl import conversation_engine
+from app.services.impl.page_registry import page_registry
+from app.services.impl.profile_cache import ProfileCache
+from app.services.impl.profile_loader import ProfileLoader
+from app.services.impl.send_dispatcher import SendDispatcher
+from app.services.impl.webhook_events import (
+    FACEBOOK_CHANNEL,
+    MessagingEvent,
+    parse_webhook_body,
+)
 
 logger = setup_logger()
 
@@ -39,41 +49,7 @@ class FacebookMessengerServiceImpl(FacebookMessengerService):
             raise HTTPException(status_code=404, detail="Not Found")
 
     async def post_webhook(self, request: Request) -> str:
-        try:
-            body = await request.json()
-            if body.get("object") == "page":
-                for entry in body.get("entry", []):
-                    messaging = entry.get("messaging", [])
-
-                    if len(messaging) == 0:
-                        continue
-
-                    webhook_event = messaging[0]
-                    # print(f"Webhook event received: {webhook_event}")
-
-                    sender_psid = webhook_event.get("sender", {}).get("id")
-                    if sender_psid:
-                        # print("Sender PSID:", sender_psid)
-
-                        if "message" in webhook_event:
-                            await handle_message(
-                                sender_psid, webhook_event["message"]
-                            )
-                        elif "postback" in webhook_event:
-                            await handle_postback(
-                                sender_psid, webhook_event["postback"]
-                            )
-
-                return JSONResponse(
-                    content={"status": "EVENT_RECEIVED"}, status_code=200
-                )
-            else:
-                return JSONResponse(
-                    content={"status": "Invalid request"}, status_code=400
-                )
-        except Exception as e:
-            print(f"Error handling the webhook: {e}")
-            raise HTTPException(status_code=500, detail="Internal Server Error")
+        return await conversation_engine.receive(messenger_channel, request)
 
 
 # async def handle_message(sender_psid: str, received_message: Dict[str, Any]):
@@ -118,56 +94,6 @@ class FacebookMessengerServiceImpl(FacebookMessengerService):
 
 #     await call_send_api(sender_psid, response_text)
 
-# Dictionary để lưu tin nhắn tạm theo sender_psid
-user_message_buffer = {}
-# Dictionary để lưu hẹn giờ cho từng sender_psid
-message_timers = {}
-
-
-async def handle_message(sender_psid: str, received_message: Dict[str, Any]):
-    await send_typing_on(sender_psid)
-
-    # Create variables to store the text message and attachment URL
-    message_text = ""
-    attachment_url = ""
-
-    # Check if the received message contains text
-    if "text" in received_message:
-        message_text = received_message.get("text", "")
-
-    # Check if the received message contains an attachment
-    if "attachments" in received_message:
-        attachment_url = received_message["attachments"][0]["payload"]["url"]
-
-    # Combine text message and attachment URL (if both are present)
-    if message_text and attachment_url:
-        combined_message = f"{message_text}\nAttachment: {attachment_url}"
-    elif message_text:
-        combined_message = message_text
-    elif attachment_url:
-        combined_message = f"Attachment: {attachment_url}"
-    else:
-        combined_message = "Received an empty message."
-
-    # If there's no message in the buffer yet, initialize a buffer for the user
-    if sender_psid not in user_message_buffer:
-        user_message_buffer[sender_psid] = []
-
-    # Add the new message to the buffer
-    user_message_buffer[sender_psid].append(combined_message)
-
-    # Reset the timer if one already exists for the user
-    if sender_psid in message_timers:
-        message_timers[sender_psid].cancel()
-
-    # Create a new timer for the user to send the combined message later
-    message_timers[sender_psid] = asyncio.create_task(
-        send_combined_message(sender_psid)
-    )
-
-    await send_typing_off(sender_psid)
-
-
 # async def handle_message(sender_psid: str, received_message: Dict[str, Any]):
 #     await send_typing_on(sender_psid)
 
@@ -246,56 +172,6 @@ async def handle_message(sender_psid: str, received_message: Dict[str, Any]):
 #         await call_send_api(sender_psid, {"text": response_text})
 
 
-async def send_combined_message(sender_psid: str):
-    # Chờ 10 giây
-    await asyncio.sleep(10)
-
-    # Gộp tất cả các tin nhắn thành 1 chuỗi
-    combined_message = " ".join(user_message_buffer[sender_psid])
-
-    # Gửi tin nhắn gộp lên backend
-    messages = {
-        "store_id": "a23a71d3-9647-4b8e-bd48-fe9c8f776130",
-        "customer_id": sender_psid,
-        "message": combined_message,
-    }
-
-    logger.info(f"Tin nhắn đã gộp để gửi lên API: {messages}")
-
-    send_message_url = f"{settings.AI_URL}/agent/chat/"
-
-    # Gọi API gửi tin nhắn
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                send_message_url, json=messages, timeout=10
-            )
-            logger.info(
-                f"Phản hồi từ API: {response.status_code}, {response.text}"
-            )
-
-            if response.status_code == 200:
-                response_json = response.json()
-                response_text = response_json.get(
-                    "response", "Không có phản hồi từ API."
-                )
-            else:
-                response_text = "API gặp sự cố. Vui lòng thử lại sau."
-
-        except Exception as e:
-            logger.error(f"Lỗi xảy ra khi gọi API: {str(e)}")
-            response_text = "Đã xảy ra lỗi khi gọi API. Vui lòng thử lại sau."
-
-    # Gửi phản hồi về người dùng
-    await call_send_api(sender_psid, {"text": response_text})
-
-    # Xóa buffer và hẹn giờ sau khi đã gửi tin nhắn lên BE
-    del user_message_buffer[sender_psid]
-    if sender_psid in message_timers:
-        message_timers[sender_psid].cancel()
-        del message_timers[sender_psid]
-
-
 # async def handle_message(sender_psid: str, received_message: Dict[str, Any]):
 #     await send_typing_on(sender_psid)
 
@@ -489,52 +365,28 @@ async def send_combined_message(sender_psid: str):
 #     await call_send_api(sender_psid, {"text": text})
 
 
-async def handle_postback(sender_psid: str, received_postback: Dict[str, Any]):
-    # Implement logic to handle postback events
-    payload = received_postback.get("payload")
-    response_text: str
-
-    # Set the response based on the postback payload
-    if payload == "yes":
-        response_text = "Cảm ơn bạn!"  # "Thanks!" in Vietnamese
-    elif payload == "no":
-        response_text = "Rất tiếc, hãy thử gửi một hình ảnh khác."  # "Oops, try sending another image." in Vietnamese
-    else:
-        response_text = "Xin lỗi, tôi không hiểu yêu cầu của bạn."  # Generic fallback message
-
-    # Send the response back to the user
-    await call_send_api(sender_psid, {"text": response_text})
-
+async def page_access_token(page_id: Optional[str] = None) -> str:
+    # Token của page trong bảng page, PAGE_ACCESS_TOKEN nếu chưa cấu hình
+    page = await page_registry.get(FACEBOOK_CHANNEL, page_id)
+    if page is not None and page.access_token:
+        return page.access_token
+    return settings.PAGE_ACCESS_TOKEN
 
-async def send_typing_on(sender_psid: str):
-    typing_on_payload = {
-        "recipient": {"id": sender_psid},
-        "sender_action": "typing_on",
-    }
-    await call_send_api(sender_psid, typing_on_payload)
-
-
-async def send_typing_off(sender_psid: str):
-    typing_off_payload = {
-        "recipient": {"id": sender_psid},
-        "sender_action": "typing_off",
-    }
-    await call_send_api(sender_psid, typing_off_payload)
 
-
-async def send_typing_action(sender_psid: str, action: str = "typing_on"):
+async def send_typing_action(
+    sender_psid: str, action: str = "typing_on", page_id: Optional[str] = None
+):
     """
     Send typing action to the user. Can be 'typing_on', 'typing_off', or 'mark_seen'.
     """
-    send_api_url = f"{settings.FACEBOOK_URL}/v11.0/me/messages?access_token={settings.PAGE_ACCESS_TOKEN}"
-
     action_payload = {
         "recipient": {"id": sender_psid},
         "sender_action": action,
     }
 
-    async with httpx.AsyncClient() as client:
-        await client.post(send_api_url, json=action_payload)
+    await send_dispatcher.send(
+        sender_psid, action_payload, await page_access_token(page_id)
+    )
 
 
 # async def call_send_api(sender_psid: str, response: Union[str, Dict[str, Any]]):
@@ -567,47 +419,151 @@ async def send_typing_action(sender_psid: str, action: str = "typing_on"):
 #             logger.error(f"An unexpected error occurred: {str(e)}")
 
 
-async def call_send_api(sender_psid: str, response: Union[str, Dict[str, Any]]):
-    send_api_url = f"{settings.FACEBOOK_URL}/v11.0/me/messages?access_token={settings.PAGE_ACCESS_TOKEN}"
-
-    # Gửi hành động "typing_on" trước khi xử lý tin nhắn
-    await send_typing_action(sender_psid, "typing_on")
-
-    # Chờ một khoảng thời gian ngắn để mô phỏng quá trình xử lý (tùy chọn)
-    await asyncio.sleep(2)  # Chờ 2 giây cho hiệu ứng typing
-
+async def call_send_api(
+    sender_psid: str,
+    response: Union[str, Dict[str, Any]],
+    page_id: Optional[str] = None,
+):
     # Xây dựng payload dựa trên kiểu phản hồi
-    if isinstance(response, str):
-        message_payload = {
-            "recipient": {"id": sender_psid},
-            "message": {"text": response},
-        }
-    else:
-        message_payload = {
-            "recipient": {"id": sender_psid},
-            "message": response,
-        }
+    message = {"text": response} if isinstance(response, str) else response
+    await conversation_engine.send_reply(
+        conversation_key(FACEBOOK_CHANNEL, sender_psid, page_id), message
+    )
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(send_api_url, json=message_payload)
-            logger.info(f"Sent message: {message_payload} to {sender_psid}")
-        except Exception as e:
-            logger.error(f"Failed to send message: {e}")
 
-    # Sau khi xử lý xong, gửi hành động "typing_off"
-    await send_typing_action(sender_psid, "typing_off")
+send_dispatcher = SendDispatcher(
+    get_client=lambda: http_clients.get(GRAPH_API),
+    page_rate=settings.SEND_RATE_PER_PAGE,
+    recipient_rate=settings.SEND_RATE_PER_RECIPIENT,
+    recipient_burst=settings.SEND_BURST_PER_RECIPIENT,
+    max_retries=settings.SEND_MAX_RETRIES,
+    backoff_base=settings.SEND_BACKOFF_BASE,
+    backoff_max=settings.SEND_BACKOFF_MAX,
+)
+metrics_registry.register("send_dispatcher", send_dispatcher.metrics)
 
 
-async def get_user_info(sender_psid: str):
-    url = f"{settings.FACEBOOK_URL}/v11.0/{sender_psid}?fields=first_name,last_name,profile_pic&access_token={settings.PAGE_ACCESS_TOKEN}"
+async def get_user_info(sender_psid: str, page_id: Optional[str] = None):
+    return await profile_cache.get(
+        sender_psid, await page_access_token(page_id)
+    )
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code == 200:
-            user_info = response.json()
-            print(f"User Info: {user_info}")
-            return user_info
-        else:
-            print(f"Error fetching user info: {response.text}")
-            return None
+
+async def fetch_user_info(
+    sender_psid: str, access_token: Optional[str] = None
+):
+    client = http_clients.get(GRAPH_API)
+    response = await client.get(
+        f"/v11.0/{sender_psid}",
+        params={
+            "fields": "first_name,last_name,profile_pic",
+            "access_token": access_token or settings.PAGE_ACCESS_TOKEN,
+        },
+    )
+    if response.status_code == 200:
+        user_info = response.json()
+        print(f"User Info: {user_info}")
+        return user_info
+    else:
+        print(f"Error fetching user info: {response.text}")
+        return None
+
+
+async def fetch_user_infos(
+    sender_psids: List[str], access_token: Optional[str] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    # Một request cho nhiều người dùng: GET /?ids=a,b,c&fields=...
+    client = http_clients.get(GRAPH_API)
+    response = await client.get(
+        "/v11.0/",
+        params={
+            "ids": ",".join(sender_psids),
+            "fields": "first_name,last_name,profile_pic",
+            "access_token": access_token or settings.PAGE_ACCESS_TOKEN,
+        },
+    )
+    if response.status_code == 200:
+        return response.json()
+
+    # Graph từ chối cả request nếu một id không hợp lệ, thử lại từng id
+    if response.status_code == 400 and len(sender_psids) > 1:
+        user_infos = await asyncio.gather(
+            *(
+                fetch_user_info(sender_psid, access_token)
+                for sender_psid in sender_psids
+            )
+        )
+        return dict(zip(sender_psids, user_infos))
+
+    logger.error(f"Error fetching user infos: {response.text}")
+    return {}
+
+
+profile_loader = ProfileLoader(
+    fetch_many=fetch_user_infos,
+    batch_window=settings.PROFILE_BATCH_WINDOW,
+    max_batch_size=settings.PROFILE_BATCH_SIZE,
+)
+metrics_registry.register("profile_loader", profile_loader.metrics)
+
+profile_cache = ProfileCache(
+    fetch=profile_loader.load,
+    maxsize=settings.PROFILE_CACHE_SIZE,
+    ttl=settings.PROFILE_CACHE_TTL,
+    negative_ttl=settings.PROFILE_CACHE_NEGATIVE_TTL,
+    persist=settings.PROFILE_CACHE_PERSIST,
+)
+metrics_registry.register("profile_cache", profile_cache.metrics)
+
+
+class MessengerChannel(ChannelAdapter):
+    name = FACEBOOK_CHANNEL
+
+    def verify_request(
+        self, raw_body: bytes, headers: Mapping[str, str]
+    ) -> bool:
+        if not settings.FACEBOOK_APP_SECRET:
+            return True
+        return verify_hub_signature(
+            raw_body,
+            headers.get("X-Hub-Signature-256"),
+            settings.FACEBOOK_APP_SECRET,
+        )
+
+    def parse_events(self, raw_body: bytes) -> List[MessagingEvent]:
+        try:
+            webhook_object, webhook_events = parse_webhook_body(raw_body)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(str(e)) from None
+        if webhook_object != "page":
+            raise ValueError(f"Unexpected webhook object {webhook_object}")
+        return webhook_events
+
+    async def send_message(
+        self,
+        user_id: str,
+        message: Dict[str, Any],
+        page_id: Optional[str] = None,
+    ) -> None:
+        await send_dispatcher.send(
+            user_id,
+            {"recipient": {"id": user_id}, "message": message},
+            await page_access_token(page_id),
+        )
+
+    async def send_typing(
+        self, user_id: str, action: str, page_id: Optional[str] = None
+    ) -> None:
+        await send_typing_action(user_id, action, page_id)
+
+    async def get_user_profile(
+        self, user_id: str, page_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await get_user_info(user_id, page_id)
+
+    async def close(self) -> None:
+        await send_dispatcher.stop()
+
+
+messenger_channel = MessengerChannel()
+channel_registry.register(messenger_channel)
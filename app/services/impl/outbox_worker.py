@@ -0,0 +1,201 @@
+import asyncio
+import random
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.common.logger import setup_logger
+from app.crud.crud_outbox_message import crud_outbox_message
+from app.db.session import SessionLocal
+from app.schema.outbox_message_schema import OutboxMessageCreateSchema
+
+logger = setup_logger()
+
+OutboxHandler = Callable[[Optional[str], Dict[str, Any]], Awaitable[None]]
+
+
+class OutboxWorker:
+    """
+    Durable retry of outbound calls through the `outbox_message` table.
+
+    `enqueue` stores a failed call; a pool of workers claims due rows in
+    batches (`SELECT ... FOR UPDATE SKIP LOCKED`, so several workers and
+    several app instances can share the table), runs the handler registered
+    for the row's `kind`, and either marks it sent or schedules the next
+    attempt with jittered exponential backoff. After `max_attempts` the row
+    is moved to the dead-letter state and kept for inspection.
+    """
+
+    def __init__(
+        self,
+        handlers: Optional[Dict[str, OutboxHandler]] = None,
+        workers: int = 4,
+        batch_size: int = 20,
+        poll_interval: float = 1.0,
+        lease: float = 60.0,
+        max_attempts: int = 8,
+        backoff_base: float = 2.0,
+        backoff_max: float = 600.0,
+    ):
+        self.handlers: Dict[str, OutboxHandler] = dict(handlers or {})
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+        self._enqueued = 0
+        self._claimed = 0
+        self._sent = 0
+        self._retried = 0
+        self._dead = 0
+        self._errors = 0
+
+    def register(self, kind: str, handler: OutboxHandler) -> None:
+        self.handlers[kind] = handler
+
+    async def enqueue(
+        self, kind: str, recipient_id: Optional[str], payload: Dict[str, Any]
+    ) -> None:
+        obj_in = OutboxMessageCreateSchema(
+            kind=kind,
+            recipient_id=recipient_id,
+            payload=payload,
+            max_attempts=self.max_attempts,
+        )
+        await run_in_threadpool(self._create, obj_in)
+        self._enqueued += 1
+        self._wakeup.set()
+
+    def _create(self, obj_in: OutboxMessageCreateSchema) -> None:
+        with SessionLocal() as db:
+            crud_outbox_message.create(db, obj_in=obj_in)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"outbox-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                rows = await run_in_threadpool(self._claim)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Failed to claim outbox messages: {e}")
+                rows = []
+
+            if rows:
+                self._claimed += len(rows)
+                for row in rows:
+                    await self._deliver(row)
+                if len(rows) == self.batch_size:
+                    continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        with SessionLocal() as db:
+            rows = crud_outbox_message.claim_batch(
+                db, limit=self.batch_size, lease=self.lease
+            )
+            # Detach plain values, the session is closed before delivery
+            return [
+                {
+                    "id": row.id,
+                    "kind": row.kind,
+                    "recipient_id": row.recipient_id,
+                    "payload": row.payload,
+                    "attempts": row.attempts,
+                    "max_attempts": row.max_attempts,
+                }
+                for row in rows
+            ]
+
+    async def _deliver(self, row: Dict[str, Any]) -> None:
+        handler = self.handlers.get(row["kind"])
+        try:
+            if handler is None:
+                raise LookupError(f"No outbox handler for kind {row['kind']}")
+            await handler(row["recipient_id"], row["payload"])
+        except asyncio.CancelledError:
+            # The lease expires and another worker picks the row up again
+            raise
+        except Exception as e:
+            await self._fail(row, e)
+            return
+
+        self._sent += 1
+        await self._mark(crud_outbox_message.mark_sent, id=row["id"])
+
+    async def _fail(self, row: Dict[str, Any], error: Exception) -> None:
+        dead = row["attempts"] >= row["max_attempts"]
+        retry_in = self._backoff(row["attempts"])
+        if dead:
+            self._dead += 1
+            logger.error(
+                f"Outbox message {row['id']} ({row['kind']}) moved to "
+                f"dead-letter after {row['attempts']} attempts: {error}"
+            )
+        else:
+            self._retried += 1
+            logger.warning(
+                f"Outbox message {row['id']} ({row['kind']}) failed, "
+                f"retry in {retry_in:.1f}s: {error}"
+            )
+        await self._mark(
+            crud_outbox_message.mark_failed,
+            id=row["id"],
+            error=str(error),
+            retry_in=retry_in,
+            dead=dead,
+        )
+
+    async def _mark(self, method: Callable[..., None], **kwargs: Any) -> None:
+        def run() -> None:
+            with SessionLocal() as db:
+                method(db, **kwargs)
+
+        try:
+            await run_in_threadpool(run)
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Failed to update outbox message {kwargs['id']}: {e}")
+            logger.error(traceback.format_exc())
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.5)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._tasks),
+            "workers": self.workers,
+            "enqueued": self._enqueued,
+            "claimed": self._claimed,
+            "sent": self._sent,
+            "retried": self._retried,
+            "dead": self._dead,
+            "errors": self._errors,
+        }
@@ -0,0 +1,162 @@
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from app.common.logger import setup_logger
+from app.common.metrics import metrics_registry
+from app.core.config import settings
+from app.crud.crud_page import crud_page
+from app.db.session import SessionLocal
+from app.models.page import Page
+
+logger = setup_logger()
+
+
+class PageConfig:
+    """Tenant configuration of one page (Facebook page, Zalo OA)."""
+
+    __slots__ = ("channel", "page_id", "store_id", "access_token", "ai_url")
+
+    def __init__(
+        self,
+        channel: str,
+        page_id: str,
+        store_id: str,
+        access_token: Optional[str] = None,
+        ai_url: Optional[str] = None,
+    ):
+        self.channel = channel
+        self.page_id = page_id
+        self.store_id = store_id
+        self.access_token = access_token
+        self.ai_url = ai_url
+
+
+class PageRegistry:
+    """
+    Page id -> `PageConfig`, read from the `page` table behind an in-process
+    TTL cache, so resolving the tenant of an event is a dict lookup for any
+    page seen in the last `ttl` seconds. Concurrent misses for the same page
+    share one query, and pages missing from the table are cached as such for
+    `negative_ttl`.
+
+    `get` returns None for unknown pages; callers then fall back to the
+    single-page settings (PAGE_ACCESS_TOKEN, DEFAULT_STORE_ID, AI_URL).
+    Writes to the `page` table through the ORM clear the cache of this
+    process; other workers see the change after `ttl`.
+    """
+
+    def __init__(
+        self, maxsize: int = 10000, ttl: float = 300, negative_ttl: float = 60
+    ):
+        self._pages: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._missing: TTLCache = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._errors = 0
+
+    async def get(
+        self, channel: str, page_id: Optional[str]
+    ) -> Optional[PageConfig]:
+        if not page_id:
+            return None
+        key = (channel, page_id)
+        page = self._pages.get(key)
+        if page is not None:
+            self._hits += 1
+            return page
+        if key in self._missing:
+            self._hits += 1
+            return None
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self._hits += 1
+            return await asyncio.shield(future)
+
+        self._misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            page = await self._load(channel, page_id)
+            future.set_result(page)
+            return page
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def invalidate(
+        self, channel: Optional[str] = None, page_id: Optional[str] = None
+    ) -> None:
+        """Forget one page, or every page when called without arguments."""
+        if channel is None or page_id is None:
+            self._pages.clear()
+            self._missing.clear()
+            return
+        self._pages.pop((channel, page_id), None)
+        self._missing.pop((channel, page_id), None)
+
+    async def _load(self, channel: str, page_id: str) -> Optional[PageConfig]:
+        self._loads += 1
+        try:
+            page = await run_in_threadpool(self._read, channel, page_id)
+        except Exception as e:
+            # Không cache lỗi DB, lần sau đọc lại
+            self._errors += 1
+            logger.error(f"Failed to read page {channel}:{page_id}: {e}")
+            return None
+
+        if page is None:
+            self._missing[(channel, page_id)] = True
+        else:
+            self._pages[(channel, page_id)] = page
+        return page
+
+    def _read(self, channel: str, page_id: str) -> Optional[PageConfig]:
+        with SessionLocal() as db:
+            row = crud_page.get_active(db, channel=channel, page_id=page_id)
+            if row is None:
+                return None
+            return PageConfig(
+                channel=row.channel,
+                page_id=row.page_id,
+                store_id=row.store_id,
+                access_token=row.access_token,
+                ai_url=row.ai_url,
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._pages),
+            "missing": len(self._missing),
+            "hits": self._hits,
+            "misses": self._misses,
+            "loads": self._loads,
+            "errors": self._errors,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+        }
+
+
+page_registry = PageRegistry(
+    maxsize=settings.PAGE_REGISTRY_SIZE,
+    ttl=settings.PAGE_REGISTRY_TTL,
+    negative_ttl=settings.PAGE_REGISTRY_NEGATIVE_TTL,
+)
+metrics_registry.register("page_registry", page_registry.metrics)
+
+
+@event.listens_for(Page, "after_insert")
+@event.listens_for(Page, "after_update")
+@event.listens_for(Page, "after_delete")
+def _forget_pages(mapper, connection, target) -> None:
+    # Page id hoặc channel có thể vừa đổi, xoá hết: bảng page ít khi ghi
+    page_registry.invalidate()
@@ -0,0 +1,168 @@
+import asyncio
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cachetools import TTLCache
+from starlette.concurrency import run_in_threadpool
+
+from app.common.logger import setup_logger
+from app.crud.crud_facebook_profile import crud_facebook_profile
+from app.db.session import SessionLocal
+from app.schema.facebook_profile_schema import FacebookProfileCreateSchema
+
+logger = setup_logger()
+
+PROFILE_FIELDS = ("first_name", "last_name", "profile_pic")
+
+
+class ProfileCache:
+    """
+    Async LRU + TTL cache of Graph API user profiles keyed by PSID.
+
+    Concurrent lookups of the same PSID share a single upstream request, and
+    failed lookups are cached for `negative_ttl` so a broken profile does not
+    eat the rate-limit budget. With `persist`, profiles are also read from
+    and written to the `facebook_profile` table, which acts as a second level
+    that survives restarts.
+
+    `access_token` is handed to `fetch` as is, so each channel can read the
+    profile with the token of the page the user wrote to. PSIDs are scoped
+    to one page, so the cache stays keyed by PSID alone.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[
+            [str, Optional[str]], Awaitable[Optional[Dict[str, Any]]]
+        ],
+        maxsize: int = 10000,
+        ttl: float = 3600,
+        negative_ttl: float = 60,
+        persist: bool = False,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.persist = persist
+        self._profiles: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._failures: TTLCache = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._db_hits = 0
+        self._fetches = 0
+        self._errors = 0
+
+    async def get(
+        self, psid: str, access_token: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        profile = self._profiles.get(psid)
+        if profile is not None:
+            self._hits += 1
+            return profile
+        if psid in self._failures:
+            self._negative_hits += 1
+            return None
+
+        future = self._in_flight.get(psid)
+        if future is not None:
+            self._coalesced += 1
+            return await asyncio.shield(future)
+
+        self._misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[psid] = future
+        try:
+            profile = await self._load(psid, access_token)
+            future.set_result(profile)
+            return profile
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[psid]
+
+    def invalidate(self, psid: str) -> None:
+        self._profiles.pop(psid, None)
+        self._failures.pop(psid, None)
+
+    async def _load(
+        self, psid: str, access_token: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        if self.persist:
+            try:
+                profile = await run_in_threadpool(self._read_persisted, psid)
+            except Exception as e:
+                logger.error(f"Failed to read persisted profile of {psid}: {e}")
+                profile = None
+            if profile is not None:
+                self._db_hits += 1
+                self._profiles[psid] = profile
+                return profile
+
+        self._fetches += 1
+        try:
+            profile = await self.fetch(psid, access_token)
+        except Exception as e:
+            logger.error(f"Error fetching user info of {psid}: {e}")
+            profile = None
+
+        if profile is None:
+            self._errors += 1
+            self._failures[psid] = True
+            return None
+
+        self._profiles[psid] = profile
+        if self.persist:
+            await run_in_threadpool(self._write_persisted, psid, profile)
+        return profile
+
+    def _read_persisted(self, psid: str) -> Optional[Dict[str, Any]]:
+        with SessionLocal() as db:
+            row = crud_facebook_profile.get_one_by(db, {"psid": psid})
+            if row is None or row.updated_at is None:
+                return None
+            if time.time() - row.updated_at.timestamp() > self.ttl:
+                return None
+            return {"id": psid, **{f: getattr(row, f) for f in PROFILE_FIELDS}}
+
+    def _write_persisted(self, psid: str, profile: Dict[str, Any]) -> None:
+        values = {f: profile.get(f) for f in PROFILE_FIELDS}
+        try:
+            with SessionLocal() as db:
+                row = crud_facebook_profile.get_one_by(db, {"psid": psid})
+                if row is None:
+                    obj_in = FacebookProfileCreateSchema(psid=psid, **values)
+                    crud_facebook_profile.create(db, obj_in=obj_in)
+                else:
+                    crud_facebook_profile.update(db, db_obj=row, obj_in=values)
+        except Exception as e:
+            logger.error(f"Failed to persist profile of {psid}: {e}")
+            logger.error(traceback.format_exc())
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self._hits + self._negative_hits + self._misses + self._coalesced
+        return {
+            "size": len(self._profiles),
+            "negative_size": len(self._failures),
+            "hits": self._hits,
+            "negative_hits": self._negative_hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "db_hits": self._db_hits,
+            "fetches": self._fetches,
+            "errors": self._errors,
+            "hit_rate": (
+                (self._hits + self._negative_hits + self._coalesced) / lookups
+                if lookups
+                else 0.0
+            ),
+        }
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.common.logger import setup_logger
+
+logger = setup_logger()
+
+
+class ProfileLoader:
+    """
+    DataLoader-style micro-batching of profile lookups: PSIDs requested
+    within `batch_window` seconds are resolved together by one `fetch_many`
+    call (a Graph `?ids=a,b,c` request), and the results are handed back to
+    each caller. A batch is sent early once it holds `max_batch_size` ids
+    (the Graph API accepts at most 50). Lookups are batched per access
+    token, since a PSID can only be read with the token of its page.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[
+            [List[str], Optional[str]],
+            Awaitable[Dict[str, Optional[Dict[str, Any]]]],
+        ],
+        batch_window: float = 0.005,
+        max_batch_size: int = 50,
+    ):
+        self.fetch_many = fetch_many
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._pending: Dict[Optional[str], Dict[str, asyncio.Future]] = {}
+        self._in_flight: Dict[Tuple[Optional[str], str], asyncio.Future] = {}
+        self._timers: Dict[Optional[str], asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._loads = 0
+        self._batches = 0
+        self._batched_ids = 0
+        self._errors = 0
+
+    async def load(
+        self, psid: str, access_token: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        self._loads += 1
+        pending = self._pending.get(access_token, {})
+        future = pending.get(psid) or self._in_flight.get((access_token, psid))
+        if future is None:
+            loop = asyncio.get_running_loop()
+            pending = self._pending.setdefault(access_token, pending)
+            future = pending[psid] = loop.create_future()
+
+            if len(pending) >= self.max_batch_size:
+                self._dispatch(access_token)
+            elif access_token not in self._timers:
+                self._timers[access_token] = loop.call_later(
+                    self.batch_window, self._dispatch, access_token
+                )
+
+        return await asyncio.shield(future)
+
+    def _dispatch(self, access_token: Optional[str]) -> None:
+        timer = self._timers.pop(access_token, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(access_token, None)
+        if not batch:
+            return
+
+        for psid, future in batch.items():
+            self._in_flight[(access_token, psid)] = future
+        task = asyncio.get_running_loop().create_task(
+            self._resolve(batch, access_token)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(
+        self, batch: Dict[str, asyncio.Future], access_token: Optional[str]
+    ) -> None:
+        self._batches += 1
+        self._batched_ids += len(batch)
+        try:
+            profiles = await self.fetch_many(list(batch), access_token)
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Error fetching profiles {list(batch)}: {e}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+            return
+        finally:
+            for psid in batch:
+                self._in_flight.pop((access_token, psid), None)
+
+        for psid, future in batch.items():
+            if not future.done():
+                future.set_result(profiles.get(psid))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "loads": self._loads,
+            "batches": self._batches,
+            "avg_batch_size": (
+                self._batched_ids / self._batches if self._batches else 0.0
+            ),
+            "errors": self._errors,
+        }
@@ -0,0 +1,113 @@
+import re
+import time
+import unicodedata
+from typing import Any, Callable, Dict, Optional
+
+from cachetools import TTLCache
+
+# Score in [0, 1] of how close two normalized messages are
+Similarity = Callable[[str, str], float]
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """Lower case, NFC, no punctuation, single spaces."""
+    text = unicodedata.normalize("NFC", text).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def exact_match(a: str, b: str) -> float:
+    return 1.0 if a == b else 0.0
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of AI answers per store, for FAQ-style questions asked
+    again and again ("giá bao nhiêu", "ship không").
+
+    Messages are compared after `normalize_message`. By default only the
+    same normalized text is a hit; with another `similarity` function the
+    cached questions of the store are scored too and the best one at or
+    above `threshold` is used.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        ttl: float = 3600,
+        max_message_length: int = 200,
+        similarity: Similarity = exact_match,
+        threshold: float = 1.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_message_length = max_message_length
+        self.similarity = similarity
+        self.threshold = threshold
+        self.timer = timer
+        self._stores: Dict[str, TTLCache] = {}
+
+        self._hits = 0
+        self._similar_hits = 0
+        self._misses = 0
+        self._skipped = 0
+
+    def cacheable(self, message: str) -> bool:
+        # Câu dài thường là câu hỏi riêng của khách, không đáng cache
+        return 0 < len(message) <= self.max_message_length
+
+    def get(self, store_id: str, message: str) -> Optional[str]:
+        if not self.cacheable(message):
+            self._skipped += 1
+            return None
+
+        key = normalize_message(message)
+        answers = self._stores.get(store_id)
+        answer = answers.get(key) if answers is not None else None
+        if answer is not None:
+            self._hits += 1
+            return answer
+
+        if answers and self.similarity is not exact_match:
+            best, best_score = None, self.threshold
+            for question in list(answers.keys()):
+                score = self.similarity(key, question)
+                if score >= best_score:
+                    best, best_score = question, score
+            if best is not None:
+                answer = answers.get(best)
+                if answer is not None:
+                    self._similar_hits += 1
+                    return answer
+
+        self._misses += 1
+        return None
+
+    def put(self, store_id: str, message: str, answer: str) -> None:
+        if not self.cacheable(message) or not answer:
+            return
+        answers = self._stores.get(store_id)
+        if answers is None:
+            answers = self._stores[store_id] = TTLCache(
+                maxsize=self.maxsize, ttl=self.ttl, timer=self.timer
+            )
+        answers[normalize_message(message)] = answer
+
+    def metrics(self) -> Dict[str, Any]:
+        hits = self._hits + self._similar_hits
+        lookups = hits + self._misses
+        return {
+            "hits": self._hits,
+            "similar_hits": self._similar_hits,
+            "misses": self._misses,
+            "skipped": self._skipped,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            # Mỗi lần hit là một lần không phải gọi agent/chat
+            "ai_calls_saved": hits,
+            "stores": len(self._stores),
+            "size": sum(len(answers) for answers in self._stores.values()),
+        }
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import random
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+import httpx
+from cachetools import TTLCache
+
+from app.common.logger import setup_logger
+from app.common.token_bucket import TokenBucket
+
+logger = setup_logger()
+
+# Graph API error codes meaning "slow down"
+THROTTLING_CODES = {4, 17, 32, 613, 80001, 80006}
+
+
+class SendApiError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_permanent_send_error(error: Exception) -> bool:
+    """A rejected request (e.g. the user blocked the page), retrying is
+    pointless."""
+    return (
+        isinstance(error, SendApiError)
+        and error.status_code is not None
+        and error.status_code < 500
+    )
+
+
+class SendDispatcher:
+    """
+    Outbound Send API dispatcher.
+
+    Requests to one recipient go through a FIFO lane so they are delivered
+    in order; each request waits for a token of its page (access token)
+    bucket and of its recipient bucket. The page rate follows the
+    `X-App-Usage` / `X-Business-Use-Case-Usage` headers returned by Graph:
+    it is reduced as usage gets close to 100% and paused for the
+    `estimated_time_to_regain_access`. Throttling errors, 5xx and transport
+    errors are retried with jittered exponential backoff.
+
+    Other APIs with the same shape (token, recipient, error codes) plug in
+    by overriding `_post`, `_check` and `throttling_codes`.
+    """
+
+    throttling_codes = THROTTLING_CODES
+
+    def __init__(
+        self,
+        get_client: Callable[[], httpx.AsyncClient],
+        path: str = "/v11.0/me/messages",
+        page_rate: float = 250,
+        recipient_rate: float = 1,
+        recipient_burst: float = 5,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30,
+        max_recipients: int = 100000,
+    ):
+        self.get_client = get_client
+        self.path = path
+        self.page_rate = page_rate
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._page_buckets: Dict[str, TokenBucket] = {}
+        self._page_usage: Dict[str, float] = {}
+        self._recipient_buckets: TTLCache = TTLCache(
+            maxsize=max_recipients, ttl=max(60, recipient_burst / recipient_rate)
+        )
+        self._lanes: Dict[
+            str, Deque[Tuple[Dict[str, Any], str, asyncio.Future]]
+        ] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._sent = 0
+        self._retried = 0
+        self._throttled = 0
+        self._failed = 0
+
+    async def send(
+        self, recipient_id: str, payload: Dict[str, Any], access_token: str
+    ) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        lane = self._lanes.get(recipient_id)
+        if lane is None:
+            lane = self._lanes[recipient_id] = deque()
+            task = asyncio.create_task(self._drain(recipient_id, lane))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        lane.append((payload, access_token, future))
+        return await future
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        # Drain what is already queued, cancel the lanes that do not finish
+        tasks = list(self._tasks)
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _drain(
+        self,
+        recipient_id: str,
+        lane: Deque[Tuple[Dict[str, Any], str, asyncio.Future]],
+    ) -> None:
+        try:
+            while lane:
+                payload, access_token, future = lane.popleft()
+                try:
+                    result = await self._deliver(
+                        recipient_id, payload, access_token
+                    )
+                    if not future.done():
+                        future.set_result(result)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+        finally:
+            del self._lanes[recipient_id]
+
+    async def _deliver(
+        self, recipient_id: str, payload: Dict[str, Any], access_token: str
+    ) -> Dict[str, Any]:
+        page_bucket = self._page_bucket(access_token)
+        recipient_bucket = self._recipient_bucket(recipient_id)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._retried += 1
+                await asyncio.sleep(self._backoff(attempt))
+
+            await page_bucket.acquire()
+            await recipient_bucket.acquire()
+
+            try:
+                response = await self._post(payload, access_token)
+            except httpx.TransportError as e:
+                logger.warning(f"Send API transport error: {e}")
+                continue
+
+            self._observe_usage(access_token, page_bucket, response.headers)
+
+            ok, code = self._check(response)
+            if ok:
+                self._sent += 1
+                return response.json()
+
+            if code in self.throttling_codes:
+                self._throttled += 1
+                page_bucket.pause(self._backoff(attempt + 1))
+                continue
+            if response.status_code >= 500:
+                continue
+
+            self._failed += 1
+            raise SendApiError(
+                f"Send API error {response.status_code}: {response.text}",
+                response.status_code,
+            )
+
+        self._failed += 1
+        raise SendApiError(
+            f"Send API gave up after {self.max_retries} retries"
+        )
+
+    async def _post(
+        self, payload: Dict[str, Any], access_token: str
+    ) -> httpx.Response:
+        return await self.get_client().post(
+            self.path, params={"access_token": access_token}, json=payload
+        )
+
+    def _check(self, response: httpx.Response) -> Tuple[bool, Optional[int]]:
+        """Whether the call succeeded, and the API error code if it did not."""
+        if response.status_code == 200:
+            return True, None
+        return False, _error_code(response)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.5)
+
+    def _page_bucket(self, access_token: str) -> TokenBucket:
+        bucket = self._page_buckets.get(access_token)
+        if bucket is None:
+            bucket = self._page_buckets[access_token] = TokenBucket(
+                self.page_rate
+            )
+        return bucket
+
+    def _recipient_bucket(self, recipient_id: str) -> TokenBucket:
+        bucket = self._recipient_buckets.get(recipient_id)
+        if bucket is None:
+            bucket = self._recipient_buckets[recipient_id] = TokenBucket(
+                self.recipient_rate, self.recipient_burst
+            )
+        return bucket
+
+    def _observe_usage(
+        self, access_token: str, bucket: TokenBucket, headers: httpx.Headers
+    ) -> None:
+        usage, regain_minutes = _parse_usage(headers)
+        if usage is None:
+            return
+
+        self._page_usage[access_token] = usage
+        # Full speed below 75% of the quota, then slow down linearly
+        factor = 1.0 if usage < 75 else max(0.05, (100 - usage) / 25)
+        bucket.set_rate(self.page_rate * factor)
+        if regain_minutes:
+            bucket.pause(regain_minutes * 60)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "sent": self._sent,
+            "retried": self._retried,
+            "throttled": self._throttled,
+            "failed": self._failed,
+            "lanes": len(self._lanes),
+            "queued": sum(len(lane) for lane in self._lanes.values()),
+            "pages": [
+                {
+                    "usage": self._page_usage.get(token),
+                    "rate": bucket.rate,
+                    "paused": bucket.paused,
+                }
+                for token, bucket in self._page_buckets.items()
+            ],
+        }
+
+
+def _error_code(response: httpx.Response) -> Optional[int]:
+    try:
+        return response.json().get("error", {}).get("code")
+    except ValueError:
+        return None
+
+
+def _parse_usage(headers: httpx.Headers) -> Tuple[Optional[float], float]:
+    """
+    Highest usage percentage reported by Graph and the longest
+    `estimated_time_to_regain_access` (minutes).
+    """
+    values = []
+    regain_minutes = 0.0
+    try:
+        app_usage = headers.get("x-app-usage")
+        if app_usage:
+            values.extend(json.loads(app_usage).values())
+
+        business_usage = headers.get("x-business-use-case-usage")
+        if business_usage:
+            for entries in json.loads(business_usage).values():
+                for entry in entries:
+                    values.extend(
+                        entry.get(key, 0)
+                        for key in ("call_count", "total_cputime", "total_time")
+                    )
+                    regain_minutes = max(
+                        regain_minutes,
+                        entry.get("estimated_time_to_regain_access", 0),
+                    )
+    except (ValueError, AttributeError, TypeError):
+        return None, 0.0
+
+    if not values:
+        return None, regain_minutes
+    return float(max(values)), regain_minutes
@@ -0,0 +1,76 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from app.common.enum import TypingPolicy
+from app.common.logger import setup_logger
+
+logger = setup_logger()
+
+
+class TypingIndicator:
+    """
+    Shows the typing indicator while a reply is being produced, according to
+    a `TypingPolicy`:
+
+    * `off`: never send sender actions.
+    * `single`: send one `typing_on` alongside the work, the reply clears it.
+    * `while_processing`: keep the indicator alive (Messenger hides it after
+      ~20s) until the work finishes, then send `typing_off`.
+
+    Sender actions are sent concurrently with the wrapped work, so no policy
+    delays the reply.
+    """
+
+    def __init__(
+        self,
+        policy: TypingPolicy,
+        send_action: Callable[[str, str], Awaitable[None]],
+        refresh_interval: float = 15,
+    ):
+        self.policy = TypingPolicy(policy)
+        self.send_action = send_action
+        self.refresh_interval = refresh_interval
+
+    @asynccontextmanager
+    async def while_processing(self, sender_psid: str):
+        if self.policy == TypingPolicy.OFF:
+            yield
+            return
+
+        if self.policy == TypingPolicy.SINGLE:
+            task = asyncio.create_task(self._send(sender_psid, "typing_on"))
+            try:
+                yield
+            finally:
+                # Make sure typing_on is not delivered after the reply
+                await task
+            return
+
+        task = asyncio.create_task(self._keep_alive(sender_psid))
+        try:
+            yield
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await self._send(sender_psid, "typing_off")
+
+    async def show(self, sender_psid: str) -> None:
+        """Indicator between two messages of a reply that is still coming."""
+        if self.policy != TypingPolicy.OFF:
+            await self._send(sender_psid, "typing_on")
+
+    async def hide(self, sender_psid: str) -> None:
+        if self.policy != TypingPolicy.OFF:
+            await self._send(sender_psid, "typing_off")
+
+    async def _keep_alive(self, sender_psid: str):
+        while True:
+            await self._send(sender_psid, "typing_on")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _send(self, sender_psid: str, action: str) -> None:
+        try:
+            await self.send_action(sender_psid, action)
+        except Exception as e:
+            logger.warning(f"Failed to send {action} to {sender_psid}: {e}")
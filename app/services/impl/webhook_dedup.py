@@ -0,0 +1,63 @@
+import time
+from typing import Any, Dict, Optional
+
+from app.common.logger import setup_logger
+from app.services.abc.dedup_store import DedupStore
+from app.services.impl.webhook_events import MessagingEvent
+
+logger = setup_logger()
+
+
+def dedupe_key(event: MessagingEvent) -> Optional[str]:
+    """
+    Idempotency key of a messaging event: the message `mid`, or the sender
+    and timestamp of a postback. Other events are not deduplicated.
+    """
+    if event.kind == MessagingEvent.MESSAGE and event.mid:
+        return f"{event.channel}:mid:{event.mid}"
+    if event.kind == MessagingEvent.POSTBACK and event.timestamp is not None:
+        return f"{event.channel}:postback:{event.sender_id}:{event.timestamp}"
+    return None
+
+
+class WebhookDeduplicator:
+    """
+    Drops webhook events Facebook redelivers (e.g. when the ack was slow)
+    before they reach the debounce buffer. Store errors fail open: the
+    event is processed rather than lost.
+    """
+
+    def __init__(self, store: DedupStore):
+        self.store = store
+        self._checked = 0
+        self._duplicates = 0
+        self._errors = 0
+
+    async def is_duplicate(self, event: MessagingEvent) -> bool:
+        key = dedupe_key(event)
+        if key is None:
+            return False
+
+        self._checked += 1
+        try:
+            added = await self.store.add(key, time.time())
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Dedup store failed for {key}: {e}")
+            return False
+
+        if not added:
+            self._duplicates += 1
+            logger.info(f"Dropped duplicate webhook event {key}")
+        return not added
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "checked": self._checked,
+            "duplicates": self._duplicates,
+            "errors": self._errors,
+            "hit_rate": (
+                self._duplicates / self._checked if self._checked else 0.0
+            ),
+            **self.store.metrics(),
+        }
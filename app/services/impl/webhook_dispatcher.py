@@ -0,0 +1,95 @@
+import asyncio
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.common.logger import setup_logger
+from app.services.impl.webhook_events import MessagingEvent
+
+logger = setup_logger()
+
+
+def group_events_by_sender(
+    webhook_events: List[MessagingEvent],
+) -> Dict[str, List[MessagingEvent]]:
+    groups: Dict[str, List[MessagingEvent]] = {}
+    for webhook_event in webhook_events:
+        groups.setdefault(webhook_event.sender_id, []).append(webhook_event)
+    return groups
+
+
+class WebhookDispatcher:
+    """
+    Runs the events of a batch grouped by sender: the events of one sender
+    are handled one after another, different senders run concurrently up to
+    `concurrency` at a time. A per-sender lock keeps the order across batches
+    that are processed by different workers.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, MessagingEvent], Awaitable[None]],
+        concurrency: int = 64,
+    ):
+        self.handler = handler
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._sender_locks: Dict[str, asyncio.Lock] = {}
+        self._sender_refs: Dict[str, int] = {}
+
+        self._batches = 0
+        self._events = 0
+        self._failed = 0
+        self._active_senders = 0
+
+    async def dispatch(self, webhook_events: List[MessagingEvent]) -> None:
+        groups = group_events_by_sender(webhook_events)
+        self._batches += 1
+
+        await asyncio.gather(
+            *(
+                self._dispatch_sender(sender_psid, sender_events)
+                for sender_psid, sender_events in groups.items()
+            )
+        )
+
+    async def _dispatch_sender(
+        self, sender_psid: str, sender_events: List[MessagingEvent]
+    ) -> None:
+        lock = self._sender_locks.get(sender_psid)
+        if lock is None:
+            lock = self._sender_locks[sender_psid] = asyncio.Lock()
+        self._sender_refs[sender_psid] = self._sender_refs.get(sender_psid, 0) + 1
+
+        try:
+            async with lock, self._semaphore:
+                self._active_senders += 1
+                try:
+                    for webhook_event in sender_events:
+                        await self._handle(sender_psid, webhook_event)
+                finally:
+                    self._active_senders -= 1
+        finally:
+            self._sender_refs[sender_psid] -= 1
+            if self._sender_refs[sender_psid] == 0:
+                del self._sender_refs[sender_psid]
+                del self._sender_locks[sender_psid]
+
+    async def _handle(self, sender_psid: str, webhook_event: MessagingEvent):
+        self._events += 1
+        try:
+            await self.handler(sender_psid, webhook_event)
+        except Exception as e:
+            # One broken event must not drop the rest of the sender's events
+            self._failed += 1
+            logger.error(f"Failed to handle event from {sender_psid}: {e}")
+            logger.error(traceback.format_exc())
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "batches": self._batches,
+            "events": self._events,
+            "failed": self._failed,
+            "active_senders": self._active_senders,
+            "waiting_senders": len(self._sender_locks) - self._active_senders,
+        }
@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+FACEBOOK_CHANNEL = "facebook"
+
+
+class MessagingEvent:
+    """
+    One `messaging` item of a Messenger webhook, reduced to the fields the
+    pipeline uses. `kind` is "message", "postback" or "other"; `channel`
+    names the adapter the event came from (and the reply goes back through).
+    """
+
+    MESSAGE = "message"
+    POSTBACK = "postback"
+    OTHER = "other"
+
+    __slots__ = (
+        "channel",
+        "kind",
+        "sender_id",
+        "recipient_id",
+        "timestamp",
+        "mid",
+        "text",
+        "attachment_url",
+        "postback_payload",
+    )
+
+    def __init__(
+        self,
+        kind: str,
+        sender_id: str,
+        recipient_id: Optional[str] = None,
+        timestamp: Optional[int] = None,
+        mid: Optional[str] = None,
+        text: str = "",
+        attachment_url: str = "",
+        postback_payload: Optional[str] = None,
+        channel: str = FACEBOOK_CHANNEL,
+    ):
+        self.channel = channel
+        self.kind = kind
+        self.sender_id = sender_id
+        self.recipient_id = recipient_id
+        self.timestamp = timestamp
+        self.mid = mid
+        self.text = text
+        self.attachment_url = attachment_url
+        self.postback_payload = postback_payload
+
+    @classmethod
+    def from_messaging(
+        cls, item: Dict[str, Any]
+    ) -> Optional["MessagingEvent"]:
+        sender_id = _object(item.get("sender")).get("id")
+        if not sender_id:
+            return None
+
+        recipient_id = _object(item.get("recipient")).get("id")
+        timestamp = item.get("timestamp")
+
+        message = item.get("message")
+        if isinstance(message, dict):
+            attachments = message.get("attachments")
+            attachment_url = ""
+            if attachments and isinstance(attachments, list):
+                payload = _object(_object(attachments[0]).get("payload"))
+                attachment_url = payload.get("url") or ""
+            return cls(
+                cls.MESSAGE,
+                sender_id,
+                recipient_id,
+                timestamp,
+                mid=message.get("mid"),
+                text=message.get("text") or "",
+                attachment_url=attachment_url,
+            )
+
+        postback = item.get("postback")
+        if isinstance(postback, dict):
+            return cls(
+                cls.POSTBACK,
+                sender_id,
+                recipient_id,
+                timestamp,
+                mid=postback.get("mid"),
+                postback_payload=postback.get("payload"),
+            )
+
+        return cls(cls.OTHER, sender_id, recipient_id, timestamp)
+
+    def __repr__(self) -> str:
+        return (
+            f"MessagingEvent(channel={self.channel!r}, kind={self.kind!r}, "
+            f"sender_id={self.sender_id!r}, mid={self.mid!r})"
+        )
+
+
+def parse_webhook_body(
+    raw: bytes,
+) -> Tuple[Optional[str], List[MessagingEvent]]:
+    """
+    Parse a raw (possibly batched) webhook body once with orjson and return
+    its `object` together with the messaging events of every entry, in the
+    order Facebook sent them. Raises `orjson.JSONDecodeError` on bad JSON;
+    entries and items of the wrong type are skipped.
+    """
+    body = orjson.loads(raw)
+    if not isinstance(body, dict):
+        return None, []
+
+    events = []
+    for entry in _array(body.get("entry")):
+        if not isinstance(entry, dict):
+            continue
+        for item in _array(entry.get("messaging")):
+            if not isinstance(item, dict):
+                continue
+            event = MessagingEvent.from_messaging(item)
+            if event is not None:
+                events.append(event)
+    return body.get("object"), events
+
+
+def _object(value: Any) -> Dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+def _array(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else []
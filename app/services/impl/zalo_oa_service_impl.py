@@ -0,0 +1,17 @@
+from fastapi import Request
+
+from app.common.metrics import metrics_registry
+from app.services.abc.zalo_oa_service import ZaloOAService
+from app.services.impl.channel_registry import channel_registry
+from app.services.impl.conversation_engine_impl import conversation_engine
+from app.services.impl.zalo_oa_channel import ZaloOAChannel
+
+# Cùng hàng đợi, debounce và AI với Messenger, chỉ khác adapter của kênh
+zalo_channel = ZaloOAChannel()
+channel_registry.register(zalo_channel)
+metrics_registry.register("zalo_oa_channel", zalo_channel.metrics)
+
+
+class ZaloOAServiceImpl(ZaloOAService):
+    async def post_webhook(self, request: Request) -> str:
+        return await conversation_engine.receive(zalo_channel, request)
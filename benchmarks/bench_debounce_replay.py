@@ -0,0 +1,123 @@
+"""
+Replays message bursts through the debounce logic and reports the
+time-to-first-reply (first message of a burst -> flush to the AI), for the
+old fixed 10 s wait and for `DebouncePolicy`.
+
+    python -m benchmarks.bench_debounce_replay [--bursts recorded.jsonl]
+
+A recorded file has one burst per line:
+`{"sender": "psid", "at": [0.0, 1.2, 2.0], "texts": ["a", "b", "c?"]}`,
+with `at` in seconds; bursts of a sender must be in time order. Without a
+file a seeded synthetic replay of fast and slow typers is used. The AI call
+itself is not included, only the time spent waiting for the burst to end.
+Bursts split into several flushes are counted separately: each split is an
+extra AI call and a reply to half a question.
+"""
+
+import argparse
+import json
+import random
+import statistics
+from typing import Dict, List, Tuple
+
+from benchmarks import setup_env
+
+setup_env()
+
+from app.core.config import settings  # noqa
+from app.services.impl.debounce_policy import DebouncePolicy  # noqa
+
+Burst = Tuple[str, List[float], List[str]]
+
+FIXED_WAIT = 10
+
+
+def synthetic_bursts(senders: int = 500, seed: int = 7) -> List[Burst]:
+    rng = random.Random(seed)
+    bursts = []
+    for s in range(senders):
+        typing_gap = rng.choice([0.6, 1.0, 2.0, 4.0])
+        start = 0.0
+        for _ in range(rng.randint(3, 8)):
+            size = rng.choice([1, 1, 2, 3, 4, 6])
+            at = [start]
+            for _ in range(size - 1):
+                at.append(at[-1] + rng.lognormvariate(0, 0.4) * typing_gap)
+            texts = ["tin nhắn"] * size
+            if rng.random() < 0.5:
+                texts[-1] = "còn hàng không?"
+            bursts.append((f"psid-{s}", at, texts))
+            start = at[-1] + rng.uniform(60, 600)
+    return bursts
+
+
+def load_bursts(path: str) -> List[Burst]:
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["sender"], row["at"], row["texts"]) for row in rows]
+
+
+def replay_fixed(bursts: List[Burst]) -> Tuple[List[float], int]:
+    # Code cũ: mỗi tin nhắn hủy timer và chờ lại 10 giây
+    waits, splits = [], 0
+    for _, at, _ in bursts:
+        flushes = [
+            t + FIXED_WAIT
+            for t, following in zip(at, at[1:] + [None])
+            if following is None or following >= t + FIXED_WAIT
+        ]
+        waits.append(flushes[0] - at[0])
+        splits += len(flushes) - 1
+    return waits, splits
+
+
+def replay_policy(
+    bursts: List[Burst], policy: DebouncePolicy
+) -> Tuple[List[float], int]:
+    waits, splits = [], 0
+    deadlines: Dict[str, float] = {}
+    for sender, at, texts in bursts:
+        flushes = []
+        for t, text in zip(at, texts):
+            deadline = deadlines.get(sender)
+            if t > at[0] and t >= deadline:
+                # Phần trước của burst đã flush trước khi tin này tới
+                flushes.append(deadline)
+            deadlines[sender] = policy.deadline(
+                sender, t, text=text, has_attachment=False
+            )
+        flushes.append(deadlines[sender])
+        waits.append(flushes[0] - at[0])
+        splits += len(flushes) - 1
+    return waits, splits
+
+
+def report(name: str, waits: List[float], splits: int, bursts: int) -> None:
+    quantiles = statistics.quantiles(waits, n=100)
+    print(
+        f"{name:<8} p50 {quantiles[49]:5.2f}s  p95 {quantiles[94]:5.2f}s  "
+        f"split bursts {splits}/{bursts}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", help="recorded bursts, JSON lines")
+    args = parser.parse_args()
+
+    bursts = load_bursts(args.bursts) if args.bursts else synthetic_bursts()
+    policy = DebouncePolicy(
+        min_wait=settings.DEBOUNCE_MIN_WAIT,
+        max_wait=settings.DEBOUNCE_MAX_WAIT,
+        idle_gap=settings.DEBOUNCE_IDLE_GAP,
+        gap_multiplier=settings.DEBOUNCE_GAP_MULTIPLIER,
+        max_buffer=settings.DEBOUNCE_MAX_BUFFER,
+    )
+
+    print(f"{len(bursts)} bursts")
+    report("fixed", *replay_fixed(bursts), len(bursts))
+    report("adaptive", *replay_policy(bursts, policy), len(bursts))
+
+
+if __name__ == "__main__":
+    main()
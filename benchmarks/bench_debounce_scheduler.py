@@ -0,0 +1,119 @@
+"""
+Memory and CPU of the debounce timers for many concurrent senders: the
+`DebounceScheduler` (one task, deadlines in the store) against the former
+one `asyncio.create_task(sleep)` per sender, cancelled and recreated on
+every message.
+
+    python -m benchmarks.bench_debounce_scheduler [--senders 10000 100000]
+
+Each sender sends `--messages` messages in a burst and is flushed `--wait`
+seconds after the last one; the flush itself does nothing. CPU is the
+process time from the first message to the last flush, memory is the
+tracemalloc peak of a second, identical run.
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Dict
+
+from benchmarks import setup_env
+
+setup_env()
+
+from app.services.impl.debounce_scheduler import DebounceScheduler  # noqa
+from app.services.impl.debounce_store_impl import (  # noqa
+    InMemoryDebounceStore,
+)
+
+
+async def per_task(senders: int, messages: int, wait: float) -> None:
+    done = asyncio.Event()
+    flushed = 0
+    timers: Dict[str, asyncio.Task] = {}
+    buffers: Dict[str, list] = {}
+
+    async def flush_later(sender_psid: str) -> None:
+        nonlocal flushed
+        await asyncio.sleep(wait)
+        buffers.pop(sender_psid)
+        del timers[sender_psid]
+        flushed += 1
+        if flushed == senders:
+            done.set()
+
+    for i in range(messages):
+        for s in range(senders):
+            sender_psid = f"psid-{s}"
+            buffers.setdefault(sender_psid, []).append(f"tin {i}")
+            timer = timers.get(sender_psid)
+            if timer is not None:
+                timer.cancel()
+            timers[sender_psid] = asyncio.create_task(flush_later(sender_psid))
+        await asyncio.sleep(0)
+    await done.wait()
+
+
+async def scheduler(senders: int, messages: int, wait: float) -> None:
+    done = asyncio.Event()
+    flushed = 0
+
+    async def flush(sender_psid, pending) -> None:
+        nonlocal flushed
+        flushed += 1
+        if flushed == senders:
+            done.set()
+
+    store = InMemoryDebounceStore()
+    debounce = DebounceScheduler(
+        store, flush, batch_size=1000, max_concurrent_flushes=1000
+    )
+    await debounce.start()
+    for i in range(messages):
+        for s in range(senders):
+            deadline = time.time() + wait
+            await store.append(f"psid-{s}", f"tin {i}", time.time(), deadline)
+            debounce.notify(deadline)
+        await asyncio.sleep(0)
+    await done.wait()
+    await debounce.stop()
+
+
+def measure(
+    run: Callable[[int, int, float], Awaitable[None]],
+    senders: int,
+    messages: int,
+    wait: float,
+):
+    started = time.process_time()
+    asyncio.run(run(senders, messages, wait))
+    cpu = time.process_time() - started
+
+    tracemalloc.start()
+    asyncio.run(run(senders, messages, wait))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--senders", type=int, nargs="+", default=[10000, 50000, 100000]
+    )
+    parser.add_argument("--messages", type=int, default=3)
+    parser.add_argument("--wait", type=float, default=0.5)
+    args = parser.parse_args()
+
+    for senders in args.senders:
+        for name, run in (("per-task", per_task), ("scheduler", scheduler)):
+            cpu, peak = measure(run, senders, args.messages, args.wait)
+            print(
+                f"{senders:>7} senders {name:<10} "
+                f"cpu {cpu:6.2f}s  peak {peak / 2**20:7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
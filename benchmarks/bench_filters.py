@@ -0,0 +1,173 @@
+"""
+Building list queries from large `filter` / `join` params: name resolution
+through the per-model index, with and without the compiled-shape cache.
+
+    python -m benchmarks.bench_filters [--clauses 1 8 32 128] \\
+        [--number 2000] [--url sqlite:///file.db]
+
+Each filter mixes columns of the listed model and of two joined models
+(`orders.total__gt`, `customer.city__like`, ...) and most operator kinds.
+`get_filter` is the uncached path (`get_one_by`), `cold` clears the shape
+caches before every build and `warm` only fills new values. `no index`
+runs `get_filter` with the model index rebuilt from the mapper on every
+lookup. With `--url` the statements also run against an empty schema, to
+check they are valid SQL.
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks import setup_env
+
+setup_env()
+
+from sqlalchemy import (  # noqa
+    Column,
+    ForeignKey,
+    Integer,
+    String,
+    create_engine,
+    inspect,
+)
+from sqlalchemy.orm import Session, declarative_base, relationship  # noqa
+
+from app.db import query_builder as qb  # noqa
+
+Base = declarative_base()
+
+
+class Customer(Base):
+    __tablename__ = "bench_customer"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    city = Column(String)
+
+
+class Shop(Base):
+    __tablename__ = "bench_shop"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    city = Column(String)
+    rating = Column(Integer)
+    opened_year = Column(Integer)
+    customer_id = Column(ForeignKey("bench_customer.id"))
+    customer = relationship(Customer)
+    orders = relationship("Order")
+
+
+class Order(Base):
+    __tablename__ = "bench_order"
+    id = Column(Integer, primary_key=True)
+    shop_id = Column(ForeignKey("bench_shop.id"))
+    total = Column(Integer)
+    status = Column(String)
+
+
+JOIN = json.dumps({"orders": {}, "customer": {}})
+CLAUSES = [
+    lambda n: ("name__ilike", f"shop {n}"),
+    lambda n: ("rating__gte", n % 5),
+    lambda n: ("city__in", [f"c{n}", f"c{n + 1}"]),
+    lambda n: ("opened_year__between", [2000, 2000 + n % 25]),
+    lambda n: ("orders.total__gt", n),
+    lambda n: ("orders.status__neq", f"s{n}"),
+    lambda n: ("customer.city__like", f"{n}"),
+    lambda n: ("customer.name__isnull", False),
+]
+
+
+def make_filter(clauses: int, n: int) -> dict:
+    # Từng nhóm 4 điều kiện AND, các nhóm nối bằng OR
+    groups = []
+    for start in range(0, clauses, 4):
+        groups.append(
+            dict(
+                CLAUSES[(start + i) % len(CLAUSES)](n + start + i)
+                for i in range(min(4, clauses - start))
+            )
+        )
+    return groups[0] if len(groups) == 1 else groups
+
+
+def count_conditions(filter) -> int:
+    groups = filter if isinstance(filter, list) else [filter]
+    return sum(len(group) for group in groups)
+
+
+def rate(build, number: int, cold: bool = False) -> float:
+    started = time.perf_counter()
+    for n in range(number):
+        if cold:
+            qb._compile_clauses.cache_clear()
+            qb._compile_select.cache_clear()
+        build(n)
+    return number / (time.perf_counter() - started)
+
+
+def without_index():
+    # Dựng lại index ở mỗi lần tra tên
+    original = qb.get_model_index
+    qb.get_model_index = lambda model: qb.ModelIndex(inspect(model))
+    return original
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--clauses", type=int, nargs="+", default=[1, 8, 32, 128]
+    )
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--url")
+    args = parser.parse_args()
+
+    db = Session()
+    for clauses in args.clauses:
+        filters = [json.dumps(make_filter(clauses, n)) for n in range(100)]
+        parsed = [json.loads(f) for f in filters]
+        conditions = count_conditions(parsed[0])
+
+        def uncached(n):
+            return qb.get_filter(Shop, parsed[n % 100])
+
+        def build(n):
+            return qb.query_builder(
+                db,
+                Shop,
+                filter=filters[n % 100],
+                order_by="-rating",
+                join=JOIN,
+            )
+
+        rates = {
+            "get_filter": rate(uncached, args.number),
+            "cold": rate(build, args.number, cold=True),
+            "warm": rate(build, args.number),
+        }
+        original = without_index()
+        try:
+            rates["no index"] = rate(uncached, args.number)
+        finally:
+            qb.get_model_index = original
+        print(
+            f"{conditions:>4} conditions, 2 joins: "
+            + ", ".join(f"{k} {v:>8,.0f}/s" for k, v in rates.items())
+        )
+
+    if args.url:
+        engine = create_engine(args.url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            for clauses in args.clauses:
+                statement, params = qb.compile_select(
+                    Shop,
+                    filter=json.dumps(make_filter(clauses, 0)),
+                    join=JOIN,
+                )
+                session.scalars(statement, params).all()
+        Base.metadata.drop_all(engine)
+        print(f"statements ran on {engine.dialect.name}")
+
+
+if __name__ == "__main__":
+    main()
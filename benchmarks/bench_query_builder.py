@@ -0,0 +1,85 @@
+"""
+Microbenchmark of building a list statement from the `filter` / `orderBy`
+/ `join` params: cold (shape caches cleared before every call, as each
+request used to rebuild its clauses) vs warm (same shape, new values).
+
+    python -m benchmarks.bench_query_builder [--number 20000]
+
+No database is needed; the sync `query_builder` is timed on an unbound
+Session, the async path through `compile_select`.
+"""
+
+import argparse
+import time
+
+from benchmarks import setup_env
+
+setup_env()
+
+from sqlalchemy.orm import Session  # noqa
+
+from app.db.query_builder import (  # noqa
+    _compile_clauses,
+    _compile_select,
+    compile_select,
+    query_builder,
+    query_cache_info,
+)
+from app.models import Item  # noqa
+
+FILTERS = {
+    "equal": lambda n: f'{{"full_name": "khách {n}"}}',
+    "and of 4": lambda n: (
+        f'{{"full_name__ilike": "{n}", "is_active": true, '
+        f'"created_at__gte": "2024-01-0{n % 9 + 1}", '
+        f'"id__in": ["{n}", "{n + 1}"]}}'
+    ),
+    "(a or b) and c": lambda n: (
+        f'{{"0": [{{"full_name__like": "{n}"}}, {{"full_name": "x{n}"}}], '
+        f'"created_at__between": ["2024-01-01", "2024-02-0{n % 9 + 1}"]}}'
+    ),
+}
+
+
+def clear() -> None:
+    _compile_clauses.cache_clear()
+    _compile_select.cache_clear()
+
+
+def rate(build, number: int, cold: bool) -> float:
+    started = time.perf_counter()
+    for n in range(number):
+        if cold:
+            clear()
+        build(n)
+    return number / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    db = Session()
+    for label, make_filter in FILTERS.items():
+        builders = {
+            "query_builder": lambda n: query_builder(
+                db, Item, filter=make_filter(n), order_by="-created_at"
+            ),
+            "compile_select": lambda n: compile_select(
+                Item, filter=make_filter(n), order_by="-created_at"
+            ),
+        }
+        for name, build in builders.items():
+            cold = rate(build, args.number, cold=True)
+            clear()
+            warm = rate(build, args.number, cold=False)
+            print(
+                f"{label:>14} {name:>14}: cold {cold:>9,.0f}/s, "
+                f"warm {warm:>9,.0f}/s ({warm / cold:.1f}x)"
+            )
+    print(query_cache_info())
+
+
+if __name__ == "__main__":
+    main()
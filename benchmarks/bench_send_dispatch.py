@@ -0,0 +1,127 @@
+"""
+Load test of the Send API dispatcher against a fake Graph API that enforces
+a per-page quota: past `--quota` calls per second it answers error 613, and
+every response carries the `X-App-Usage` of the current window.
+
+    python -m benchmarks.bench_send_dispatch [--recipients 200] [--messages 10]
+
+Compares posting every reply directly (the old `call_send_api`) with the
+dispatcher: delivered messages, throttling errors, lost messages and
+per-recipient order violations.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+import httpx
+
+from benchmarks import setup_env
+
+setup_env()
+
+from app.services.impl.send_dispatcher import SendDispatcher  # noqa
+
+
+class FakeGraph:
+    def __init__(self, quota: int, latency: float):
+        self.quota = quota
+        self.latency = latency
+        self.window = deque()
+        self.delivered = {}
+        self.throttled = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(random.uniform(0, self.latency))
+        now = time.monotonic()
+        while self.window and self.window[0] < now - 1:
+            self.window.popleft()
+        usage = {"call_count": int(len(self.window) * 100 / self.quota)}
+        headers = {"X-App-Usage": json.dumps(usage)}
+
+        if len(self.window) >= self.quota:
+            self.throttled += 1
+            return httpx.Response(
+                400, json={"error": {"code": 613}}, headers=headers
+            )
+        self.window.append(now)
+        payload = json.loads(request.content)
+        self.delivered.setdefault(payload["recipient"]["id"], []).append(
+            payload["message"]["text"]
+        )
+        return httpx.Response(200, json={"message_id": "m"}, headers=headers)
+
+
+async def send_direct(client, payload):
+    # Như call_send_api cũ: lỗi chỉ được log, tin nhắn bị bỏ
+    await client.post(
+        "/v11.0/me/messages", params={"access_token": "t"}, json=payload
+    )
+
+
+async def run(mode: str, args) -> None:
+    graph = FakeGraph(args.quota, args.latency)
+    client = httpx.AsyncClient(
+        base_url="http://graph.test", transport=httpx.MockTransport(graph.handle)
+    )
+    dispatcher = SendDispatcher(
+        lambda: client,
+        page_rate=args.quota,
+        recipient_rate=args.recipient_rate,
+        backoff_base=0.05,
+        backoff_max=2,
+        max_retries=10,
+    )
+
+    sends = []
+
+    async def reply(recipient_id: str) -> None:
+        for n in range(args.messages):
+            payload = {
+                "recipient": {"id": recipient_id},
+                "message": {"text": str(n)},
+            }
+            if mode == "direct":
+                send = send_direct(client, payload)
+            else:
+                send = dispatcher.send(recipient_id, payload, "t")
+            sends.append(asyncio.ensure_future(send))
+            await asyncio.sleep(random.uniform(0, 0.01))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(reply(f"u{i}") for i in range(args.recipients)))
+    await asyncio.gather(*sends)
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+
+    total = args.recipients * args.messages
+    delivered = sum(len(m) for m in graph.delivered.values())
+    out_of_order = sum(
+        1 for m in graph.delivered.values() if m != sorted(m, key=int)
+    )
+    print(
+        f"{mode:>10}: {delivered:>6}/{total} delivered in {elapsed:6.2f}s "
+        f"({delivered / elapsed:8,.0f}/s), {graph.throttled:>6} throttled, "
+        f"{total - delivered:>6} lost, {out_of_order:>4} recipients out of order"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--quota", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--recipient-rate", type=float, default=20)
+    args = parser.parse_args()
+
+    for mode in ("direct", "dispatcher"):
+        random.seed(0)
+        asyncio.run(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
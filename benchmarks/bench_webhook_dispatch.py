@@ -0,0 +1,146 @@
+"""
+Load test of the Messenger webhook endpoint: signed bodies with 1 / 100 /
+1000 messaging events are POSTed to `/webhook` by concurrent clients.
+
+    python -m benchmarks.bench_webhook_dispatch [--senders 50] \\
+        [--requests 2000] [--concurrency 1 10 50]
+
+The app is served in-process through an ASGI transport, so every request
+goes through the signature check (`X-Hub-Signature-256`), the body parsing
+and the enqueue, then the queue workers dedupe and buffer the events by
+sender. The debounce scheduler is not started: nothing reaches the AI or
+the Send API. `acked` is the rate of 200 responses, `drained` the event rate
+until the queue workers have handled every accepted batch.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import os
+import time
+
+import orjson
+
+from benchmarks import setup_env
+
+setup_env()
+APP_SECRET = "bench-secret"
+os.environ.setdefault("FACEBOOK_APP_SECRET", APP_SECRET)
+
+import httpx  # noqa
+from fastapi import FastAPI  # noqa
+
+from app.api.v1.endpoints import facebook  # noqa
+from app.services.impl.conversation_engine_impl import (  # noqa
+    conversation_engine,
+)
+
+# mid khác nhau ở mọi request, để dedup không bỏ bớt sự kiện
+_mids = itertools.count()
+
+
+def build_body(events: int, senders: int) -> bytes:
+    messaging = [
+        {
+            "sender": {"id": f"psid-{i % senders}"},
+            "recipient": {"id": "page-1"},
+            "timestamp": 1700000000000 + i,
+            "message": {"mid": f"m-{next(_mids)}", "text": f"tin nhắn {i}"},
+        }
+        for i in range(events)
+    ]
+    # Facebook gom tối đa vài chục messaging item trong một entry
+    entries = [
+        {"id": "page-1", "time": 1700000000000, "messaging": chunk}
+        for chunk in (messaging[i : i + 50] for i in range(0, events, 50))
+    ]
+    return orjson.dumps({"object": "page", "entry": entries})
+
+
+def sign(raw: bytes) -> str:
+    digest = hmac.new(APP_SECRET.encode(), raw, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+async def run(
+    client: httpx.AsyncClient,
+    events: int,
+    senders: int,
+    requests: int,
+    concurrency: int,
+):
+    # Body được ký trước, ngoài phần đo
+    bodies = [build_body(events, senders) for _ in range(requests)]
+    remaining = iter(bodies)
+    statuses = {}
+
+    async def user():
+        for raw in remaining:
+            response = await client.post(
+                "/webhook",
+                content=raw,
+                headers={
+                    "content-type": "application/json",
+                    "X-Hub-Signature-256": sign(raw),
+                },
+            )
+            statuses[response.status_code] = (
+                statuses.get(response.status_code, 0) + 1
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    acked = time.perf_counter() - started
+    await conversation_engine.queue._queue.join()
+    drained = time.perf_counter() - started
+    return statuses, acked, drained
+
+
+async def bench(args) -> None:
+    app = FastAPI()
+    app.include_router(facebook.router)
+    await conversation_engine.queue.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://app", timeout=None
+    ) as client:
+        raw = build_body(1, 1)
+        rejected = await client.post(
+            "/webhook", content=raw, headers={"X-Hub-Signature-256": "x"}
+        )
+        assert rejected.status_code == 403, rejected.status_code
+
+        for events in (1, 100, 1000):
+            requests = max(10, args.requests * 10 // max(events, 10))
+            for concurrency in args.concurrency:
+                statuses, acked, drained = await run(
+                    client, events, args.senders, requests, concurrency
+                )
+                ok = statuses.get(200, 0)
+                print(
+                    f"{events:>5} events x {requests:>5} requests, "
+                    f"concurrency {concurrency:>3}: "
+                    f"acked {ok / acked:>8,.0f} req/s "
+                    f"({ok * events / acked:>10,.0f} events/s), "
+                    f"drained {ok * events / drained:>10,.0f} events/s, "
+                    f"503 {statuses.get(503, 0)}"
+                )
+    await conversation_engine.queue.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 10, 50]
+    )
+    args = parser.parse_args()
+
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
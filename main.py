@@ -1,12 +1,32 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.api.v1.api import api_router
+from app.common.http_client import http_clients
 from app.core.config import settings
 from app.db.init_db import init_db
+from app.db.query_builder import build_model_index
+from app.db.session import async_engine
+from app.services.impl.channel_registry import channel_registry
+from app.services.impl.conversation_engine_impl import conversation_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    build_model_index()
+    http_clients.open()
+    await conversation_engine.start()
+    yield
+    await conversation_engine.stop()
+    await channel_registry.close()
+    await http_clients.aclose()
+    await async_engine.dispose()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add SessionMiddleware
 app.add_middleware(SessionMiddleware, secret_key=settings.JWT_SECRET_KEY)
@@ -0,0 +1,64 @@
+import os
+
+import fakeredis
+import pytest
+
+# Settings đọc biến môi trường lúc import, nên phải đặt trước khi import app
+for name, value in {
+    "ENV": "test",
+    "JWT_SECRET_KEY": "test",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "MY_VERIFY_TOKEN": "verify-token",
+    "PAGE_ACCESS_TOKEN": "page-token",
+    "FACEBOOK_URL": "http://graph.test",
+    "AI_URL": "http://ai.test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """
+    Local fake for the Redis-backed stores: every `from_url` call returns a
+    client of the same in-process server, like several workers sharing one
+    Redis.
+    """
+    server = fakeredis.FakeServer()
+
+    def from_url(url, **kwargs):
+        return fakeredis.FakeAsyncRedis(server=server, **kwargs)
+
+    monkeypatch.setattr("redis.asyncio.from_url", from_url)
+    return server
+
+
+@pytest.fixture
+def db(tmp_path):
+    """
+    Sync session on a SQLite file with the `item` table; `async_db` opens
+    the same file, so rows added through one are seen by the other.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.models import Item
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Item.__table__.create(engine)
+    with Session(engine, autoflush=False) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+async def async_db(tmp_path, db):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.common.circuit_breaker import CircuitBreaker
+from app.common.http_client import AI_BACKEND, http_clients
+from app.common.metrics import StageTimer
+from app.core.config import settings
+from app.services.abc.channel_adapter import ChannelAdapter
+from app.services.abc.debounce_store import PendingBuffer
+from app.services.impl.ai_stream import (
+    SentenceSplitter,
+    StreamInterruptedError,
+    iter_sse_data,
+    stream_ai_reply,
+)
+from app.services.impl.channel_registry import channel_registry
+from app.services.impl.conversation_engine_impl import conversation_engine
+
+REPLY = "Giá là 150000 đồng. Còn 2 màu nhé."
+# Token như backend thật gửi: số đứng riêng cũng là JSON hợp lệ
+TOKENS = [
+    "Giá", " là", " 150000", " đồng", ".", " Còn", " 2", " màu", " nhé", ".",
+]
+
+
+def sse(frames, delay: float = 0.0, fail_after=None):
+    async def body():
+        for n, frame in enumerate(frames):
+            if n == fail_after:
+                raise httpx.ReadError("connection reset")
+            if delay:
+                await asyncio.sleep(delay)
+            yield f"data: {frame}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    return body()
+
+
+class FakeAI:
+    """Backend AI giả trả lời bằng SSE, `frames` là data của từng event."""
+
+    def __init__(self, frames, delay: float = 0.0, fail_after=None):
+        self.frames = frames
+        self.delay = delay
+        self.fail_after = fail_after
+        self.requests = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(json.loads(request.content))
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            content=sse(self.frames, self.delay, self.fail_after),
+        )
+
+
+class FakeChannel(ChannelAdapter):
+    name = "fake"
+
+    def __init__(self):
+        self.sent = []
+
+    def verify_request(self, raw_body, headers):
+        return True
+
+    def parse_events(self, raw_body):
+        return []
+
+    async def send_message(self, user_id, message, page_id=None):
+        self.sent.append((time.monotonic(), message["text"]))
+
+    async def get_user_profile(self, user_id, page_id=None):
+        return None
+
+
+@pytest.fixture
+def ai_backend(monkeypatch):
+    clients = []
+
+    def install(fake: FakeAI) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(
+            base_url="http://ai.test", transport=httpx.MockTransport(fake.handle)
+        )
+        clients.append(client)
+        monkeypatch.setitem(http_clients._clients, AI_BACKEND, client)
+        return client
+
+    return install
+
+
+@pytest.fixture
+def channel(monkeypatch):
+    fake = FakeChannel()
+    monkeypatch.setitem(channel_registry._channels, fake.name, fake)
+    return fake
+
+
+async def collect(client, path="/agent/chat/"):
+    return [d async for d in stream_ai_reply(client, path, {"message": "?"})]
+
+
+@pytest.mark.parametrize(
+    "frames",
+    [
+        TOKENS,
+        # Event đầu tiên là số: vẫn là luồng text thường
+        [" 2", " màu", " nhé"],
+        ["true", " story", " 2024", " null"],
+    ],
+)
+async def test_plain_text_tokens_are_kept_verbatim(ai_backend, frames):
+    client = ai_backend(FakeAI(frames))
+
+    assert await collect(client) == frames
+
+
+async def test_json_events_are_decoded(ai_backend):
+    frames = [
+        json.dumps({"delta": "Giá là "}),
+        json.dumps({"token": "150000"}),
+        json.dumps(" đồng."),
+        json.dumps({"type": "usage"}),
+        "2024",
+    ]
+    client = ai_backend(FakeAI(frames))
+
+    assert await collect(client) == ["Giá là ", "150000", " đồng.", "2024"]
+
+
+async def test_multiline_sse_data_is_joined():
+    async def lines():
+        for line in ["data: a", "data: b", ": ping", "", "data: c", ""]:
+            yield line
+
+    assert [d async for d in iter_sse_data(lines())] == ["a\nb", "c"]
+
+
+def test_sentence_splitter_glues_short_sentences():
+    splitter = SentenceSplitter(min_chars=15)
+    chunks = []
+    for token in TOKENS:
+        chunks += splitter.feed(token)
+    chunks += splitter.flush()
+
+    assert chunks == ["Giá là 150000 đồng.", "Còn 2 màu nhé."]
+    assert " ".join(chunks) == REPLY
+
+
+async def test_stream_reply_delivers_the_exact_text(ai_backend, channel):
+    fake = FakeAI(TOKENS)
+    ai_backend(fake)
+
+    reply = await conversation_engine.stream_reply(
+        "fake::u1", {"message": "giá bao nhiêu?"}, StageTimer()
+    )
+
+    assert reply == REPLY
+    assert " ".join(text for _, text in channel.sent) == REPLY
+    assert fake.requests[0]["stream"] is True
+
+
+async def test_first_message_goes_out_before_the_stream_ends(
+    ai_backend, channel
+):
+    sentences = [
+        f"Câu trả lời số {n} đủ dài để được gửi thành một tin riêng. "
+        for n in range(5)
+    ]
+    tokens = [word + " " for s in sentences for word in s.split()]
+    ai_backend(FakeAI(tokens, delay=0.01))
+    timer = StageTimer()
+    started = time.monotonic()
+
+    reply = await conversation_engine.stream_reply(
+        "fake::u1", {"message": "?"}, timer
+    )
+    finished = time.monotonic()
+
+    assert reply == " ".join(s.strip() for s in sentences)
+    assert len(channel.sent) == 5
+    first_sent_at = channel.sent[0][0]
+    # Câu đầu đi khi mới nhận ~1/5 token, không chờ hết luồng
+    assert first_sent_at - started < (finished - started) / 2
+    assert timer.stages["first_message"] < (finished - started) / 2
+
+
+ERROR_TEXT = "Đã xảy ra lỗi khi gọi API. Vui lòng thử lại sau."
+LONG_TOKENS = [
+    w + " "
+    for n in range(3)
+    for w in f"Câu trả lời số {n} đủ dài để được gửi thành một tin riêng.".split()
+]
+
+
+async def test_stream_cut_off_midway_raises_after_telling_the_user(
+    ai_backend, channel
+):
+    ai_backend(FakeAI(LONG_TOKENS, fail_after=15))
+
+    with pytest.raises(StreamInterruptedError):
+        await conversation_engine.stream_reply(
+            "fake::u1", {"message": "?"}, StageTimer()
+        )
+
+    texts = [text for _, text in channel.sent]
+    assert texts[0].startswith("Câu trả lời số 0")
+    assert texts[-1] == ERROR_TEXT
+
+
+class NoPages:
+    async def get(self, channel, page_id):
+        return None
+
+
+async def test_dropped_streams_trip_the_ai_breaker(
+    ai_backend, channel, monkeypatch
+):
+    breaker = CircuitBreaker("ai", window=2, min_calls=2)
+    monkeypatch.setattr(conversation_engine, "ai_breaker", breaker)
+    monkeypatch.setattr(conversation_engine, "pages", NoPages())
+    monkeypatch.setattr(settings, "AI_STREAMING", True)
+    monkeypatch.setattr(settings, "OUTBOX_ENABLED", False)
+    fake = FakeAI(LONG_TOKENS, fail_after=15)
+    ai_backend(fake)
+
+    for _ in range(3):
+        await conversation_engine.flush(
+            "fake::u1", PendingBuffer(["giá?"], time.time())
+        )
+
+    # Hai luồng bị ngắt là hai lỗi: lần thứ ba không gọi backend nữa
+    assert breaker.state == CircuitBreaker.OPEN
+    assert len(fake.requests) == 2
+    texts = [text for _, text in channel.sent]
+    # Mỗi luồng bị ngắt chỉ báo lỗi một lần, không gửi lại câu trả lời
+    assert texts.count(ERROR_TEXT) == 3
+    assert sum(t.startswith("Câu trả lời số 0") for t in texts) == 2
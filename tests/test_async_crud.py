@@ -0,0 +1,99 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import deps
+from app.api.v1.endpoints import item
+from app.crud import async_crud_item, crud_item
+from app.schema import ItemCreate
+
+
+def filter_param(**kwargs):
+    return {
+        "skip": 0,
+        "limit": 100,
+        "filter": "{}",
+        "include": None,
+        "order_by": None,
+        "join": "{}",
+        "cursor": None,
+        "count": None,
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def items(db):
+    rows = [
+        crud_item.create(db, obj_in=ItemCreate(full_name=f"Khách {n}"))
+        for n in range(5)
+    ]
+    crud_item.remove(db, id=rows[4].id)
+    return rows
+
+
+async def test_get_multi_by_matches_the_sync_crud(db, async_db, items):
+    for param in [
+        filter_param(),
+        filter_param(filter='{"full_name": "Khách 1"}'),
+        filter_param(order_by="-full_name", skip=1, limit=2),
+    ]:
+        sync = crud_item.get_multi_by(db, filter_param=param)
+        result = await async_crud_item.get_multi_by(async_db, filter_param=param)
+
+        assert result["total"] == sync["total"]
+        assert [r.id for r in result["results"]] == [
+            r.id for r in sync["results"]
+        ]
+
+
+async def test_soft_deleted_rows_are_hidden(async_db, items):
+    result = await async_crud_item.get_multi_by(async_db, filter_param())
+
+    assert result["total"] == 4
+    assert await async_crud_item.get(async_db, items[4].id) is None
+    assert await async_crud_item.get(async_db, items[0].id) is not None
+
+
+async def test_create_patch_remove(async_db, items):
+    created = await async_crud_item.create(
+        async_db, obj_in=ItemCreate(full_name="Mới")
+    )
+    patched = await async_crud_item.patch(
+        async_db, db_obj=created, obj_in={"fullName": "Đã sửa"}
+    )
+    assert patched.full_name == "Đã sửa"
+    found = await async_crud_item.get_one_by(
+        async_db, {"full_name": "Đã sửa"}
+    )
+    assert found.id == created.id
+
+    await async_crud_item.remove(async_db, id=created.id)
+
+    assert await async_crud_item.get(async_db, created.id) is None
+
+
+async def test_items_endpoint_runs_on_the_async_session(async_db, items):
+    app = FastAPI()
+    app.include_router(item.router, prefix="/items")
+
+    async def get_async_db():
+        yield async_db
+
+    app.dependency_overrides[deps.get_async_db] = get_async_db
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://app"
+    ) as client:
+        response = await client.get(
+            "/items/", params={"limit": 2, "orderBy": "fullName"}
+        )
+        created = await client.post("/items/", json={"fullName": "Qua API"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 4
+    assert body["totalExact"] is True
+    assert [r["fullName"] for r in body["results"]] == ["Khách 0", "Khách 1"]
+    assert created.status_code == 200
+    assert created.json()["fullName"] == "Qua API"
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from app.common import circuit_breaker
+from app.common.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.common.stage import StageFullError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Chỉ thay đồng hồ của module, event loop vẫn dùng time.monotonic thật
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        name="ai",
+        failure_rate=0.5,
+        window=4,
+        min_calls=4,
+        reset_timeout=30,
+        half_open_calls=1,
+        excluded=(StageFullError,),
+    )
+
+
+async def ok():
+    return "ok"
+
+
+async def fail():
+    raise RuntimeError("backend down")
+
+
+async def call(breaker, func):
+    try:
+        return await breaker.call(func)
+    except RuntimeError:
+        return "failed"
+
+
+async def trip(breaker):
+    for _ in range(4):
+        await call(breaker, fail)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+async def test_trips_once_the_failure_rate_is_reached_over_min_calls(breaker):
+    # 3 lỗi liên tiếp nhưng chưa đủ min_calls thì vẫn đóng
+    for _ in range(3):
+        await call(breaker, fail)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    await call(breaker, ok)
+
+    # 3/4 lỗi >= 50%: mở, call tiếp theo bị từ chối ngay
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+    assert breaker.metrics()["rejected"] == 1
+    assert breaker.metrics()["opened"] == 1
+
+
+async def test_stays_closed_below_the_failure_rate(breaker):
+    for func in [fail, ok, ok, ok, fail, ok, ok, ok]:
+        await call(breaker, func)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.metrics()["failures"] == 2
+
+
+async def test_open_half_open_closed_cycle(breaker, clock):
+    await trip(breaker)
+
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+    clock.now += 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert await breaker.call(ok) == "ok"
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    # Cửa sổ được làm mới: một lỗi sau khi đóng không mở lại ngay
+    await call(breaker, fail)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_failed_probe_opens_for_another_period(breaker, clock):
+    await trip(breaker)
+    clock.now += 30
+
+    assert await call(breaker, fail) == "failed"
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.metrics()["opened"] == 2
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+    clock.now += 1
+    assert await breaker.call(ok) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_only_half_open_calls_probes_go_through(breaker, clock):
+    await trip(breaker)
+    clock.now += 30
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "ok"
+
+    probe = asyncio.create_task(breaker.call(slow))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+    release.set()
+
+    assert await probe == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_excluded_errors_are_not_failures(breaker):
+    async def shed():
+        raise StageFullError("Stage ai is full")
+
+    for _ in range(10):
+        with pytest.raises(StageFullError):
+            await breaker.call(shed)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.metrics()["calls"] == 0
+
+
+async def test_excluded_error_does_not_hold_the_probe(breaker, clock):
+    await trip(breaker)
+    clock.now += 30
+
+    async def shed():
+        raise StageFullError("Stage ai is full")
+
+    with pytest.raises(StageFullError):
+        await breaker.call(shed)
+
+    # Trạng thái chưa quyết định, probe tiếp theo vẫn được đi qua
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert await breaker.call(ok) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_cancelled_calls_are_not_counted(breaker):
+    task = asyncio.create_task(breaker.call(asyncio.sleep, 10))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.metrics()["calls"] == 0
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cachetools import TTLCache
+
+from app.crud import async_crud_item, crud_item
+from app.db import count_strategy
+from app.db.count_strategy import count_cache_key, get_total
+from app.models import Item
+from app.schema import ItemCreate
+
+
+def filter_param(**kwargs):
+    return {
+        "skip": 0,
+        "limit": 100,
+        "filter": "{}",
+        "include": None,
+        "order_by": None,
+        "join": "{}",
+        "cursor": None,
+        "count": None,
+        **kwargs,
+    }
+
+
+@pytest.fixture(autouse=True)
+def count_cache(monkeypatch):
+    cache = TTLCache(maxsize=100, ttl=60)
+    monkeypatch.setattr(count_strategy, "_count_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def items(db):
+    return [
+        crud_item.create(db, obj_in=ItemCreate(full_name=f"Khách {n % 2}"))
+        for n in range(5)
+    ]
+
+
+def test_cached_total_is_exact_on_a_miss_then_served_from_cache(db, items):
+    param = filter_param(filter='{"full_name": "Khách 0"}', count="cached")
+
+    first = crud_item.get_multi_by(db, param)
+    crud_item.create(db, obj_in=ItemCreate(full_name="Khách 0"))
+    second = crud_item.get_multi_by(db, param)
+
+    assert (first["total"], first["total_exact"]) == (3, True)
+    # Trong TTL vẫn trả total cũ, đánh dấu là không chính xác
+    assert (second["total"], second["total_exact"]) == (3, False)
+    assert len(second["results"]) == 4
+
+
+def test_cached_total_is_recounted_after_the_ttl(db, items, count_cache):
+    param = filter_param(count="cached")
+    crud_item.get_multi_by(db, param)
+    crud_item.create(db, obj_in=ItemCreate(full_name="Mới"))
+
+    count_cache.clear()
+    result = crud_item.get_multi_by(db, param)
+
+    assert (result["total"], result["total_exact"]) == (6, True)
+
+
+def test_filters_are_cached_apart(db, items):
+    for name, total in [("Khách 0", 3), ("Khách 1", 2), ("Khách 0", 3)]:
+        result = crud_item.get_multi_by(
+            db,
+            filter_param(filter=f'{{"full_name": "{name}"}}', count="cached"),
+        )
+        assert result["total"] == total
+
+
+def test_cache_key_ignores_key_order_and_spacing():
+    a = filter_param(filter='{"full_name": "a", "is_active": true}')
+    b = filter_param(filter='{ "is_active":true,"full_name":"a" }')
+    c = filter_param(filter='{"full_name": "b", "is_active": true}')
+
+    assert count_cache_key(Item, a) == count_cache_key(Item, b)
+    assert count_cache_key(Item, a) != count_cache_key(Item, c)
+    assert count_cache_key(Item, filter_param(filter=None)) == (
+        count_cache_key(Item, filter_param())
+    )
+
+
+async def test_async_crud_shares_the_cache(db, async_db, items):
+    param = filter_param(count="cached")
+    crud_item.get_multi_by(db, param)
+
+    result = await async_crud_item.get_multi_by(async_db, param)
+
+    assert (result["total"], result["total_exact"]) == (5, False)
+
+
+@pytest.mark.parametrize("count", ["estimated", "exact", None])
+async def test_estimated_falls_back_to_exact_off_postgres(
+    db, async_db, items, count
+):
+    param = filter_param(filter='{"full_name": "Khách 1"}', count=count)
+
+    sync = crud_item.get_multi_by(db, param)
+    result = await async_crud_item.get_multi_by(async_db, param)
+
+    assert (sync["total"], sync["total_exact"]) == (2, True)
+    assert (result["total"], result["total_exact"]) == (2, True)
+
+
+class CountQuery:
+    """Stand-in Query for `get_count`: the total is the filter length."""
+
+    def __init__(self, total):
+        self.total = total
+
+    def with_entities(self, *args):
+        return self
+
+    def scalar(self):
+        return self.total
+
+
+def test_cache_survives_concurrent_threads(monkeypatch):
+    # Cache nhỏ để các thread liên tục thêm và đẩy key ra cùng lúc
+    monkeypatch.setattr(
+        count_strategy, "_count_cache", TTLCache(maxsize=4, ttl=60)
+    )
+
+    def worker(n):
+        for i in range(2000):
+            name = f"k{(n + i) % 16}"
+            param = filter_param(filter=f'{{"n": "{name}"}}', count="cached")
+            total, _ = get_total(None, CountQuery(len(name)), Item, param)
+            assert total == len(name)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(worker, range(8)))
@@ -0,0 +1,77 @@
+import pytest
+
+from app.services.impl.debounce_policy import DebouncePolicy
+
+
+@pytest.fixture
+def policy():
+    return DebouncePolicy(
+        min_wait=1, max_wait=10, idle_gap=3, max_buffer=3, gap_multiplier=1.5
+    )
+
+
+def test_first_message_waits_the_idle_gap(policy):
+    assert policy.deadline("u1", now=100, text="shop ơi") == 103
+
+
+@pytest.mark.parametrize(
+    "text, has_attachment",
+    [("còn hàng không?", False), ("còn hàng không ?  ", False), ("", True)],
+)
+def test_complete_message_flushes_after_min_wait(policy, text, has_attachment):
+    deadline = policy.deadline(
+        "u1", now=100, text=text, has_attachment=has_attachment
+    )
+
+    assert deadline == 101
+
+
+def test_full_buffer_flushes_after_min_wait(policy):
+    policy.deadline("u1", now=100, text="a")
+    policy.deadline("u1", now=100.5, text="b")
+
+    assert policy.deadline("u1", now=101, text="c") == 102
+
+
+def test_burst_is_never_held_longer_than_max_wait():
+    policy = DebouncePolicy(min_wait=1, max_wait=10, idle_gap=8)
+    policy.deadline("u1", now=100, text="a")
+    policy.deadline("u1", now=105, text="b")
+
+    # Tin thứ 3 vẫn nằm trong burst nhưng không được vượt quá 100 + 10
+    assert policy.deadline("u1", now=109, text="c") == 110
+
+
+def test_gap_is_learned_per_sender(policy):
+    # Người gõ nhanh: khoảng cách 0.4s -> chờ ít hơn idle_gap mặc định
+    now = 0.0
+    for _ in range(2):
+        deadline = policy.deadline("fast", now=now, text="x")
+        now += 0.4
+    assert deadline - (now - 0.4) == pytest.approx(1)
+
+    # Người gõ chậm: khoảng cách 2.5s -> chờ lâu hơn, tối đa max_wait
+    now = 0.0
+    for _ in range(2):
+        deadline = policy.deadline("slow", now=now, text="x")
+        now += 2.5
+    assert deadline - (now - 2.5) == pytest.approx(3.75)
+
+    # Sender mới vẫn dùng idle_gap mặc định
+    assert policy.deadline("new", now=0, text="x") == 3
+
+
+def test_long_pause_starts_a_new_burst(policy):
+    policy.deadline("u1", now=0, text="a")
+    policy.deadline("u1", now=2, text="b")
+
+    # Sau khi burst trước đã flush, max_wait tính lại từ tin mới
+    assert policy.deadline("u1", now=60, text="c") == 63
+
+
+def test_sender_stats_are_bounded():
+    policy = DebouncePolicy(max_senders=2)
+    for i in range(5):
+        policy.deadline(f"u{i}", now=i)
+
+    assert list(policy._senders) == ["u3", "u4"]
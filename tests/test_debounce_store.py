@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.services.abc.debounce_store import PendingBuffer
+from app.services.impl.debounce_store_impl import (
+    InMemoryDebounceStore,
+    RedisDebounceStore,
+)
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def make_store(request):
+    """Factory of stores sharing one backend, one store per worker."""
+    if request.param == "memory":
+        store = InMemoryDebounceStore()
+        yield lambda: store
+        return
+
+    request.getfixturevalue("fake_redis")
+    stores = []
+
+    def make():
+        stores.append(RedisDebounceStore("redis://fake"))
+        return stores[-1]
+
+    yield make
+    for store in stores:
+        await store.close()
+
+
+async def test_take_waits_for_the_deadline(make_store):
+    store = make_store()
+    await store.append("u1", "xin chào", received_at=100, deadline=110)
+    await store.append("u1", "shop ơi", received_at=101, deadline=111)
+
+    assert await store.take("u1", now=110) is None
+    assert await store.due(now=110) == []
+    assert await store.next_deadline() == 111
+
+    pending = await store.take("u1", now=111)
+
+    assert pending.messages == ["xin chào", "shop ơi"]
+    assert pending.started_at == 100
+    assert await store.take("u1", now=200) is None
+    assert await store.next_deadline() is None
+
+
+async def test_due_lists_only_expired_senders(make_store):
+    store = make_store()
+    await store.append("u1", "a", received_at=0, deadline=5)
+    await store.append("u2", "b", received_at=0, deadline=15)
+    await store.append("u3", "c", received_at=0, deadline=8)
+
+    assert sorted(await store.due(now=10)) == ["u1", "u3"]
+
+
+async def test_generations_increase_per_take(make_store):
+    store = make_store()
+    await store.append("u1", "a", received_at=0, deadline=1)
+    first = await store.take("u1", now=1)
+    await store.append("u1", "b", received_at=2, deadline=3)
+    second = await store.take("u1", now=3)
+
+    assert second.generation > first.generation
+    assert second.messages == ["b"]
+
+
+async def test_restore_puts_messages_back_first(make_store):
+    store = make_store()
+    await store.append("u1", "a", received_at=0, deadline=1)
+    await store.append("u1", "b", received_at=0, deadline=1)
+    pending = await store.take("u1", now=1)
+    await store.append("u1", "c", received_at=2, deadline=30)
+
+    await store.restore("u1", pending, deadline=5)
+
+    assert await store.next_deadline() == 5
+    restored = await store.take("u1", now=5)
+    assert restored.messages == ["a", "b", "c"]
+    assert restored.started_at == 0
+
+
+async def test_only_one_worker_takes_a_buffer(make_store):
+    workers = [make_store() for _ in range(4)]
+    await workers[0].append("u1", "a", received_at=0, deadline=1)
+
+    taken = await asyncio.gather(
+        *(worker.take("u1", now=1) for worker in workers)
+    )
+
+    assert [p.messages for p in taken if p is not None] == [["a"]]
+
+
+async def test_buffer_survives_a_new_store_instance(make_store):
+    await make_store().append("u1", "a", received_at=0, deadline=1)
+
+    # Worker khác (hoặc sau khi restart) vẫn thấy buffer
+    pending = await make_store().take("u1", now=1)
+
+    assert isinstance(pending, PendingBuffer)
+    assert pending.messages == ["a"]
+
+
+async def test_due_does_not_consume_keys(make_store):
+    store = make_store()
+    await store.append("u1", "a", received_at=0, deadline=5)
+    await store.append("u2", "b", received_at=0, deadline=8)
+
+    assert await store.due(now=10, limit=1) == ["u1"]
+    # Một key chưa được take vẫn đến hạn ở lần gọi sau
+    assert sorted(await store.due(now=10)) == ["u1", "u2"]
+    await store.take("u1", now=10)
+    assert await store.due(now=10) == ["u2"]
+
+
+async def test_rescheduled_key_is_due_once(make_store):
+    store = make_store()
+    for deadline in (3, 4, 5):
+        await store.append("u1", "a", received_at=0, deadline=deadline)
+
+    assert await store.due(now=4) == []
+    assert await store.due(now=10) == ["u1"]
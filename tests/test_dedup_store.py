@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.services.impl.dedup_store_impl import (
+    InMemoryDedupStore,
+    RedisDedupStore,
+)
+
+
+async def test_memory_first_seen_then_duplicate():
+    store = InMemoryDedupStore(ttl=60, bucket_seconds=10)
+
+    assert await store.add("mid-1", now=1000) is True
+    assert await store.add("mid-1", now=1001) is False
+    assert await store.add("mid-2", now=1001) is True
+
+
+async def test_memory_key_expires_after_ttl():
+    store = InMemoryDedupStore(ttl=60, bucket_seconds=10)
+    await store.add("mid-1", now=1000)
+
+    # Còn trong TTL thì vẫn là duplicate
+    assert await store.add("mid-1", now=1050) is False
+    # Cả bucket chứa key đã quá TTL
+    assert await store.add("mid-1", now=1080) is True
+    assert store.metrics()["keys"] == 1
+
+
+async def test_memory_drops_oldest_buckets_over_max_keys():
+    store = InMemoryDedupStore(ttl=3600, bucket_seconds=10, max_keys=2)
+    await store.add("a", now=0)
+    await store.add("b", now=10)
+    await store.add("c", now=20)
+    await store.add("d", now=30)
+
+    assert store.metrics()["keys"] <= 3
+    assert await store.add("a", now=31) is True
+
+
+@pytest.fixture
+async def redis_store(fake_redis):
+    store = RedisDedupStore("redis://fake", ttl=1)
+    yield store
+    await store.close()
+
+
+async def test_redis_first_seen_then_duplicate(redis_store):
+    assert await redis_store.add("mid-1", now=0) is True
+    assert await redis_store.add("mid-1", now=0) is False
+    assert await redis_store.add("mid-2", now=0) is True
+
+
+async def test_redis_duplicate_across_workers(fake_redis):
+    worker_a = RedisDedupStore("redis://fake")
+    worker_b = RedisDedupStore("redis://fake")
+
+    results = await asyncio.gather(
+        worker_a.add("mid-1", now=0), worker_b.add("mid-1", now=0)
+    )
+
+    assert sorted(results) == [False, True]
+    await worker_a.close()
+    await worker_b.close()
+
+
+async def test_redis_key_expires_after_ttl(redis_store):
+    await redis_store.add("mid-1", now=0)
+
+    await asyncio.sleep(1.1)
+
+    assert await redis_store.add("mid-1", now=0) is True
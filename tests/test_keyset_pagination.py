@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.crud import async_crud_item, crud_item
+from app.models import Item
+
+ORDERS = [
+    None,
+    "-created_at",
+    "full_name",
+    "full_name,-created_at",
+    "-full_name,created_at",
+    "-full_name,id,created_at",
+]
+
+
+def filter_param(**kwargs):
+    return {
+        "skip": 0,
+        "limit": 7,
+        "filter": "{}",
+        "include": None,
+        "order_by": None,
+        "join": "{}",
+        "cursor": "",
+        "count": None,
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def rows(db):
+    # Nhiều dòng trùng created_at / full_name để id phải phân định thứ tự
+    started = datetime(2024, 1, 1, 8, 0, 0)
+    items = [
+        Item(
+            full_name=f"Khách {n % 4}",
+            created_at=started + timedelta(minutes=n % 5),
+        )
+        for n in range(40)
+    ]
+    db.add_all(items)
+    db.commit()
+    crud_item.remove(db, id=items[3].id)
+    return [item for item in items if item.deleted_at is None]
+
+
+def expected_order(rows, order_by):
+    attrs = (order_by or "created_at").split(",")
+    if "id" not in [a.lstrip("-") for a in attrs]:
+        attrs.append(("-" if attrs[-1].startswith("-") else "") + "id")
+    ordered = list(rows)
+    # Sort ổn định, lần lượt từ khóa cuối lên khóa đầu
+    for attr in reversed(attrs):
+        name = attr.lstrip("-")
+        ordered.sort(
+            key=lambda r: r.id.hex if name == "id" else getattr(r, name),
+            reverse=attr.startswith("-"),
+        )
+    return [r.id for r in ordered]
+
+
+@pytest.mark.parametrize("order_by", ORDERS)
+def test_cursor_walk_sees_every_row_once_in_order(db, rows, order_by):
+    seen, cursor, pages = [], "", 0
+    while cursor is not None:
+        page = crud_item.get_multi_by(
+            db, filter_param(order_by=order_by, cursor=cursor)
+        )
+        assert len(page["results"]) <= 7
+        assert page["total"] == len(rows)
+        seen += [r.id for r in page["results"]]
+        cursor = page["next_cursor"]
+        pages += 1
+
+    assert len(seen) == len(set(seen)) == len(rows)
+    assert seen == expected_order(rows, order_by)
+    assert pages == -(-len(rows) // 7)
+
+
+@pytest.mark.parametrize("order_by", ORDERS)
+async def test_async_cursor_walk_matches(async_db, rows, order_by):
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = await async_crud_item.get_multi_by(
+            async_db, filter_param(order_by=order_by, cursor=cursor)
+        )
+        seen += [r.id for r in page["results"]]
+        cursor = page["next_cursor"]
+
+    assert seen == expected_order(rows, order_by)
+
+
+def test_cursor_walk_applies_the_filter(db, rows):
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = crud_item.get_multi_by(
+            db,
+            filter_param(
+                filter='{"full_name": "Khách 1"}',
+                order_by="-created_at",
+                cursor=cursor,
+                limit=3,
+            ),
+        )
+        seen += [r.id for r in page["results"]]
+        cursor = page["next_cursor"]
+
+    matching = [r for r in rows if r.full_name == "Khách 1"]
+    assert seen == expected_order(matching, "-created_at")
+
+
+def test_get_multi_returns_the_first_page(db, rows):
+    page = crud_item.get_multi(db, filter_param(order_by="full_name"))
+
+    assert [r.id for r in page] == expected_order(rows, "full_name")[:7]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd", "e30"])
+def test_invalid_cursor_is_a_422(db, rows, cursor):
+    with pytest.raises(HTTPException) as error:
+        crud_item.get_multi_by(db, filter_param(cursor=cursor))
+
+    assert error.value.status_code == 422
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.common.enum.outbox_status import OutboxStatus
+from app.crud.crud_outbox_message import crud_outbox_message
+from app.models.outbox_message import OutboxMessage
+from app.services.impl import outbox_worker
+from app.services.impl.outbox_worker import OutboxWorker
+
+
+# SQLite không có JSONB và bỏ qua FOR UPDATE SKIP LOCKED: đủ để kiểm tra
+# vòng đời retry / dead-letter, không kiểm tra được khóa giữa các worker
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def db_session(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    OutboxMessage.__table__.create(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(outbox_worker, "SessionLocal", session)
+    yield session
+    engine.dispose()
+
+
+def statuses(db_session):
+    return {row.status for row in rows(db_session).values()}
+
+
+def rows(db_session):
+    with db_session() as db:
+        return {
+            row.payload["text"]: row
+            for row in db.query(OutboxMessage).all()
+        }
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def make_worker(**kwargs) -> OutboxWorker:
+    options = dict(workers=1, poll_interval=0.01, backoff_base=0.01)
+    options.update(kwargs)
+    return OutboxWorker(**options)
+
+
+async def test_enqueued_message_is_delivered_and_marked_sent(db_session):
+    delivered = []
+
+    async def handler(recipient_id, payload):
+        delivered.append((recipient_id, payload["text"]))
+
+    worker = make_worker(handlers={"graph_send": handler})
+    await worker.start()
+    for n in range(10):
+        await worker.enqueue("graph_send", "u1", {"text": str(n)})
+    # Bộ đếm tăng trước khi trạng thái được commit, chờ theo DB
+    await wait_until(lambda: statuses(db_session) == {OutboxStatus.SENT.value})
+    await worker.stop()
+
+    assert sorted(delivered) == [("u1", str(n)) for n in range(10)]
+    assert worker.metrics()["sent"] == 10
+
+
+async def test_failed_message_is_retried_until_it_goes_through(db_session):
+    calls = []
+
+    async def flaky(recipient_id, payload):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise ConnectionError("Graph API down")
+
+    worker = make_worker(handlers={"graph_send": flaky})
+    await worker.start()
+    await worker.enqueue("graph_send", "u1", {"text": "chào"})
+    await wait_until(lambda: statuses(db_session) == {OutboxStatus.SENT.value})
+    await worker.stop()
+
+    row = rows(db_session)["chào"]
+    assert row.status == OutboxStatus.SENT.value
+    assert row.attempts == 3
+    assert row.last_error is None
+    assert worker.metrics()["retried"] == 2
+
+
+async def test_message_is_dead_lettered_after_max_attempts(db_session):
+    async def failing(recipient_id, payload):
+        raise ConnectionError("AI backend down")
+
+    worker = make_worker(handlers={"ai_chat": failing}, max_attempts=3)
+    await worker.start()
+    await worker.enqueue("ai_chat", "u1", {"text": "hỏi giá"})
+    await wait_until(lambda: statuses(db_session) == {OutboxStatus.DEAD.value})
+    await worker.stop()
+
+    row = rows(db_session)["hỏi giá"]
+    assert row.attempts == 3
+    assert "AI backend down" in row.last_error
+    assert worker.metrics()["retried"] == 2
+
+
+async def test_message_without_handler_is_not_lost(db_session):
+    worker = make_worker(max_attempts=1)
+    await worker.start()
+    await worker.enqueue("unknown", None, {"text": "x"})
+    await wait_until(lambda: statuses(db_session) == {OutboxStatus.DEAD.value})
+    await worker.stop()
+
+    assert worker.metrics()["dead"] == 1
+
+
+def test_claimed_rows_are_leased(db_session):
+    worker = make_worker()
+    for n in range(3):
+        worker._create(
+            outbox_worker.OutboxMessageCreateSchema(
+                kind="graph_send",
+                recipient_id="u1",
+                payload={"text": str(n)},
+                max_attempts=8,
+            )
+        )
+
+    with db_session() as db:
+        first = crud_outbox_message.claim_batch(db, limit=2, lease=60)
+        second = crud_outbox_message.claim_batch(db, limit=2, lease=60)
+        third = crud_outbox_message.claim_batch(db, limit=2, lease=60)
+
+        assert len(first) == 2 and len(second) == 1 and third == []
+        assert {r.attempts for r in first + second} == {1}
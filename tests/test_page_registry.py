@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.crud_page import crud_page
+from app.models import Page
+from app.schema.page_schema import PageCreateSchema
+from app.services.impl import page_registry as registry_module
+from app.services.impl.page_registry import page_registry
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'page.db'}")
+    Page.__table__.create(engine)
+    SessionLocal = sessionmaker(autoflush=False, bind=engine)
+    monkeypatch.setattr(registry_module, "SessionLocal", SessionLocal)
+    page_registry.invalidate()
+    with SessionLocal() as db:
+        yield db
+    page_registry.invalidate()
+    engine.dispose()
+
+
+async def token(page_id="page-1"):
+    page = await page_registry.get("facebook", page_id)
+    return page.access_token if page is not None else None
+
+
+async def test_writes_to_the_page_table_clear_the_registry(session):
+    # Chưa có page: được cache là không tồn tại
+    assert await token() is None
+
+    page = crud_page.create(
+        session,
+        obj_in=PageCreateSchema(
+            page_id="page-1", store_id="store-1", access_token="old"
+        ),
+    )
+    assert await token() == "old"
+
+    crud_page.update(session, db_obj=page, obj_in={"access_token": "new"})
+    assert await token() == "new"
+
+    crud_page.patch(session, db_obj=page, obj_in={"page_id": "page-2"})
+    assert await token("page-1") is None
+    assert await token("page-2") == "new"
+
+    crud_page.remove(session, id=page.id)
+    assert await token("page-2") is None
+
+
+async def test_unchanged_pages_are_served_from_the_cache(session):
+    crud_page.create(
+        session,
+        obj_in=PageCreateSchema(page_id="page-1", store_id="store-1"),
+    )
+    await token()
+    loads = page_registry.metrics()["loads"]
+
+    for _ in range(3):
+        await token()
+
+    assert page_registry.metrics()["loads"] == loads
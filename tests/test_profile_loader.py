@@ -0,0 +1,180 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.common.http_client import GRAPH_API, http_clients
+from app.services.impl import facebook_messenger_service_impl as messenger
+from app.services.impl.facebook_messenger_service_impl import fetch_user_infos
+from app.services.impl.page_registry import PageConfig
+from app.services.impl.profile_cache import ProfileCache
+from app.services.impl.profile_loader import ProfileLoader
+
+
+class FakeGraph:
+    """Graph API giả: đếm request, `?ids=` bị từ chối nếu có id "bad"."""
+
+    def __init__(self):
+        self.requests = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        await self.release.wait()
+
+        ids = request.url.params.get("ids")
+        if ids is not None:
+            psids = ids.split(",")
+            if "bad" in psids:
+                return httpx.Response(400, json={"error": {"code": 100}})
+            return httpx.Response(200, json={p: profile(p) for p in psids})
+
+        psid = request.url.path.rsplit("/", 1)[-1]
+        if psid == "bad":
+            return httpx.Response(400, json={"error": {"code": 100}})
+        return httpx.Response(200, json=profile(psid))
+
+    def batched_ids(self):
+        return [
+            r.url.params["ids"].split(",")
+            for r in self.requests
+            if "ids" in r.url.params
+        ]
+
+
+def profile(psid: str):
+    return {"id": psid, "first_name": f"Tên {psid}", "last_name": "Nguyễn"}
+
+
+@pytest.fixture
+async def graph(monkeypatch):
+    fake = FakeGraph()
+    client = httpx.AsyncClient(
+        base_url="http://graph.test", transport=httpx.MockTransport(fake.handle)
+    )
+    monkeypatch.setitem(http_clients._clients, GRAPH_API, client)
+    yield fake
+    await client.aclose()
+
+
+async def test_concurrent_loads_are_batched_into_one_request(graph):
+    loader = ProfileLoader(fetch_user_infos, batch_window=0.01)
+    psids = ["a", "b", "a", "c", "b", "a"]
+
+    profiles = await asyncio.gather(*(loader.load(p) for p in psids))
+
+    assert profiles == [profile(p) for p in psids]
+    assert len(graph.requests) == 1
+    assert sorted(graph.batched_ids()[0]) == ["a", "b", "c"]
+    assert loader.metrics()["batches"] == 1
+
+
+async def test_load_of_an_in_flight_psid_joins_the_request(graph):
+    loader = ProfileLoader(fetch_user_infos, batch_window=0.001)
+    graph.release.clear()
+
+    first = asyncio.ensure_future(loader.load("a"))
+    while not graph.requests:
+        await asyncio.sleep(0.001)
+    # Request cho "a" đang chạy: load thêm không gửi request mới
+    second = asyncio.ensure_future(loader.load("a"))
+    await asyncio.sleep(0.01)
+    graph.release.set()
+
+    assert await first == await second == profile("a")
+    assert len(graph.requests) == 1
+
+
+async def test_batches_are_split_at_max_batch_size(graph):
+    loader = ProfileLoader(fetch_user_infos, max_batch_size=50)
+    psids = [f"u{i}" for i in range(120)]
+
+    profiles = await asyncio.gather(*(loader.load(p) for p in psids))
+
+    assert profiles == [profile(p) for p in psids]
+    assert [len(ids) for ids in graph.batched_ids()] == [50, 50, 20]
+
+
+async def test_rejected_batch_falls_back_to_one_request_per_id(graph):
+    loader = ProfileLoader(fetch_user_infos, batch_window=0.01)
+
+    profiles = await asyncio.gather(
+        *(loader.load(p) for p in ["a", "bad", "b"])
+    )
+
+    assert profiles == [profile("a"), None, profile("b")]
+    # Một request ?ids= bị từ chối, rồi từng id một
+    assert len(graph.batched_ids()) == 1
+    assert len(graph.requests) == 4
+
+
+async def test_failed_batch_is_raised_to_every_caller():
+    async def fetch_many(psids, access_token):
+        raise httpx.ConnectError("down")
+
+    loader = ProfileLoader(fetch_many, batch_window=0.001)
+
+    results = await asyncio.gather(
+        loader.load("a"), loader.load("b"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, httpx.ConnectError) for r in results)
+    assert loader.metrics()["errors"] == 1
+    # Lần sau gửi lại, không giữ future lỗi
+    assert not loader._in_flight and not loader._pending
+
+
+async def test_loads_are_batched_per_access_token(graph):
+    loader = ProfileLoader(fetch_user_infos, batch_window=0.01)
+
+    profiles = await asyncio.gather(
+        loader.load("a", "token-1"),
+        loader.load("b", "token-2"),
+        loader.load("c", "token-1"),
+        loader.load("a", "token-2"),
+    )
+
+    assert profiles == [profile(p) for p in ["a", "b", "c", "a"]]
+    batches = {
+        r.url.params["access_token"]: sorted(r.url.params["ids"].split(","))
+        for r in graph.requests
+    }
+    assert batches == {"token-1": ["a", "c"], "token-2": ["a", "b"]}
+
+
+class Pages:
+    async def get(self, channel, page_id):
+        if page_id == "page-1":
+            return PageConfig(channel, page_id, "store-1", "page-1-token")
+        return None
+
+
+async def test_profiles_are_read_with_the_token_of_the_page(
+    graph, monkeypatch
+):
+    monkeypatch.setattr(messenger, "page_registry", Pages())
+    loader = ProfileLoader(fetch_user_infos, batch_window=0.001)
+    monkeypatch.setattr(messenger, "profile_cache", ProfileCache(loader.load))
+
+    first = await messenger.messenger_channel.get_user_profile("a", "page-1")
+    second = await messenger.messenger_channel.get_user_profile("b", "other")
+
+    assert (first, second) == (profile("a"), profile("b"))
+    # Page chưa cấu hình dùng PAGE_ACCESS_TOKEN
+    assert [r.url.params["access_token"] for r in graph.requests] == [
+        "page-1-token",
+        "page-token",
+    ]
+
+
+async def test_rejected_batch_retries_with_the_same_token(graph):
+    loader = ProfileLoader(fetch_user_infos, batch_window=0.01)
+
+    await asyncio.gather(
+        *(loader.load(p, "token-1") for p in ["a", "bad", "b"])
+    )
+
+    assert {r.url.params["access_token"] for r in graph.requests} == {
+        "token-1"
+    }
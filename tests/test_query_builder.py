@@ -0,0 +1,234 @@
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy.orm import declarative_base, relationship
+
+from app.api import deps
+from app.api.v1.endpoints import item
+from app.crud import crud_item
+from app.db.query_builder import (
+    _compile_clauses,
+    _compile_select,
+    compile_select,
+    get_filter,
+    get_keyset,
+    query_builder,
+    query_cache_info,
+)
+from app.models import Item
+from app.schema import ItemCreate
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    _compile_clauses.cache_clear()
+    _compile_select.cache_clear()
+
+
+@pytest.fixture
+def items(db):
+    return [
+        crud_item.create(db, obj_in=ItemCreate(full_name=name))
+        for name in ["An", "Bình", "Chi", "Dũng", "Em"]
+    ]
+
+
+def names(rows):
+    return sorted(r.full_name for r in rows)
+
+
+def test_same_shape_reuses_the_statement_with_its_own_values():
+    first, first_params = compile_select(
+        Item, '{"full_name__like": "a", "id__in": [1, 2]}', "-created_at"
+    )
+    second, second_params = compile_select(
+        Item, '{"full_name__like": "b", "id__in": [3]}', "-created_at"
+    )
+
+    assert second is first
+    assert first_params == {"qb_0": "%a%", "qb_1": [1, 2]}
+    assert second_params == {"qb_0": "%b%", "qb_1": [3]}
+    assert query_cache_info()["select"]["hits"] == 1
+    assert query_cache_info()["select"]["misses"] == 1
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        '{"full_name": "a", "is_active": true}',
+        '[{"full_name": "a"}]',
+        '{"full_name__isnull": false}',
+        '{"full_name": null}',
+    ],
+)
+def test_a_different_shape_is_compiled_apart(other):
+    first, _ = compile_select(Item, '{"full_name": "a"}')
+    second, _ = compile_select(Item, other)
+
+    assert second is not first
+    assert query_cache_info()["select"]["misses"] == 2
+
+
+def test_isnull_value_is_part_of_the_shape():
+    _, params = compile_select(Item, '{"full_name__isnull": true}')
+    is_null, _ = compile_select(Item, '{"full_name__isnull": true}')
+    not_null, _ = compile_select(Item, '{"full_name__isnull": false}')
+
+    assert params == {}
+    assert is_null is not not_null
+    assert "IS NULL" in str(is_null)
+    assert "IS NOT NULL" in str(not_null)
+
+
+def test_query_builder_binds_values_per_call(db, items):
+    results = [
+        query_builder(db, Item, filter=f'{{"full_name": "{name}"}}').all()
+        for name in ["An", "Chi", "An"]
+    ]
+
+    assert [names(rows) for rows in results] == [["An"], ["Chi"], ["An"]]
+    info = query_cache_info()["clauses"]
+    assert (info["hits"], info["misses"]) == (2, 1)
+
+
+@pytest.mark.parametrize(
+    "filter, expected",
+    [
+        ('{"full_name__in": ["An", "Em"]}', ["An", "Em"]),
+        ('{"full_name__in": ["Bình"]}', ["Bình"]),
+        ('{"full_name__between": ["B", "D"]}', ["Bình", "Chi"]),
+        ('{"full_name__between": ["C", "E"]}', ["Chi", "Dũng"]),
+        ('[{"full_name": "An"}, {"full_name__ilike": "ng"}]', ["An", "Dũng"]),
+        ('[{"full_name": "Em"}, {"full_name__ilike": "nh"}]', ["Bình", "Em"]),
+    ],
+)
+async def test_cached_statement_runs_with_each_call_values(
+    db, async_db, items, filter, expected
+):
+    statement, params = compile_select(Item, filter)
+
+    assert names((await async_db.scalars(statement, params)).all()) == expected
+    assert names(query_builder(db, Item, filter=filter).all()) == expected
+
+
+def test_cache_info_reports_both_caches(db, items):
+    query_builder(db, Item, filter='{"full_name": "An"}')
+    compile_select(Item, '{"full_name": "An"}')
+    compile_select(Item, '{"full_name": "Chi"}')
+
+    info = query_cache_info()
+
+    # _compile_select dùng lại clauses đã compile cho Query
+    assert info["clauses"]["misses"] == 1
+    assert info["clauses"]["hits"] == 1
+    assert (info["select"]["hits"], info["select"]["misses"]) == (1, 1)
+    assert info["select"]["size"] == 1
+
+
+# Model có relationship riêng cho test, các model của app chưa có
+LocalBase = declarative_base()
+
+
+class Shop(LocalBase):
+    __tablename__ = "shop"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    products = relationship("Product")
+
+
+class Product(LocalBase):
+    __tablename__ = "product"
+    id = Column(Integer, primary_key=True)
+    shop_id = Column(ForeignKey("shop.id"))
+    price = Column(Integer)
+
+
+@pytest.mark.parametrize(
+    "kwargs, detail",
+    [
+        ({"filter": '{"nope": 1}'}, "Unknown column: nope"),
+        ({"filter": '[{"full_name": "a"}, {"nope__gte": 1}]'}, "nope"),
+        ({"filter": '{"full_name__approx": "a"}'}, "operator: approx"),
+        ({"filter": '{"0": [{"full_name__regex": "a"}]}'}, "regex"),
+        ({"filter": '{"shop.name": "a"}'}, "Unknown relationship: shop"),
+        ({"join": '{"shop": {}}'}, "Unknown relationship: shop"),
+        ({"include": "shop"}, "Unknown relationship: shop"),
+        ({"order_by": "-nope"}, "Unknown column: nope"),
+    ],
+)
+def test_unknown_names_are_a_422(db, kwargs, detail):
+    for build in [
+        lambda: query_builder(db, Item, **kwargs),
+        lambda: compile_select(Item, **kwargs),
+    ]:
+        # Lần hai cũng lỗi: lru_cache không lưu exception
+        for _ in range(2):
+            with pytest.raises(HTTPException) as error:
+                build()
+            assert error.value.status_code == 422
+            assert detail in error.value.detail
+
+
+def test_unknown_filter_names_are_a_422_without_the_cache():
+    for filter in [{"nope": 1}, {"full_name__approx": 1}, {"shop.id": 1}]:
+        with pytest.raises(HTTPException) as error:
+            get_filter(Item, filter)
+        assert error.value.status_code == 422
+
+
+def test_unknown_keyset_column_is_a_422():
+    with pytest.raises(HTTPException) as error:
+        get_keyset(Item, "full_name,-nope")
+
+    assert error.value.status_code == 422
+
+
+def test_relationship_filters_resolve_the_target_model():
+    statement, params = compile_select(
+        Shop,
+        filter='{"products.price__gte": 10, "name": "a"}',
+        join='{"products": {}}',
+        include="products",
+    )
+
+    assert "JOIN product ON shop.id = product.shop_id" in str(statement)
+    assert "product.price >= :qb_0" in str(statement)
+    assert params == {"qb_0": 10, "qb_1": "a"}
+    for kwargs in [
+        {"filter": '{"products.nope": 1}'},
+        {"filter": '{"products.price__most": 1}'},
+        {"filter": '{"products.shop.name": "a"}'},
+        {"join": '{"owner": {}}'},
+    ]:
+        with pytest.raises(HTTPException) as error:
+            compile_select(Shop, **kwargs)
+        assert error.value.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"filter": '{"nope": 1}'},
+        {"filter": '{"fullName__approx": "a"}'},
+        {"join": '{"shop": {}}'},
+        {"include": "shop"},
+        {"orderBy": "nope"},
+        {"orderBy": "nope", "cursor": ""},
+    ],
+)
+async def test_items_endpoint_answers_422(async_db, params):
+    app = FastAPI()
+    app.include_router(item.router, prefix="/items")
+
+    async def get_async_db():
+        yield async_db
+
+    app.dependency_overrides[deps.get_async_db] = get_async_db
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://app"
+    ) as client:
+        response = await client.get("/items/", params=params)
+
+    assert response.status_code == 422
@@ -0,0 +1,217 @@
+import time
+from difflib import SequenceMatcher
+
+import httpx
+import pytest
+
+from app.common.circuit_breaker import CircuitBreaker
+from app.common.http_client import AI_BACKEND, http_clients
+from app.core.config import settings
+from app.services.abc.channel_adapter import ChannelAdapter
+from app.services.abc.debounce_store import PendingBuffer
+from app.services.impl.channel_registry import channel_registry
+from app.services.impl.conversation_engine_impl import conversation_engine
+from app.services.impl.response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def ratio(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(clock):
+    return ResponseCache(
+        maxsize=10, ttl=60, max_message_length=50, timer=clock
+    )
+
+
+def test_hit_after_put_ignores_case_punctuation_and_spaces(cache):
+    cache.put("s1", "Giá bao nhiêu?", "150k")
+
+    assert cache.get("s1", "giá  bao nhiêu") == "150k"
+    assert cache.get("s1", "GIÁ BAO NHIÊU ??") == "150k"
+    assert cache.metrics()["hits"] == 2
+
+
+def test_miss(cache):
+    cache.put("s1", "giá bao nhiêu", "150k")
+
+    assert cache.get("s1", "ship không") is None
+    assert cache.get("s2", "giá bao nhiêu") is None
+    assert cache.metrics()["misses"] == 2
+
+
+def test_answers_are_kept_per_store(cache):
+    cache.put("s1", "giá bao nhiêu", "150k")
+    cache.put("s2", "giá bao nhiêu", "99k")
+
+    assert cache.get("s1", "giá bao nhiêu") == "150k"
+    assert cache.get("s2", "giá bao nhiêu") == "99k"
+    assert cache.metrics()["stores"] == 2
+
+
+def test_answers_expire_after_the_ttl(cache, clock):
+    cache.put("s1", "giá bao nhiêu", "150k")
+
+    clock.now = 59
+    assert cache.get("s1", "giá bao nhiêu") == "150k"
+    clock.now = 60
+    assert cache.get("s1", "giá bao nhiêu") is None
+
+
+def test_long_and_empty_messages_are_not_cached(cache):
+    long = "shop ơi " * 10
+    cache.put("s1", long, "trả lời riêng")
+    cache.put("s1", "", "trả lời")
+    cache.put("s1", "giá bao nhiêu", "")
+
+    assert cache.get("s1", long) is None
+    assert cache.get("s1", "giá bao nhiêu") is None
+    assert cache.metrics()["size"] == 0
+    assert cache.metrics()["skipped"] == 1
+
+
+@pytest.mark.parametrize(
+    "threshold, question, expected",
+    [
+        (0.9, "giá bao nhiêu vậy", None),
+        (0.85, "giá bao nhiêu vậy", "150k"),
+        (0.85, "ship bao nhiêu", None),
+        (0.8, "ship bao nhiêu", "150k"),
+        (0.75, "còn size không", None),
+        (0.7, "còn size không", "còn"),
+    ],
+)
+def test_similar_questions_hit_at_the_threshold(
+    clock, threshold, question, expected
+):
+    cache = ResponseCache(similarity=ratio, threshold=threshold, timer=clock)
+    cache.put("s1", "giá bao nhiêu", "150k")
+    cache.put("s1", "còn hàng không", "còn")
+
+    assert cache.get("s1", question) == expected
+    assert cache.metrics()["similar_hits"] == int(expected is not None)
+
+
+def test_similarity_picks_the_best_question(clock):
+    cache = ResponseCache(similarity=ratio, threshold=0.5, timer=clock)
+    cache.put("s1", "giá áo bao nhiêu", "150k")
+    cache.put("s1", "giá quần bao nhiêu", "200k")
+
+    assert cache.get("s1", "giá quần bao nhiêu ạ") == "200k"
+
+
+# Engine: chỉ câu trả lời thật của backend mới được cache
+
+
+class FakeChannel(ChannelAdapter):
+    name = "fake"
+
+    def __init__(self):
+        self.sent = []
+
+    def verify_request(self, raw_body, headers):
+        return True
+
+    def parse_events(self, raw_body):
+        return []
+
+    async def send_message(self, user_id, message, page_id=None):
+        self.sent.append(message["text"])
+
+    async def get_user_profile(self, user_id, page_id=None):
+        return None
+
+
+class NoPages:
+    async def get(self, channel, page_id):
+        return None
+
+
+@pytest.fixture
+def engine(monkeypatch, clock):
+    channel = FakeChannel()
+    monkeypatch.setitem(channel_registry._channels, channel.name, channel)
+    monkeypatch.setattr(conversation_engine, "pages", NoPages())
+    monkeypatch.setattr(
+        conversation_engine, "response_cache", ResponseCache(timer=clock)
+    )
+    monkeypatch.setattr(settings, "AI_STREAMING", False)
+    monkeypatch.setattr(settings, "OUTBOX_ENABLED", False)
+    monkeypatch.setattr(
+        conversation_engine, "ai_breaker", CircuitBreaker("ai")
+    )
+
+    def answer(*responses):
+        requests = []
+
+        async def handle(request):
+            requests.append(request)
+            status, body = responses[min(len(requests), len(responses)) - 1]
+            return httpx.Response(status, json=body)
+
+        client = httpx.AsyncClient(
+            base_url="http://ai.test", transport=httpx.MockTransport(handle)
+        )
+        monkeypatch.setitem(http_clients._clients, AI_BACKEND, client)
+        return requests
+
+    return channel, answer
+
+
+async def flush(message):
+    await conversation_engine.flush(
+        "fake::u1", PendingBuffer([message], time.time())
+    )
+
+
+async def test_backend_answer_is_cached(engine):
+    channel, answer = engine
+    requests = answer((200, {"response": "Giá là 150k."}))
+
+    await flush("giá bao nhiêu?")
+    await flush("Giá bao nhiêu")
+
+    assert len(requests) == 1
+    assert channel.sent == ["Giá là 150k.", "Giá là 150k."]
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        (200, {}),
+        (200, {"response": ""}),
+        (200, {"response": None}),
+        (200, {"detail": "no agent for store"}),
+        (500, {"detail": "boom"}),
+    ],
+)
+async def test_fallback_and_error_text_is_never_cached(engine, reply):
+    channel, answer = engine
+    requests = answer(reply, (200, {"response": "Giá là 150k."}))
+
+    await flush("giá bao nhiêu?")
+    await flush("giá bao nhiêu?")
+
+    # Lần đầu lỗi không được cache: lần hai vẫn gọi backend và có câu trả lời
+    assert len(requests) == 2
+    assert channel.sent[-1] == "Giá là 150k."
+    assert "Không có phản hồi từ API." not in channel.sent
+    cache = conversation_engine.response_cache
+    assert cache.metrics()["size"] == 1
+    assert cache.get(settings.DEFAULT_STORE_ID, "giá bao nhiêu") == (
+        "Giá là 150k."
+    )
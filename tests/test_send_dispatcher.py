@@ -0,0 +1,202 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from app.services.impl.send_dispatcher import SendApiError, SendDispatcher
+
+
+class FakeSendApi:
+    """Send API giả: `responses` được trả lần lượt, hết thì trả 200."""
+
+    def __init__(self, latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.responses = []
+        self.delivered = []
+        self.calls = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.rng.uniform(0, self.latency))
+        if self.responses:
+            return self.responses.pop(0)
+        payload = json.loads(request.content)
+        self.delivered.append(
+            (payload["recipient"]["id"], payload["message"]["text"])
+        )
+        return httpx.Response(200, json={"message_id": f"m{self.calls}"})
+
+
+def graph_error(code: int, status_code: int = 400, **kwargs):
+    return httpx.Response(
+        status_code, json={"error": {"code": code}}, **kwargs
+    )
+
+
+@pytest.fixture
+async def make_dispatcher():
+    clients = []
+
+    def make(api: FakeSendApi, **kwargs) -> SendDispatcher:
+        client = httpx.AsyncClient(
+            base_url="http://graph.test",
+            transport=httpx.MockTransport(api.handle),
+        )
+        clients.append(client)
+        options = dict(
+            page_rate=10000,
+            recipient_rate=10000,
+            recipient_burst=100,
+            backoff_base=0.001,
+            backoff_max=0.01,
+        )
+        options.update(kwargs)
+        return SendDispatcher(lambda: client, **options)
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+
+def text(recipient_id: str, body: str):
+    return {"recipient": {"id": recipient_id}, "message": {"text": body}}
+
+
+async def test_messages_to_one_recipient_are_sent_in_order(make_dispatcher):
+    api = FakeSendApi(latency=0.005)
+    dispatcher = make_dispatcher(api)
+    recipients = [f"u{i}" for i in range(10)]
+
+    await asyncio.gather(
+        *(
+            dispatcher.send(r, text(r, str(n)), "page-token")
+            for n in range(10)
+            for r in recipients
+        )
+    )
+
+    for r in recipients:
+        assert [t for rid, t in api.delivered if rid == r] == [
+            str(n) for n in range(10)
+        ]
+    assert dispatcher.metrics()["sent"] == 100
+    assert dispatcher.metrics()["lanes"] == 0
+
+
+@pytest.mark.parametrize("code", [4, 613])
+async def test_throttling_error_is_retried(make_dispatcher, code):
+    api = FakeSendApi()
+    api.responses = [graph_error(code), graph_error(code)]
+    dispatcher = make_dispatcher(api)
+
+    result = await dispatcher.send("u1", text("u1", "chào"), "page-token")
+
+    assert result == {"message_id": "m3"}
+    assert api.delivered == [("u1", "chào")]
+    assert dispatcher.metrics()["throttled"] == 2
+    assert dispatcher.metrics()["retried"] == 2
+
+
+async def test_throttled_message_keeps_its_place_in_the_lane(
+    make_dispatcher,
+):
+    api = FakeSendApi()
+    api.responses = [graph_error(613)]
+    dispatcher = make_dispatcher(api)
+
+    await asyncio.gather(
+        *(dispatcher.send("u1", text("u1", str(n)), "t") for n in range(5))
+    )
+
+    assert [t for _, t in api.delivered] == ["0", "1", "2", "3", "4"]
+
+
+async def test_server_error_is_retried_until_max_retries(make_dispatcher):
+    api = FakeSendApi()
+    api.responses = [graph_error(2, 500) for _ in range(4)]
+    dispatcher = make_dispatcher(api, max_retries=3)
+
+    with pytest.raises(SendApiError):
+        await dispatcher.send("u1", text("u1", "chào"), "page-token")
+
+    assert api.calls == 4
+    assert dispatcher.metrics()["failed"] == 1
+
+
+async def test_rejected_message_is_not_retried(make_dispatcher):
+    api = FakeSendApi()
+    # Người dùng đã chặn page
+    api.responses = [graph_error(551)]
+    dispatcher = make_dispatcher(api)
+
+    with pytest.raises(SendApiError) as error:
+        await dispatcher.send("u1", text("u1", "chào"), "page-token")
+
+    assert error.value.status_code == 400
+    assert api.calls == 1
+    assert dispatcher.metrics()["retried"] == 0
+
+
+async def test_page_rate_follows_the_usage_headers(make_dispatcher):
+    api = FakeSendApi()
+    api.responses = [
+        httpx.Response(
+            200,
+            json={"message_id": "m1"},
+            headers={
+                "X-App-Usage": json.dumps(
+                    {"call_count": 90, "total_time": 10, "total_cputime": 5}
+                )
+            },
+        ),
+        httpx.Response(
+            200,
+            json={"message_id": "m2"},
+            headers={
+                "X-Business-Use-Case-Usage": json.dumps(
+                    {
+                        "page-1": [
+                            {
+                                "type": "pages",
+                                "call_count": 20,
+                                "total_cputime": 10,
+                                "total_time": 10,
+                                "estimated_time_to_regain_access": 1,
+                            }
+                        ]
+                    }
+                )
+            },
+        ),
+    ]
+    dispatcher = make_dispatcher(api, page_rate=100)
+
+    await dispatcher.send("u1", text("u1", "1"), "page-token")
+    page = dispatcher.metrics()["pages"][0]
+    assert page["usage"] == 90
+    assert page["rate"] == pytest.approx(40)
+    assert not page["paused"]
+
+    await dispatcher.send("u1", text("u1", "2"), "page-token")
+    page = dispatcher.metrics()["pages"][0]
+    # Dưới 75% thì chạy hết tốc độ, nhưng phải chờ hết thời gian phạt
+    assert page["rate"] == 100
+    assert page["paused"]
+
+
+async def test_recipient_bucket_spaces_out_a_burst(make_dispatcher):
+    api = FakeSendApi()
+    dispatcher = make_dispatcher(api, recipient_rate=50, recipient_burst=2)
+    loop = asyncio.get_running_loop()
+
+    started = loop.time()
+    await asyncio.gather(
+        *(dispatcher.send("u1", text("u1", str(n)), "t") for n in range(7))
+    )
+
+    # 2 tin đi ngay, 5 tin còn lại cách nhau 1/50 s
+    assert loop.time() - started >= 5 / 50 * 0.9
@@ -0,0 +1,96 @@
+import asyncio
+
+from app.services.impl.webhook_dispatcher import (
+    WebhookDispatcher,
+    group_events_by_sender,
+)
+from app.services.impl.webhook_events import MessagingEvent
+
+
+def message(sender_id: str, text: str) -> MessagingEvent:
+    return MessagingEvent(MessagingEvent.MESSAGE, sender_id, text=text)
+
+
+def test_group_events_by_sender_keeps_order():
+    events = [message("a", "1"), message("b", "1"), message("a", "2")]
+
+    groups = group_events_by_sender(events)
+
+    assert list(groups) == ["a", "b"]
+    assert [e.text for e in groups["a"]] == ["1", "2"]
+
+
+async def test_dispatch_handles_every_event_in_sender_order():
+    handled = []
+
+    async def handler(sender_psid, event):
+        # Nhường event loop để các sender khác chen vào
+        await asyncio.sleep(0)
+        handled.append((sender_psid, event.text))
+
+    dispatcher = WebhookDispatcher(handler, concurrency=4)
+    events = [
+        message(f"user-{i % 10}", str(i // 10)) for i in range(100)
+    ]
+
+    await dispatcher.dispatch(events)
+
+    assert len(handled) == 100
+    for i in range(10):
+        texts = [text for sender, text in handled if sender == f"user-{i}"]
+        assert texts == [str(n) for n in range(10)]
+    assert dispatcher.metrics()["events"] == 100
+
+
+async def test_dispatch_limits_concurrent_senders():
+    active = 0
+    peak = 0
+
+    async def handler(sender_psid, event):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001)
+        active -= 1
+
+    dispatcher = WebhookDispatcher(handler, concurrency=3)
+
+    await dispatcher.dispatch([message(f"user-{i}", "hi") for i in range(20)])
+
+    assert peak == 3
+
+
+async def test_order_is_kept_across_concurrent_batches():
+    handled = []
+
+    async def handler(sender_psid, event):
+        await asyncio.sleep(0.001)
+        handled.append(event.text)
+
+    dispatcher = WebhookDispatcher(handler, concurrency=8)
+
+    await asyncio.gather(
+        dispatcher.dispatch([message("a", "1"), message("a", "2")]),
+        dispatcher.dispatch([message("a", "3")]),
+    )
+
+    assert handled == ["1", "2", "3"]
+    assert dispatcher.metrics()["waiting_senders"] == 0
+
+
+async def test_failed_event_does_not_drop_the_rest():
+    handled = []
+
+    async def handler(sender_psid, event):
+        if event.text == "boom":
+            raise ValueError("boom")
+        handled.append(event.text)
+
+    dispatcher = WebhookDispatcher(handler)
+
+    await dispatcher.dispatch(
+        [message("a", "1"), message("a", "boom"), message("a", "2")]
+    )
+
+    assert handled == ["1", "2"]
+    assert dispatcher.metrics()["failed"] == 1
@@ -0,0 +1,182 @@
+import hashlib
+import hmac
+
+import orjson
+import pytest
+
+from app.core.config import settings
+from app.core.security import verify_hub_signature
+from app.services.impl.facebook_messenger_service_impl import messenger_channel
+from app.services.impl.webhook_events import MessagingEvent, parse_webhook_body
+
+APP_SECRET = "app-secret"
+
+
+def sign(raw: bytes, secret: str = APP_SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), raw, hashlib.sha256).hexdigest()
+
+
+def body(*messaging, object="page"):
+    return orjson.dumps(
+        {
+            "object": object,
+            "entry": [{"id": "page-1", "time": 1, "messaging": list(messaging)}],
+        }
+    )
+
+
+def item(sender_id="u1", **kwargs):
+    return {
+        "sender": {"id": sender_id},
+        "recipient": {"id": "page-1"},
+        "timestamp": 1700000000000,
+        **kwargs,
+    }
+
+
+def test_parses_message_with_attachment():
+    raw = body(
+        item(
+            message={
+                "mid": "m1",
+                "text": "Áo này còn size M không?",
+                "attachments": [
+                    {"type": "image", "payload": {"url": "https://cdn/1.jpg"}}
+                ],
+            }
+        )
+    )
+
+    webhook_object, [event] = parse_webhook_body(raw)
+
+    assert webhook_object == "page"
+    assert event.kind == MessagingEvent.MESSAGE
+    assert (event.sender_id, event.recipient_id) == ("u1", "page-1")
+    assert event.mid == "m1"
+    assert event.text == "Áo này còn size M không?"
+    assert event.attachment_url == "https://cdn/1.jpg"
+
+
+def test_parses_postback_and_other_events():
+    raw = body(
+        item(postback={"mid": "m2", "payload": "GET_STARTED"}),
+        item(read={"watermark": 1}),
+    )
+
+    _, (postback, other) = parse_webhook_body(raw)
+
+    assert postback.kind == MessagingEvent.POSTBACK
+    assert postback.postback_payload == "GET_STARTED"
+    assert postback.text == ""
+    assert other.kind == MessagingEvent.OTHER
+
+
+def test_keeps_batch_order_across_entries_and_skips_items_without_sender():
+    raw = orjson.dumps(
+        {
+            "object": "page",
+            "entry": [
+                {"messaging": [item("a", message={"text": "1"})]},
+                {"messaging": [{"message": {"text": "?"}}]},
+                {"messaging": [item("b", message={"text": "2"})]},
+                {"id": "page-1"},
+            ],
+        }
+    )
+
+    _, events = parse_webhook_body(raw)
+
+    assert [(e.sender_id, e.text) for e in events] == [("a", "1"), ("b", "2")]
+
+
+def test_non_object_body_has_no_events():
+    assert parse_webhook_body(b"[]") == (None, [])
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        [1, "x", None, {"messaging": ["x", 2, None, []]}],
+        [{"messaging": {"sender": {"id": "u2"}}}, {"messaging": "x"}],
+        [{"messaging": [{"sender": "u2", "message": {"text": "?"}}]}],
+        [{"messaging": [{"sender": ["u2"], "recipient": 1}]}],
+        "x",
+        {"messaging": []},
+    ],
+)
+def test_malformed_entries_and_items_are_skipped(entry):
+    # Body đúng chữ ký nhưng sai kiểu: bỏ qua, không được thành lỗi 500
+    valid = {"messaging": [item("a", message={"text": "1"})]}
+    entries = [valid, *entry] if isinstance(entry, list) else entry
+    raw = orjson.dumps({"object": "page", "entry": entries})
+
+    events = messenger_channel.parse_events(raw)
+
+    expected = [("a", "1")] if isinstance(entry, list) else []
+    assert [(e.sender_id, e.text) for e in events] == expected
+
+
+def test_malformed_message_fields_do_not_raise():
+    raw = body(
+        item("a", message="x"),
+        item("b", postback=["x"]),
+        item("c", message={"text": "2", "attachments": "x"}),
+        item("d", message={"attachments": [1]}),
+        item("e", message={"attachments": [{"payload": "x"}]}),
+    )
+
+    events = messenger_channel.parse_events(raw)
+
+    assert [(e.sender_id, e.kind) for e in events] == [
+        ("a", MessagingEvent.OTHER),
+        ("b", MessagingEvent.OTHER),
+        ("c", MessagingEvent.MESSAGE),
+        ("d", MessagingEvent.MESSAGE),
+        ("e", MessagingEvent.MESSAGE),
+    ]
+    assert [e.attachment_url for e in events[2:]] == ["", "", ""]
+
+
+def test_bad_json_is_rejected_by_the_channel():
+    with pytest.raises(orjson.JSONDecodeError):
+        parse_webhook_body(b"{not json")
+    with pytest.raises(ValueError):
+        messenger_channel.parse_events(b"{not json")
+    with pytest.raises(ValueError):
+        messenger_channel.parse_events(body(object="instagram"))
+
+
+def test_signature_is_checked_over_the_raw_bytes():
+    raw = body(item(message={"text": "chào shop"}))
+
+    assert verify_hub_signature(raw, sign(raw), APP_SECRET)
+    # Cùng JSON nhưng serialize khác đi thì chữ ký không còn khớp
+    reformatted = orjson.dumps(orjson.loads(raw), option=orjson.OPT_INDENT_2)
+    assert not verify_hub_signature(reformatted, sign(raw), APP_SECRET)
+
+
+@pytest.mark.parametrize(
+    "signature",
+    [
+        None,
+        "",
+        "sha1=abc",
+        "sha256=" + "0" * 64,
+        sign(b"{}", secret="other-secret"),
+    ],
+)
+def test_invalid_signature_is_rejected(signature):
+    assert not verify_hub_signature(b"{}", signature, APP_SECRET)
+
+
+def test_channel_verifies_only_when_an_app_secret_is_set(monkeypatch):
+    raw = body(item(message={"text": "hi"}))
+    headers = {"X-Hub-Signature-256": sign(raw)}
+
+    monkeypatch.setattr(settings, "FACEBOOK_APP_SECRET", None)
+    assert messenger_channel.verify_request(raw, {})
+
+    monkeypatch.setattr(settings, "FACEBOOK_APP_SECRET", APP_SECRET)
+    assert messenger_channel.verify_request(raw, headers)
+    assert not messenger_channel.verify_request(raw + b" ", headers)
+    assert not messenger_channel.verify_request(raw, {})